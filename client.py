@@ -4,15 +4,20 @@ PHCore FHIR Validation Client
 Simple CLI client to test the FHIR validation server.
 """
 
+import http.client
 import json
 import sys
+import threading
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional
 import urllib.request
 import urllib.parse
 import urllib.error
 import requests
 
+# Bytes read from an NDJSON file per upload chunk
+BULK_UPLOAD_BLOCK = 1024 * 1024
+
 
 class FhirValidationClient:
     """Client for PHCore FHIR validation server."""
@@ -60,6 +65,48 @@ class FhirValidationClient:
                 }]
             }
             
+    def validate_bulk(self, file_path: str, verbose: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Stream an NDJSON file to the bulk endpoint, yielding one OperationOutcome per line.
+        
+        The server answers while the upload is still running, so the file is sent
+        from a background thread as chunked transfer encoding while outcomes are read.
+        """
+        url = urllib.parse.urlsplit(self.base_url)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(url.hostname, url.port)
+        query = "?verbose=true" if verbose else ""
+        connection.putrequest("POST", f"{url.path}/ph-core/fhir/$validate-bulk{query}")
+        connection.putheader("Content-Type", "application/fhir+ndjson")
+        connection.putheader("Transfer-Encoding", "chunked")
+        connection.endheaders()
+        
+        def upload() -> None:
+            try:
+                with open(file_path, 'rb') as f:
+                    while True:
+                        block = f.read(BULK_UPLOAD_BLOCK)
+                        if not block:
+                            break
+                        connection.send(b"%x\r\n%s\r\n" % (len(block), block))
+                connection.send(b"0\r\n\r\n")
+            except OSError:
+                # The server closed the connection; the response reports why
+                pass
+                
+        uploader = threading.Thread(target=upload, daemon=True)
+        uploader.start()
+        try:
+            response = connection.getresponse()
+            if response.status != 200:
+                raise RuntimeError(f"HTTP {response.status}: {response.read().decode('utf-8', 'replace')}")
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+        finally:
+            connection.close()
+            uploader.join(timeout=1)
+            
     def get_profiles(self) -> Dict[str, Any]:
         """Get available profiles."""
         url = f"{self.base_url}/ph-core/fhir/profiles"
@@ -87,6 +134,8 @@ def main():
         print("Usage: python client.py <command> [args...]")
         print("Commands:")
         print("  validate <file.json> [--verbose]  - Validate a FHIR resource")
+        print("  validate-bulk <file.ndjson> [--verbose] [--output <file>]")
+        print("                                    - Stream-validate an NDJSON file")
         print("  profiles                          - List available profiles")
         print("  resource <type> <id>             - Get a specific resource")
         print("  test                             - Run validation tests")
@@ -119,6 +168,41 @@ def main():
         except Exception as e:
             print(f"❌ Error: {e}")
     
+    elif command == "validate-bulk":
+        if len(sys.argv) < 3:
+            print("Usage: python client.py validate-bulk <file.ndjson> [--verbose] [--output <file>]")
+            return
+            
+        file_path = sys.argv[2]
+        verbose = "--verbose" in sys.argv
+        output_path = sys.argv[sys.argv.index("--output") + 1] if "--output" in sys.argv[:-1] else None
+        
+        if not Path(file_path).is_file():
+            print(f"❌ File not found: {file_path}")
+            return
+            
+        print(f"🔍 Validating {file_path}{' (verbose mode)' if verbose else ''}...")
+        lines = invalid = 0
+        output = open(output_path, 'w', encoding='utf-8') if output_path else None
+        try:
+            for outcome in client.validate_bulk(file_path, verbose=verbose):
+                lines += 1
+                if output:
+                    output.write(json.dumps(outcome, ensure_ascii=False) + "\n")
+                errors = [issue for issue in outcome.get('issue', []) if issue.get('severity') == 'error']
+                if errors:
+                    invalid += 1
+                    line_number = errors[0]['extension'][0]['valueInteger']
+                    for issue in errors:
+                        location = f" at {issue['location'][0]}" if issue.get('location') else ""
+                        print(f"❌ Line {line_number}{location}: {issue['details']['text']}")
+            print(f"\n📊 {lines} resources validated, {lines - invalid} valid, {invalid} invalid")
+        except (OSError, RuntimeError) as e:
+            print(f"❌ Error: {e}")
+        finally:
+            if output:
+                output.close()
+    
     elif command == "profiles":
         result = client.get_profiles()
         if 'profiles' in result:
@@ -170,7 +254,7 @@ def main():
     
     else:
         print(f"❌ Unknown command: {command}")
-        print("Available commands: validate, profiles, resource, test")
+        print("Available commands: validate, validate-bulk, profiles, resource, test")
 
 
 if __name__ == "__main__":
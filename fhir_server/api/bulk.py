@@ -0,0 +1,148 @@
+"""
+PHCore Bulk Validation
+Streams NDJSON request bodies through the validator in chunks, one OperationOutcome per line.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from fhir_server.core import fast_json
+from fhir_server.validation.validator import FhirValidator, ValidationIssue, ValidationResult
+
+NDJSON_MEDIA_TYPE = "application/fhir+ndjson"
+
+# Standard extension carrying the input line an issue belongs to
+ISSUE_LINE_EXTENSION = "http://hl7.org/fhir/StructureDefinition/operationoutcome-issue-line"
+
+# (line number, raw line or None when the line exceeded the size limit)
+NdjsonLine = Tuple[int, Optional[bytes]]
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[NdjsonLine]:
+    """
+    Split a byte stream into numbered, non-blank lines.
+
+    Only the current partial line is buffered. A line longer than
+    max_line_bytes is dropped while it streams past and reported as None.
+    """
+    buffer = bytearray()
+    line_number = 0
+    oversized = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b'\n', start)
+            if end < 0:
+                if not oversized:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        buffer.clear()
+                        oversized = True
+                break
+            line_number += 1
+            if oversized:
+                yield line_number, None
+            else:
+                buffer += chunk[start:end]
+                line = bytes(buffer).strip()
+                if len(line) > max_line_bytes:
+                    yield line_number, None
+                elif line:
+                    yield line_number, line
+            buffer.clear()
+            oversized = False
+            start = end + 1
+    line_number += 1
+    if oversized:
+        yield line_number, None
+    elif buffer.strip():
+        yield line_number, bytes(buffer).strip() if len(buffer) <= max_line_bytes else None
+
+
+def _parse_line(line: Optional[bytes], max_line_bytes: int) -> Tuple[Optional[Dict[str, Any]], Optional[ValidationIssue]]:
+    if line is None:
+        return None, ValidationIssue('error', 'too-costly', f'Line exceeds the {max_line_bytes} byte limit')
+    try:
+        resource = fast_json.loads(line)
+    except ValueError as e:
+        return None, ValidationIssue('error', 'structure', f'Invalid JSON: {e}')
+    if not isinstance(resource, dict):
+        return None, ValidationIssue('error', 'structure', 'Line is not a JSON object')
+    return resource, None
+
+
+class BulkValidation:
+    """
+    Validates an NDJSON stream chunk by chunk against one registry version.
+
+    While a chunk is being validated (on the validator's Bundle pool when one
+    is configured, otherwise on a worker thread) the next chunk is read from
+    the request, so at most two chunks are held at any time.
+    """
+
+    def __init__(self, validator: FhirValidator, outcome_builder: Callable[[ValidationResult], Dict[str, Any]],
+                 chunk_lines: int = 1000, max_line_bytes: int = 16 * 1024 * 1024, verbose: bool = False):
+        self.validator = validator
+        self.outcome_builder = outcome_builder
+        self.chunk_lines = chunk_lines
+        self.max_line_bytes = max_line_bytes
+        self.verbose = verbose
+        self.stats = {"lines": 0, "invalid": 0}
+
+    def _validate_chunk(self, lines: List[NdjsonLine]) -> bytes:
+        parsed = [(line_number, *_parse_line(line, self.max_line_bytes)) for line_number, line in lines]
+        entries = [(line_number, resource) for line_number, resource, _ in parsed if resource is not None]
+        if self.validator.bundle_pool is not None:
+            results = dict(self.validator.bundle_pool.validate(self.validator, entries, self.verbose))
+        else:
+            results = {line_number: self.validator.validate_bundle_entry(resource, self.verbose)
+                       for line_number, resource in entries}
+
+        output = []
+        for line_number, _, parse_issue in parsed:
+            issues = [parse_issue] if parse_issue is not None else results[line_number]
+            is_valid = not any(issue.severity == 'error' for issue in issues)
+            outcome = self.outcome_builder(ValidationResult(is_valid=is_valid, issues=issues))
+            for fhir_issue in outcome["issue"]:
+                fhir_issue["extension"] = [{"url": ISSUE_LINE_EXTENSION, "valueInteger": line_number}]
+            output.append(fast_json.dumps(outcome))
+            self.stats["lines"] += 1
+            self.stats["invalid"] += not is_valid
+        return b'\n'.join(output) + b'\n'
+
+    async def outcomes(self, body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """NDJSON OperationOutcomes for the lines of body, in input order."""
+        pending: Optional[asyncio.Future] = None
+        chunk: List[NdjsonLine] = []
+        async for line in ndjson_lines(body, self.max_line_bytes):
+            chunk.append(line)
+            if len(chunk) >= self.chunk_lines:
+                if pending is not None:
+                    yield await pending
+                pending = asyncio.ensure_future(run_in_threadpool(self._validate_chunk, chunk))
+                chunk = []
+        if pending is not None:
+            yield await pending
+        if chunk:
+            yield await run_in_threadpool(self._validate_chunk, chunk)
+
+
+class NdjsonStreamingResponse(StreamingResponse):
+    """
+    Streaming response that may read the request body while it is sent.
+
+    StreamingResponse watches `receive` for a disconnect while streaming,
+    which would swallow the request body messages the bulk endpoint is still
+    reading. Here the body reader sees the disconnect instead.
+    """
+
+    media_type = NDJSON_MEDIA_TYPE
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
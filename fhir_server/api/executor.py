@@ -0,0 +1,154 @@
+"""
+PHCore Validation Executor
+Runs synchronous validations off the event loop on a bounded thread or process pool.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from fhir_server.api.jobs import QueueFullError
+from fhir_server.api.metrics import LatencyWindow
+from fhir_server.validation.validator import FhirValidator, ValidationResult
+from fhir_server.validation.workers import RegistryMismatchError, ValidatorSpec, worker_context
+
+# Executor kinds selectable with PHCORE_VALIDATION_EXECUTOR
+EXECUTOR_KINDS = ("thread", "process")
+
+# (start time, finish time, result) of one validation, times from time.time()
+TimedResult = Tuple[float, float, ValidationResult]
+
+# Validator built by each executor process when it starts, or why it could not be
+_worker_validator: Optional[FhirValidator] = None
+_worker_error: Optional[RegistryMismatchError] = None
+
+
+def _init_worker(spec: ValidatorSpec) -> None:
+    global _worker_validator, _worker_error
+    try:
+        _worker_validator = spec.build()
+    except RegistryMismatchError as e:
+        # Tasks are rejected rather than validated against a different registry version
+        _worker_error = e
+
+
+def _timed_validation(validator: Optional[FhirValidator], resource_data: Dict[str, Any], verbose: bool) -> TimedResult:
+    if validator is None and _worker_validator is None:
+        raise _worker_error
+    started = time.time()
+    result = (validator or _worker_validator).validate_resource(resource_data, verbose=verbose)
+    return started, time.time(), result
+
+
+class ValidationExecutor:
+    """
+    Bounded pool that validates resources for async request handlers.
+
+    "thread" runs validations on a thread pool, which keeps the event loop
+    free for light requests. "process" starts worker processes that load
+    the current registry, as the Bundle pool does, and sidesteps the GIL
+    for CPU-bound validation. Workers that could not load the request's
+    registry version (its files changed before they started) reject the
+    request, which is then validated in this process against the pinned
+    version instead. At most `max_pending` validations may wait or run
+    at once; beyond that QueueFullError is raised. Time spent waiting for a
+    worker and time spent validating are recorded separately.
+    """
+
+    def __init__(self, kind: str = "thread", workers: int = 4, max_pending: int = 64):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown validation executor '{kind}', expected one of: {', '.join(EXECUTOR_KINDS)}")
+        self.kind = kind
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._validator: Optional[FhirValidator] = None
+        # Validator whose registry version the process workers failed to load
+        self._mismatched: Optional[FhirValidator] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.wait_times = LatencyWindow()
+        self.run_times = LatencyWindow()
+        self.stats = {"completed": 0, "failed": 0, "rejected": 0, "mismatched": 0}
+
+    def _executor_for(self, validator: FhirValidator) -> Executor:
+        with self._lock:
+            if self.kind == "thread":
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="phcore-validation")
+            elif self._validator is not validator:
+                # Workers hold the registry they loaded; start new ones after a hot reload.
+                # They never fork this process, whose other threads may hold locks.
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=worker_context(),
+                    initializer=_init_worker,
+                    initargs=(ValidatorSpec.from_validator(validator),)
+                )
+                self._validator = validator
+            return self._executor
+
+    async def validate(self, validator: FhirValidator, resource_data: Dict[str, Any], verbose: bool = False) -> ValidationResult:
+        """Validate a resource on the pool without blocking the event loop."""
+        if self._pending >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise QueueFullError(f"Validation queue is full ({self.max_pending} requests)")
+
+        loop = asyncio.get_running_loop()
+        self._pending += 1
+        submitted = time.time()
+        try:
+            if self.kind == "process" and self._mismatched is validator:
+                started, finished, result = await loop.run_in_executor(
+                    None, _timed_validation, validator, resource_data, verbose
+                )
+            else:
+                started, finished, result = await self._run_on_pool(loop, validator, resource_data, verbose)
+        except Exception:
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._pending -= 1
+        self.wait_times.add(max(0.0, started - submitted))
+        self.run_times.add(finished - started)
+        self.stats["completed"] += 1
+        return result
+
+    async def _run_on_pool(self, loop: asyncio.AbstractEventLoop, validator: FhirValidator,
+                           resource_data: Dict[str, Any], verbose: bool) -> TimedResult:
+        executor = self._executor_for(validator)
+        # Threads share the validator; worker processes use the one they built
+        shared = validator if self.kind == "thread" else None
+        try:
+            return await loop.run_in_executor(executor, _timed_validation, shared, resource_data, verbose)
+        except RegistryMismatchError:
+            # The files changed before the workers loaded them; validate against the pinned version here
+            self.stats["mismatched"] += 1
+            self._mismatched = validator
+            return await loop.run_in_executor(None, _timed_validation, validator, resource_data, verbose)
+
+    def info(self) -> Dict[str, Any]:
+        """Pending validations, counters and latency percentiles in milliseconds."""
+        return {
+            **self.stats,
+            "kind": self.kind,
+            "pending": self._pending,
+            "workers": self.workers,
+            "maxPending": self.max_pending,
+            "waitMs": self.wait_times.info(),
+            "runMs": self.run_times.info(),
+        }
+
+    def shutdown(self) -> None:
+        """Stop the pool's threads or processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._validator = None
+            self._mismatched = None
@@ -0,0 +1,288 @@
+"""
+PHCore Asynchronous Validation Jobs
+Runs `Prefer: respond-async` validations on a local worker pool and keeps their results for polling.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from fhir_server.api.metrics import LatencyWindow
+
+# Job states, following the FHIR asynchronous request pattern
+QUEUED = "queued"
+IN_PROGRESS = "in-progress"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+@dataclass
+class ValidationJob:
+    """State and result of one asynchronous validation."""
+    id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    outcome: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    def info(self) -> Dict[str, Any]:
+        """Summary of the job for status responses."""
+        return {
+            "id": self.id,
+            "status": self.status,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+class JobStore(ABC):
+    """Where validation jobs and their results are kept between submission and polling."""
+
+    @abstractmethod
+    def save(self, job: ValidationJob) -> None:
+        """Insert or replace a job."""
+
+    @abstractmethod
+    def update(self, job: ValidationJob) -> bool:
+        """Replace a job only if it still exists, returning whether it did; a deleted job stays deleted."""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[ValidationJob]:
+        """A copy of the job, or None if it is unknown."""
+
+    @abstractmethod
+    def delete(self, job_id: str) -> bool:
+        """Remove a job, returning whether it existed."""
+
+    @abstractmethod
+    def purge(self, finished_before: float) -> int:
+        """Drop finished jobs older than the given time, returning how many were dropped."""
+
+
+class InMemoryJobStore(JobStore):
+    """Jobs held in the serving process; status URLs work only against that process."""
+
+    def __init__(self):
+        self._jobs: Dict[str, ValidationJob] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: ValidationJob) -> None:
+        with self._lock:
+            self._jobs[job.id] = ValidationJob(**asdict(job))
+
+    def update(self, job: ValidationJob) -> bool:
+        with self._lock:
+            if job.id not in self._jobs:
+                return False
+            self._jobs[job.id] = ValidationJob(**asdict(job))
+            return True
+
+    def get(self, job_id: str) -> Optional[ValidationJob]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return ValidationJob(**asdict(job)) if job else None
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            return self._jobs.pop(job_id, None) is not None
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < finished_before]
+            for job_id in expired:
+                del self._jobs[job_id]
+            return len(expired)
+
+
+class SqliteJobStore(JobStore):
+    """
+    Jobs kept in an SQLite file.
+
+    Every server worker process can answer a status URL, whichever one runs
+    the job, and results survive a restart. Connections are opened per
+    process and shared by its threads under a lock.
+    """
+
+    _SCHEMA = """
+    CREATE TABLE IF NOT EXISTS validation_job (
+        id TEXT PRIMARY KEY,
+        status TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        started_at REAL,
+        finished_at REAL,
+        outcome TEXT,
+        error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS validation_job_finished ON validation_job (finished_at);
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False, isolation_level=None)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.executescript(self._SCHEMA)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def save(self, job: ValidationJob) -> None:
+        outcome = json.dumps(job.outcome, ensure_ascii=False) if job.outcome is not None else None
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO validation_job (id, status, created_at, started_at, finished_at, outcome, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.status, job.created_at, job.started_at, job.finished_at, outcome, job.error)
+            )
+
+    def update(self, job: ValidationJob) -> bool:
+        outcome = json.dumps(job.outcome, ensure_ascii=False) if job.outcome is not None else None
+        with self._lock:
+            return self._connect().execute(
+                "UPDATE validation_job SET status = ?, started_at = ?, finished_at = ?, outcome = ?, error = ? "
+                "WHERE id = ?",
+                (job.status, job.started_at, job.finished_at, outcome, job.error, job.id)
+            ).rowcount > 0
+
+    def get(self, job_id: str) -> Optional[ValidationJob]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, status, created_at, started_at, finished_at, outcome, error FROM validation_job WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return ValidationJob(*row[:5], outcome=json.loads(row[5]) if row[5] is not None else None, error=row[6])
+
+    def delete(self, job_id: str) -> bool:
+        with self._lock:
+            return self._connect().execute("DELETE FROM validation_job WHERE id = ?", (job_id,)).rowcount > 0
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            return self._connect().execute(
+                "DELETE FROM validation_job WHERE finished_at IS NOT NULL AND finished_at < ?", (finished_before,)
+            ).rowcount
+
+
+class ValidationJobQueue:
+    """
+    Bounded queue of validation jobs served by a fixed pool of threads.
+
+    Jobs are callables returning an OperationOutcome. Submitting to a full
+    queue raises QueueFullError so the endpoint can ask the client to retry.
+    Finished jobs are kept in the store for `ttl` seconds.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, max_queued: int = 100, ttl: float = 3600.0):
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queued)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._running = 0
+        self.wait_times = LatencyWindow()
+        self.run_times = LatencyWindow()
+        self.stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+
+    def start(self) -> None:
+        """Start the worker threads; called in each serving process."""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._threads = [
+            threading.Thread(target=self._work, name=f"phcore-validation-job-{index}", daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker threads after the jobs they are running."""
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=5)
+            except queue.Full:
+                break
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, run: Callable[[], Dict[str, Any]]) -> ValidationJob:
+        """Queue a job, returning it in the queued state."""
+        now = time.time()
+        job = ValidationJob(id=uuid.uuid4().hex, status=QUEUED, created_at=now)
+        self.store.purge(now - self.ttl)
+        self.store.save(job)
+        try:
+            self._queue.put_nowait((job, run))
+        except queue.Full:
+            self.store.delete(job.id)
+            with self._lock:
+                self.stats["rejected"] += 1
+            raise QueueFullError(f"Validation queue is full ({self.max_queued} jobs)")
+        with self._lock:
+            self.stats["submitted"] += 1
+        return job
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            job, run = item
+            # A job deleted while queued is cancelled
+            job.status, job.started_at = IN_PROGRESS, time.time()
+            if not self.store.update(job):
+                continue
+            with self._lock:
+                self._running += 1
+            try:
+                job.outcome = run()
+                job.status = COMPLETED
+            except Exception as e:
+                job.error = str(e)
+                job.status = FAILED
+            job.finished_at = time.time()
+            with self._lock:
+                self._running -= 1
+                self.stats["completed" if job.status == COMPLETED else "failed"] += 1
+            self.wait_times.add(job.started_at - job.created_at)
+            self.run_times.add(job.finished_at - job.started_at)
+            # A job deleted while running is discarded rather than stored again
+            self.store.update(job)
+
+    def info(self) -> Dict[str, Any]:
+        """Queue depth, counters and latency percentiles in milliseconds."""
+        with self._lock:
+            info = {**self.stats, "queued": self._queue.qsize(), "running": self._running}
+        return {
+            **info,
+            "workers": self.workers,
+            "maxQueued": self.max_queued,
+            "waitMs": self.wait_times.info(),
+            "runMs": self.run_times.info(),
+        }
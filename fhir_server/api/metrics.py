@@ -0,0 +1,35 @@
+"""
+PHCore Server Metrics
+Rolling latency windows reported by the $metrics endpoint.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+# Samples kept per window
+LATENCY_SAMPLES = 1024
+
+
+class LatencyWindow:
+    """Durations of the most recent operations, summarized as percentiles."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self._samples: Deque[float] = deque(maxlen=samples)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Duration in seconds below which the given fraction of samples fall."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def info(self) -> Dict[str, float]:
+        """p50 and p99 in milliseconds."""
+        return {"p50": round(self.percentile(0.5) * 1000, 2), "p99": round(self.percentile(0.99) * 1000, 2)}
@@ -0,0 +1,155 @@
+"""
+PHCore Pre-fork Server
+Runs several uvicorn workers that share the registry loaded once in the parent process.
+"""
+
+import gc
+import os
+import signal
+import socket
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+
+
+def prepare_parent_heap() -> None:
+    """
+    Freeze the parent's heap before forking.
+
+    Moving every object into the permanent generation keeps the collector from
+    touching (and so copying) the registry pages shared with the workers.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    Memory use of a process in KiB, from /proc/<pid>/smaps_rollup (Linux only).
+
+    Returns:
+        {"rss", "pss", "uss"} where uss counts only pages private to the process,
+        or None if the process is gone or the platform has no smaps_rollup
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process (Linux only)."""
+    children = []
+    for task in Path(f"/proc/{pid}/task").glob("*/children"):
+        try:
+            children.extend(int(child) for child in task.read_text().split())
+        except OSError:
+            continue
+    return sorted(children)
+
+
+def print_worker_memory(parent_pid: int, worker_pids: List[int]) -> None:
+    """Print RSS, PSS and unique memory of the parent and each worker."""
+    print(f"{'Process':<16} {'RSS MiB':>9} {'PSS MiB':>9} {'Unique MiB':>11}")
+    for label, pid in [("parent", parent_pid)] + [(f"worker {pid}", pid) for pid in worker_pids]:
+        memory = process_memory(pid)
+        if memory is None:
+            print(f"{label:<16} {'n/a':>9} {'n/a':>9} {'n/a':>11}")
+            continue
+        print(f"{label:<16} {memory['rss'] / 1024:>9.1f} {memory['pss'] / 1024:>9.1f} {memory['uss'] / 1024:>11.1f}")
+
+
+class PreforkServer:
+    """Binds one listening socket, then forks workers that serve the already-built app."""
+
+    def __init__(self, app: FastAPI, host: str, port: int, workers: int, memory_report_delay: float = 5.0):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.memory_report_delay = memory_report_delay
+        self.worker_pids: List[int] = []
+        self._shutting_down = False
+
+    def run(self) -> None:
+        """Fork the workers and supervise them until SIGINT/SIGTERM."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+
+        prepare_parent_heap()
+        for _ in range(self.workers):
+            self._spawn(sock)
+
+        signal.signal(signal.SIGTERM, self._handle_shutdown)
+        signal.signal(signal.SIGINT, self._handle_shutdown)
+        print(f"👷 Started {self.workers} workers sharing the parent registry: {self.worker_pids}")
+
+        report_at = time.monotonic() + self.memory_report_delay if self.memory_report_delay > 0 else None
+        try:
+            while not self._shutting_down:
+                if report_at and time.monotonic() >= report_at:
+                    print_worker_memory(os.getpid(), self.worker_pids)
+                    report_at = None
+                self._reap(sock)
+                time.sleep(0.5)
+        finally:
+            self._stop_workers()
+            sock.close()
+
+    def _spawn(self, sock: socket.socket) -> None:
+        pid = os.fork()
+        if pid == 0:
+            # Worker: restore default signal handling and serve on the shared socket
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            gc.enable()
+            config = uvicorn.Config(self.app, host=self.host, port=self.port, lifespan="on")
+            uvicorn.Server(config).run(sockets=[sock])
+            os._exit(0)
+        self.worker_pids.append(pid)
+
+    def _reap(self, sock: socket.socket) -> None:
+        """Replace workers that exited unexpectedly."""
+        for pid in list(self.worker_pids):
+            try:
+                finished, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                finished, status = pid, 0
+            if finished:
+                self.worker_pids.remove(pid)
+                if not self._shutting_down:
+                    print(f"⚠️ Worker {pid} exited with status {status}; restarting")
+                    self._spawn(sock)
+
+    def _handle_shutdown(self, signum, frame) -> None:
+        self._shutting_down = True
+
+    def _stop_workers(self) -> None:
+        for pid in self.worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self.worker_pids:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        self.worker_pids = []
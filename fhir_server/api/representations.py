@@ -0,0 +1,160 @@
+"""
+PHCore Response Representations
+Serialized, precompressed response bodies with strong ETags, cached per registry version.
+"""
+
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from fhir_server.core import fast_json
+
+try:
+    import brotli
+except ImportError:  # brotli variants are only built when the package is installed
+    brotli = None
+
+IDENTITY = "identity"
+GZIP = "gzip"
+BROTLI = "br"
+
+# Content codings in order of preference when a client accepts several equally
+CODINGS = (BROTLI, GZIP, IDENTITY) if brotli is not None else (GZIP, IDENTITY)
+
+# Bodies are compressed once, so the slowest, smallest settings are used
+_GZIP_LEVEL = 9
+_BROTLI_QUALITY = 11
+
+# Bodies this small are not worth a compressed variant
+_MIN_COMPRESS_BYTES = 512
+
+
+@dataclass(frozen=True)
+class Representation:
+    """One resource serialized to JSON, with its compressed variants."""
+    digest: str
+    bodies: Dict[str, bytes]
+
+    def etag(self, coding: str) -> str:
+        """Strong ETag of the variant; variants of one resource share the digest."""
+        return f'"{self.digest}"' if coding == IDENTITY else f'"{self.digest}-{coding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """Whether an If-None-Match header names any variant of this representation."""
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        if '*' in tags:
+            return True
+        return any(tag.removeprefix('W/') in (self.etag(coding) for coding in self.bodies) for tag in tags)
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+
+def build_representation(content: Dict[str, Any], compress: bool = True) -> Representation:
+    """Serialize content once and, unless compress is False, precompress it with every available coding."""
+    body = fast_json.dumps(content)
+    bodies = {IDENTITY: body}
+    if compress and len(body) >= _MIN_COMPRESS_BYTES:
+        variants = {GZIP: gzip.compress(body, compresslevel=_GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            variants[BROTLI] = brotli.compress(body, quality=_BROTLI_QUALITY)
+        bodies.update((coding, variant) for coding, variant in variants.items() if len(variant) < len(body))
+    return Representation(digest=hashlib.blake2b(body, digest_size=16).hexdigest(), bodies=bodies)
+
+
+def negotiate_coding(accept_encoding: Optional[str], available: Dict[str, bytes]) -> str:
+    """Pick the content coding to send for an Accept-Encoding header."""
+    if not accept_encoding:
+        return IDENTITY
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[coding.strip().lower()] = weight
+    wildcard = weights.get('*')
+    candidates: List[Tuple[float, int, str]] = []
+    for rank, coding in enumerate(CODINGS):
+        if coding not in available:
+            continue
+        weight = weights.get(coding, 1.0 if coding == IDENTITY else wildcard or 0.0)
+        if weight > 0:
+            candidates.append((weight, -rank, coding))
+    return max(candidates)[2] if candidates else IDENTITY
+
+
+class RepresentationCache:
+    """
+    LRU cache of Representations bounded by the bytes of their bodies.
+
+    Like the validation result cache, keys carry the registry version they
+    were built from, and the first lookup against a newer version drops
+    every older entry, so a hot reload never serves a stale body or ETag.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Representation]" = OrderedDict()
+        self._bytes = 0
+        self._version = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, version: int, key: Hashable) -> Optional[Representation]:
+        """Cached representation for key, or None on a miss."""
+        with self._lock:
+            if version != self._version:
+                if version < self._version:
+                    self.stats["misses"] += 1
+                    return None
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            representation = self._entries.get(key)
+            if representation is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return representation
+
+    def put(self, version: int, key: Hashable, representation: Representation) -> None:
+        """Store a representation built from the given registry version."""
+        if representation.size > self.max_bytes:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = representation
+            self._bytes += representation.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.stats["evictions"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        """Counters and current occupancy for status endpoints."""
+        with self._lock:
+            return {
+                **self.stats,
+                "version": self._version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "codings": list(CODINGS),
+            }
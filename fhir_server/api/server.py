@@ -5,15 +5,34 @@ FastAPI server providing FHIR REST endpoints and validation services.
 
 import json
 import os
-from typing import Dict, Any, Optional, List, Union
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, List
 from pathlib import Path
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi import FastAPI, Header, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+from fhir_server.api.bulk import BulkValidation, NdjsonStreamingResponse
+from fhir_server.api.executor import ValidationExecutor
+from fhir_server.api.representations import (
+    IDENTITY, RepresentationCache, build_representation, negotiate_coding
+)
+from fhir_server.api.jobs import (
+    COMPLETED, FAILED, InMemoryJobStore, QueueFullError, SqliteJobStore, ValidationJobQueue
+)
+from fhir_server.core import fast_json
+from fhir_server.core.config import ServerConfig
+from fhir_server.core.projection import Projection, ProjectionError, project
+from fhir_server.core.registry import RegistryManager, RegistryVersion
 from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.core.search import MAX_PAGE_SIZE, RESULT_PARAMETERS, SearchError
+from fhir_server.validation.bundle import BundleValidationPool
+from fhir_server.validation.result_cache import ValidationResultCache
+from fhir_server.validation.terminology_store import STORED_RESOURCE_TYPES, TerminologyStore
 from fhir_server.validation.validator import FhirValidator, ValidationResult
 from playground.app import PlaygroundApp
 from playground.routes import setup_playground_routes
@@ -44,25 +63,92 @@ class VerboseValidationRequest(BaseModel):
     verbose: bool = False
 
 
+# Documents the $validate body, which is read raw rather than through a request model
+VALIDATE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"anyOf": [
+                    VerboseValidationRequest.model_json_schema(),
+                    ValidationRequest.model_json_schema(),
+                ]}
+            }
+        }
+    }
+}
+
+
 class FhirServer:
     """FastAPI-based FHIR server for PHCore resources."""
     
-    def __init__(self):
+    def __init__(self, config: Optional[ServerConfig] = None):
+        self.config = config or ServerConfig.from_env()
         self.app = FastAPI(
             title="PHCore FHIR Validation Server",
             description="FHIR validation server for Philippine Core Implementation Guide",
-            version="1.0.0"
+            version="1.0.0",
+            lifespan=self._lifespan
         )
         
         # Initialize resource loader and validator
-        self.resource_loader = ResourceLoader()
-        count = self.resource_loader.load_all_resources()
+        resource_loader = ResourceLoader(
+            self.config.resources_dir,
+            self.config.base_resources_dir,
+            snapshot_path=self.config.snapshot_path,
+            lazy=self.config.lazy_bundles,
+            lazy_cache_size=self.config.lazy_cache_size,
+            workers=self.config.loader_workers,
+            # CodeSystems compiled into the terminology store are not kept in memory
+            on_demand_types=STORED_RESOURCE_TYPES if self.config.terminology_db else ()
+        )
+        count = resource_loader.load_all_resources()
         print(f"Loaded {count} FHIR resources")
         
-        self.validator = FhirValidator(self.resource_loader)
+        terminology_store = TerminologyStore(self.config.terminology_db) if self.config.terminology_db else None
+        result_cache = ValidationResultCache(
+            max_entries=self.config.result_cache_size,
+            max_bytes=self.config.result_cache_mb * 1024 * 1024,
+            ttl=self.config.result_cache_ttl
+        ) if self.config.result_cache_size > 0 else None
+        bundle_pool = BundleValidationPool(
+            workers=self.config.bundle_workers,
+            min_entries=self.config.bundle_parallel_min
+        ) if self.config.bundle_workers != 1 else None
+        validator = FhirValidator(resource_loader, engine=self.config.validation_engine,
+                                  terminology_store=terminology_store, result_cache=result_cache,
+                                  bundle_pool=bundle_pool)
+        
+        # Persist the indexed registry so the next boot can skip parsing
+        if not resource_loader.loaded_from_snapshot:
+            resource_loader.save_snapshot()
+            
+        # Versioned registry, swapped atomically on hot reload
+        self.registry = RegistryManager(resource_loader, validator)
+        
+        # Jobs for Prefer: respond-async validations; workers start with the app
+        job_db = self.config.job_store_path()
+        job_store = SqliteJobStore(job_db) if job_db else InMemoryJobStore()
+        self.validation_jobs = ValidationJobQueue(
+            job_store,
+            workers=self.config.async_workers,
+            max_queued=self.config.async_queue_size,
+            ttl=self.config.async_job_ttl
+        )
+        
+        # Synchronous validations run here so they do not block the event loop
+        self.validation_executor = ValidationExecutor(
+            kind=self.config.validation_executor,
+            workers=self.config.validation_workers,
+            max_pending=self.config.validation_queue_size
+        )
+        
+        # Serialized, precompressed bodies of read responses for the current registry version
+        self.representations = RepresentationCache(max_bytes=self.config.representation_cache_mb * 1024 * 1024)
         
         # Initialize playground
-        self.playground_app = PlaygroundApp(self.resource_loader, self.validator)
+        self.playground_app = PlaygroundApp(resource_loader, validator, registry=self.registry,
+                                            executor=self.validation_executor)
         
         # Set up routes
         self._setup_routes()
@@ -73,6 +159,29 @@ class FhirServer:
         # Mount static files for playground
         self.app.mount("/playground/static", StaticFiles(directory="playground/static"), name="playground_static")
         
+    @property
+    def resource_loader(self) -> ResourceLoader:
+        """Resource loader of the current registry version."""
+        return self.registry.current.resource_loader
+        
+    @property
+    def validator(self) -> FhirValidator:
+        """Validator of the current registry version."""
+        return self.registry.current.validator
+        
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        """Start the resource watcher with the app; started per worker process."""
+        if self.config.hot_reload:
+            self.registry.start_watching(self.config.reload_interval)
+        self.validation_jobs.start()
+        yield
+        self.validation_jobs.stop()
+        self.validation_executor.shutdown()
+        self.registry.stop_watching()
+        if self.validator.bundle_pool is not None:
+            self.validator.bundle_pool.shutdown()
+        
     def _setup_routes(self) -> None:
         """Set up FastAPI routes."""
         
@@ -116,48 +225,125 @@ class FhirServer:
             """FHIR metadata endpoint."""
             return await root()
             
-        @self.app.post("/ph-core/fhir/$validate")
-        async def validate_resource(request: Union[ValidationRequest, Dict[str, Any]]):
+        @self.app.post("/ph-core/fhir/$validate", openapi_extra=VALIDATE_REQUEST_BODY)
+        async def validate_resource(http_request: Request, prefer: Optional[str] = Header(None)):
             """Validate a FHIR resource against PHCore profiles."""
+            # The raw body is decoded once; no request model is built or copied back to a dict
             try:
-                # Handle different request formats
-                if isinstance(request, dict):
-                    # Check if this is a verbose request
-                    if 'resource' in request and 'verbose' in request:
-                        resource_data = request['resource']
-                        verbose = request.get('verbose', False)
-                    else:
-                        # Regular resource validation
-                        resource_data = request
-                        verbose = False
+                request = fast_json.loads(await http_request.body())
+            except ValueError as e:
+                return self._json_response(self._error_outcome("structure", f"Invalid JSON: {e}"), status_code=400)
+            if not isinstance(request, dict):
+                return self._json_response(self._error_outcome("structure", "Request body is not a JSON object"),
+                                           status_code=400)
+                
+            try:
+                # Check if this is a verbose request
+                if 'resource' in request and 'verbose' in request and isinstance(request['resource'], dict):
+                    resource_data = request['resource']
+                    verbose = bool(request.get('verbose', False))
                 else:
-                    # Pydantic model
-                    if hasattr(request, 'resource'):
-                        # VerboseValidationRequest
-                        resource_data = request.resource
-                        verbose = getattr(request, 'verbose', False)
-                    else:
-                        # ValidationRequest
-                        resource_data = request.dict()
-                        verbose = False
+                    # Regular resource validation
+                    resource_data = request
+                    verbose = False
                 
-                # Perform validation
-                result = self.validator.validate_resource(resource_data, verbose=verbose)
+                # Perform validation against the registry version current at request start
+                validator = self.registry.current.validator
+                if prefer and "respond-async" in prefer:
+                    status_url = f"{str(http_request.base_url).rstrip('/')}/ph-core/fhir/$validate-jobs"
+                    return self._submit_validation_job(validator, resource_data, verbose, status_url)
+                result = await self.validation_executor.validate(validator, resource_data, verbose=verbose)
                 
                 # Create OperationOutcome
-                return self._create_operation_outcome(result)
+                return self._json_response(self._create_operation_outcome(result))
                 
+            except QueueFullError as e:
+                return self._throttled(e)
             except Exception as e:
                 # Return error OperationOutcome
-                return {
+                return self._json_response(self._error_outcome("exception", str(e)))
+                
+        @self.app.post("/ph-core/fhir/$validate-bulk")
+        async def validate_bulk(request: Request, verbose: bool = False):
+            """Validate a streamed NDJSON body, streaming back one OperationOutcome per line."""
+            bulk = BulkValidation(
+                self.registry.current.validator,
+                self._create_operation_outcome,
+                chunk_lines=self.config.bulk_chunk_lines,
+                verbose=verbose
+            )
+            return NdjsonStreamingResponse(bulk.outcomes(request.stream()))
+            
+        @self.app.get("/ph-core/fhir/$validate-jobs/{job_id}")
+        async def validation_job_status(job_id: str):
+            """Poll an asynchronous validation; the OperationOutcome is returned once it completes."""
+            job = self.validation_jobs.store.get(job_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail=f"Validation job not found: {job_id}")
+            if job.status == COMPLETED:
+                return job.outcome
+            if job.status == FAILED:
+                return JSONResponse(status_code=500, content={
                     "resourceType": "OperationOutcome",
-                    "issue": [{
-                        "severity": "error",
-                        "code": "exception",
-                        "details": {"text": str(e)}
-                    }]
-                }
+                    "issue": [{"severity": "error", "code": "exception", "details": {"text": job.error}}]
+                })
+            return JSONResponse(status_code=202, content=job.info(),
+                                headers={"X-Progress": job.status, "Retry-After": "1"})
+            
+        @self.app.delete("/ph-core/fhir/$validate-jobs/{job_id}")
+        async def delete_validation_job(job_id: str):
+            """Cancel a queued validation or discard a finished one."""
+            if not self.validation_jobs.store.delete(job_id):
+                raise HTTPException(status_code=404, detail=f"Validation job not found: {job_id}")
+            return Response(status_code=202)
+            
+        @self.app.get("/ph-core/fhir/$metrics")
+        async def metrics():
+            """Validation queue depths, counters and latency."""
+            return {
+                "validationExecutor": self.validation_executor.info(),
+                "validationJobs": self.validation_jobs.info(),
+            }
+            
+        @self.app.get("/ph-core/fhir/$registry")
+        async def registry_version():
+            """Current registry version, bumped on every hot reload."""
+            info = self.registry.current.info()
+            result_cache = self.registry.current.validator.result_cache
+            if result_cache is not None:
+                info["validationCache"] = result_cache.info()
+            info["representationCache"] = self.representations.info()
+            return info
+            
+        @self.app.get("/ph-core/fhir/CodeSystem/$lookup")
+        async def lookup_code(system: str, code: str):
+            """Look up a code's display and hierarchy in a loaded CodeSystem."""
+            index = self.validator.get_code_system_index(system)
+            if index is None or code not in index:
+                raise HTTPException(status_code=404, detail=f"Code not found: {system}#{code}")
                 
+            parameters = [{"name": "name", "valueString": index.name or system}]
+            if index.version:
+                parameters.append({"name": "version", "valueString": index.version})
+            if index.display(code) is not None:
+                parameters.append({"name": "display", "valueString": index.display(code)})
+            for relation, related in (("parent", index.parents(code)), ("child", index.children(code))):
+                for related_code in related:
+                    parameters.append({"name": "property", "part": [
+                        {"name": "code", "valueCode": relation},
+                        {"name": "value", "valueCode": related_code}
+                    ]})
+            return {"resourceType": "Parameters", "parameter": parameters}
+            
+        @self.app.get("/ph-core/fhir/CodeSystem/$subsumes")
+        async def subsumes(system: str, codeA: str, codeB: str):
+            """Test the subsumption relationship between two codes of a CodeSystem."""
+            index = self.validator.get_code_system_index(system)
+            outcome = index.subsumes(codeA, codeB) if index is not None else None
+            if outcome is None:
+                raise HTTPException(status_code=404, detail=f"Codes not found in CodeSystem: {system}")
+            return {"resourceType": "Parameters", "parameter": [{"name": "outcome", "valueCode": outcome}]}
+            
         @self.app.get("/ph-core/fhir/profiles")
         async def list_profiles():
             """List available StructureDefinition profiles."""
@@ -169,84 +355,196 @@ class FhirServer:
             return {"profiles": profiles}
             
         @self.app.get("/ph-core/fhir/{resource_type}")
-        async def search_resources(resource_type: str):
-            """Search resources by type."""
-            resources = self.resource_loader.get_resources_by_type(resource_type)
-            if not resources:
+        async def search_resources(resource_type: str, request: Request):
+            """Search resources by type, one page at a time."""
+            version = self.registry.current
+            if not version.resource_loader.by_type.get(resource_type):
                 raise HTTPException(status_code=404, detail=f"No resources found for type: {resource_type}")
-                
-            bundle = {
-                "resourceType": "Bundle",
-                "id": f"search-{resource_type}",
-                "type": "searchset",
-                "total": len(resources),
-                "entry": [
-                    {
-                        "resource": resource.content,
-                        "fullUrl": f"http://localhost:5072/ph-core/fhir/{resource_type}/{resource.id}"
-                    }
-                    for resource in resources
-                ]
-            }
-            
-            return bundle
+            try:
+                body = await run_in_threadpool(self._search_body, version, resource_type, request)
+            except (SearchError, ProjectionError) as e:
+                return self._json_response(self._error_outcome("not-supported", str(e)), status_code=400)
+            return Response(content=body, media_type="application/json")
             
         @self.app.get("/ph-core/fhir/{resource_type}/{resource_id}")
-        async def get_resource(resource_type: str, resource_id: str):
+        async def get_resource(resource_type: str, resource_id: str, request: Request):
             """Get a specific resource by type and ID."""
-            resource = self.resource_loader.get_resource(resource_type, resource_id)
-            if not resource:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"Resource not found: {resource_type}/{resource_id}"
-                )
-                
-            return resource.content
+            return await self._read_response(request, resource_type, resource_id,
+                                             f"Resource not found: {resource_type}/{resource_id}")
             
         @self.app.get("/ph-core/fhir/ImplementationGuide/{ig_id}")
-        async def get_implementation_guide(ig_id: str):
+        async def get_implementation_guide(ig_id: str, request: Request):
             """Get the Implementation Guide."""
-            ig = self.resource_loader.get_resource("ImplementationGuide", ig_id)
-            if not ig:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"ImplementationGuide not found: {ig_id}"
-                )
-            return ig.content
+            return await self._read_response(request, "ImplementationGuide", ig_id,
+                                             f"ImplementationGuide not found: {ig_id}")
             
         @self.app.get("/ph-core/fhir/StructureDefinition/{profile_id}")
-        async def get_structure_definition(profile_id: str):
+        async def get_structure_definition(profile_id: str, request: Request):
             """Get a StructureDefinition profile."""
-            sd = self.resource_loader.get_resource("StructureDefinition", profile_id)
-            if not sd:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"StructureDefinition not found: {profile_id}"
-                )
-            return sd.content
+            return await self._read_response(request, "StructureDefinition", profile_id,
+                                             f"StructureDefinition not found: {profile_id}")
             
         @self.app.get("/ph-core/fhir/ValueSet/{valueset_id}")
-        async def get_value_set(valueset_id: str):
+        async def get_value_set(valueset_id: str, request: Request):
             """Get a ValueSet."""
-            vs = self.resource_loader.get_resource("ValueSet", valueset_id)
-            if not vs:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"ValueSet not found: {valueset_id}"
-                )
-            return vs.content
+            return await self._read_response(request, "ValueSet", valueset_id,
+                                             f"ValueSet not found: {valueset_id}")
             
         @self.app.get("/ph-core/fhir/CodeSystem/{codesystem_id}")
-        async def get_code_system(codesystem_id: str):
+        async def get_code_system(codesystem_id: str, request: Request):
             """Get a CodeSystem."""
-            cs = self.resource_loader.get_resource("CodeSystem", codesystem_id)
-            if not cs:
-                raise HTTPException(
-                    status_code=404, 
-                    detail=f"CodeSystem not found: {codesystem_id}"
-                )
-            return cs.content
+            return await self._read_response(request, "CodeSystem", codesystem_id,
+                                             f"CodeSystem not found: {codesystem_id}")
+            
+    def _search_body(self, version: RegistryVersion, resource_type: str, request: Request) -> bytes:
+        """
+        One page of a searchset Bundle served from the version's search index.
+        
+        Only the resources on the page are read, and each entry's (projected)
+        resource is serialized once per registry version in the
+        representation cache; the Bundle is assembled from those bytes.
+        `next` and `previous` links repeat the search with a moved `_offset`.
+        """
+        criteria, shaping = [], []
+        count, offset = self.config.search_page_size, 0
+        for name, value in request.query_params.multi_items():
+            if name in ("_count", "_offset"):
+                try:
+                    number = int(value)
+                except ValueError:
+                    raise SearchError(f"{name} must be an integer, got '{value}'")
+                if number < 0:
+                    raise SearchError(f"{name} must not be negative")
+                if name == "_count":
+                    count = min(number, MAX_PAGE_SIZE)
+                else:
+                    offset = number
+            elif name in ("_summary", "_elements"):
+                shaping.append((name, value))
+            elif name not in RESULT_PARAMETERS:
+                criteria.append((name, value))
+        projection = self._projection(request)
+        if projection.summary == "count":
+            count = 0
+            
+        matches = version.search_index.search(resource_type, criteria)
+        
+        def page_link(relation: str, page_offset: int) -> Dict[str, str]:
+            query = urlencode(criteria + shaping + [("_count", count), ("_offset", page_offset)])
+            return {"relation": relation, "url": f"{str(request.base_url).rstrip('/')}{request.url.path}?{query}"}
+            
+        links = [page_link("self", offset)]
+        if count and offset + count < len(matches):
+            links.append(page_link("next", offset + count))
+        if count and offset > 0:
+            links.append(page_link("previous", max(0, offset - count)))
+        body = fast_json.dumps({
+            "resourceType": "Bundle",
+            "id": f"search-{resource_type}",
+            "type": "searchset",
+            "total": len(matches),
+            "link": links
+        })
+        if not count:
+            return body
+            
+        positions = matches[offset:offset + count]
+        keys = [(resource_type, position, projection) for position in positions]
+        bodies = {key: self.representations.get(version.version, key) for key in keys}
+        missing = [key[1] for key, representation in bodies.items() if representation is None]
+        for position, resource in zip(missing, version.resource_loader.get_resources_at(resource_type, missing)):
+            key = (resource_type, position, projection)
+            content = project(version.resource_loader, resource.content, projection)
+            bodies[key] = build_representation(content, compress=False)
+            self.representations.put(version.version, key, bodies[key])
+            
+        stubs = version.resource_loader.by_type[resource_type]
+        entries = [
+            b'{"resource":' + bodies[key].bodies[IDENTITY] + b',"fullUrl":'
+            + fast_json.dumps(f"http://localhost:5072/ph-core/fhir/{resource_type}/{stubs[key[1]].id}")
+            + b',"search":{"mode":"match"}}'
+            for key in keys
+        ]
+        return body[:-1] + b',"entry":[' + b','.join(entries) + b']}'
+        
+    def _projection(self, request: Request) -> Projection:
+        """Projection requested with `_summary` and `_elements`."""
+        return Projection.parse(request.query_params.get("_summary"), request.query_params.get("_elements"))
+        
+    async def _read_response(self, request: Request, resource_type: str, resource_id: str,
+                             not_found: str) -> Response:
+        """
+        Read response served from the representation cache.
+        
+        Bodies, including `_summary` and `_elements` views, are projected,
+        serialized and compressed once per registry version, and a matching
+        If-None-Match is answered with 304 from the cached ETag.
+        """
+        try:
+            projection = self._projection(request)
+            if projection.summary == "count":
+                raise ProjectionError("_summary=count only applies to searches")
+        except ProjectionError as e:
+            return self._json_response(self._error_outcome("not-supported", str(e)), status_code=400)
             
+        version = self.registry.current
+        key = (resource_type, resource_id) if projection.is_full else (resource_type, resource_id, projection)
+        representation = self.representations.get(version.version, key)
+        if representation is None:
+            resource = version.resource_loader.get_resource(resource_type, resource_id)
+            if not resource:
+                raise HTTPException(status_code=404, detail=not_found)
+            content = project(version.resource_loader, resource.content, projection)
+            # Compression is slow enough to keep off the event loop
+            representation = await run_in_threadpool(build_representation, content)
+            self.representations.put(version.version, key, representation)
+            
+        coding = negotiate_coding(request.headers.get("accept-encoding"), representation.bodies)
+        headers = {"ETag": representation.etag(coding), "Vary": "Accept-Encoding"}
+        if representation.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        if coding != IDENTITY:
+            headers["Content-Encoding"] = coding
+        return Response(content=representation.bodies[coding], headers=headers, media_type="application/json")
+        
+    def _submit_validation_job(self, validator: FhirValidator, resource_data: Dict[str, Any], verbose: bool,
+                               status_url: str) -> Response:
+        """Queue a validation for the respond-async pattern, answering 202 with the status URL."""
+        def run() -> Dict[str, Any]:
+            return self._create_operation_outcome(validator.validate_resource(resource_data, verbose=verbose))
+            
+        try:
+            job = self.validation_jobs.submit(run)
+        except QueueFullError as e:
+            return self._throttled(e)
+        return JSONResponse(
+            status_code=202,
+            headers={"Content-Location": f"{status_url}/{job.id}"},
+            content={
+                "resourceType": "OperationOutcome",
+                "issue": [{"severity": "information", "code": "informational",
+                           "details": {"text": f"Validation job {job.id} accepted"}}]
+            }
+        )
+        
+    def _throttled(self, error: QueueFullError) -> Response:
+        """429 OperationOutcome asking the client to retry once a queue drains."""
+        return JSONResponse(status_code=429, headers={"Retry-After": "5"}, content={
+            "resourceType": "OperationOutcome",
+            "issue": [{"severity": "error", "code": "throttled", "details": {"text": str(error)}}]
+        })
+        
+    def _json_response(self, content: Dict[str, Any], status_code: int = 200) -> Response:
+        """JSON response encoded directly to bytes by the fast JSON codec."""
+        return Response(content=fast_json.dumps(content), status_code=status_code, media_type="application/json")
+        
+    def _error_outcome(self, code: str, text: str) -> Dict[str, Any]:
+        """OperationOutcome carrying a single error issue."""
+        return {
+            "resourceType": "OperationOutcome",
+            "issue": [{"severity": "error", "code": code, "details": {"text": text}}]
+        }
+        
     def _create_operation_outcome(self, validation_result: ValidationResult) -> Dict[str, Any]:
         """Create FHIR OperationOutcome from validation result."""
         issues = []
@@ -281,7 +579,7 @@ class FhirServer:
         }
 
 
-def create_server(resources_dir: str = "resources") -> FastAPI:
+def create_server(resources_dir: str = "resources", config: Optional[ServerConfig] = None) -> FastAPI:
     """Create and configure the FHIR server."""
-    server = FhirServer()
+    server = FhirServer(config)
     return server.app
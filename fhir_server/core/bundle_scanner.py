@@ -0,0 +1,130 @@
+"""
+PHCore Bundle Scanner
+Locates Bundle entries by byte offset so large bundles can be indexed without keeping them in memory.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+# Top-level elements kept with each entry header so the search index need not parse the entry
+HEADER_FIELDS = ('name', 'status', 'base', 'baseDefinition', 'code')
+
+
+@dataclass
+class BundleEntryHeader:
+    """Header fields and byte range of a single Bundle entry."""
+    resource_type: str
+    id: str
+    url: Optional[str]
+    version: Optional[str]
+    offset: int
+    length: int
+    # The HEADER_FIELDS present in the resource
+    fields: Dict[str, Any] = field(default_factory=dict)
+
+
+def _skip_ws(text: str, index: int) -> int:
+    return _whitespace.match(text, index).end()
+
+
+def _utf8(value: Any) -> Any:
+    """Undo the latin-1 decoding applied for byte-accurate offsets."""
+    if isinstance(value, str) and not value.isascii():
+        return value.encode('latin-1').decode('utf-8')
+    if isinstance(value, list):
+        return [_utf8(item) for item in value]
+    if isinstance(value, dict):
+        return {_utf8(key): _utf8(item) for key, item in value.items()}
+    return value
+
+
+def scan_bundle(data: bytes) -> Optional[List[BundleEntryHeader]]:
+    """
+    Scan a JSON document and return headers for its Bundle entries.
+
+    The bytes are decoded as latin-1 so string indices equal byte offsets;
+    structural JSON characters are ASCII, so UTF-8 content parses unchanged
+    and only header strings need re-decoding. Each entry is parsed once to
+    read its header and then discarded.
+
+    Args:
+        data: Raw file contents
+
+    Returns:
+        Entry headers in document order, or None if the document is not a Bundle
+        with an entry array
+    """
+    text = data.decode('latin-1')
+    index = _skip_ws(text, 0)
+    if text[index:index + 1] != '{':
+        return None
+    index = _skip_ws(text, index + 1)
+
+    resource_type = None
+    headers: Optional[List[BundleEntryHeader]] = None
+
+    while text[index:index + 1] != '}':
+        key, index = _decoder.raw_decode(text, index)
+        index = _skip_ws(text, index)
+        if text[index] != ':':
+            raise ValueError(f"Expected ':' at byte {index}")
+        index = _skip_ws(text, index + 1)
+
+        if key == 'entry' and text[index] == '[':
+            headers, index = _scan_entries(text, index)
+        else:
+            value, index = _decoder.raw_decode(text, index)
+            if key == 'resourceType':
+                resource_type = value
+
+        index = _skip_ws(text, index)
+        if text[index] == ',':
+            index = _skip_ws(text, index + 1)
+
+    if resource_type != 'Bundle' or headers is None:
+        return None
+    return headers
+
+
+def _scan_entries(text: str, index: int):
+    """Scan an entry array starting at '[' and return (headers, index after ']')."""
+    headers = []
+    index = _skip_ws(text, index + 1)
+
+    while text[index] != ']':
+        start = index
+        entry, index = _decoder.raw_decode(text, index)
+        resource = entry.get('resource') if isinstance(entry, dict) else None
+        if isinstance(resource, dict) and 'resourceType' in resource and 'id' in resource:
+            headers.append(BundleEntryHeader(
+                resource_type=_utf8(resource['resourceType']),
+                id=_utf8(resource['id']),
+                url=_utf8(resource.get('url')),
+                version=_utf8(resource.get('version')),
+                offset=start,
+                length=index - start,
+                fields={name: _utf8(resource[name]) for name in HEADER_FIELDS if name in resource}
+            ))
+        index = _skip_ws(text, index)
+        if text[index] == ',':
+            index = _skip_ws(text, index + 1)
+
+    return headers, index + 1
+
+
+def read_entry_resource(file_path: str, offset: int, length: int) -> Dict[str, Any]:
+    """Read and parse the resource of a single Bundle entry from its byte range."""
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        entry = json.loads(f.read(length))
+    return entry['resource']
+
+
+def parse_entry_resource(data: bytes, offset: int, length: int) -> Dict[str, Any]:
+    """Parse the resource of a single Bundle entry from its byte range in an in-memory document."""
+    return json.loads(data[offset:offset + length])['resource']
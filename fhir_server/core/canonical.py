@@ -0,0 +1,141 @@
+"""
+PHCore Canonical Index
+Resolves canonical references (url, url|version, url|partial-version) to versioned conformance resources.
+"""
+
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class CanonicalRef:
+    """A parsed canonical reference: url, optional |version and optional #fragment."""
+    url: str
+    version: Optional[str] = None
+    fragment: Optional[str] = None
+
+
+@lru_cache(maxsize=8192)
+def parse_canonical(reference: str) -> CanonicalRef:
+    """
+    Parse a canonical reference such as `http://x/StructureDefinition/y|1.0.0#frag`.
+
+    Results are cached, so resolving the same reference on the validation hot
+    path never splits the string again.
+    """
+    url, _, fragment = reference.partition('#')
+    url, _, version = url.partition('|')
+    return CanonicalRef(url=url, version=version or None, fragment=fragment or None)
+
+
+def _version_key(version: Optional[str]) -> Tuple:
+    """
+    Sort key for versions: numeric parts compare as numbers, a pre-release
+    (`2.0.0-ballot`) sorts before its release and unversioned sorts first.
+    """
+    if version is None:
+        return ((), 0, '')
+    release, _, prerelease = version.partition('-')
+    parts = tuple((0, int(part), '') if part.isdigit() else (1, 0, part) for part in release.split('.'))
+    return (parts, 0 if prerelease else 1, prerelease)
+
+
+class CanonicalIndex:
+    """
+    Versioned lookup table for canonical resources.
+
+    Every version of a canonical URL is kept. Lookups accept `url|version`,
+    a bare `url` (resolving to the latest version) or a partial version such
+    as `url|1` or `url|1.0` (resolving to the latest version with that
+    prefix, unless a version named exactly that exists). All resolvable
+    versions are precomputed on insert, so `get` is a cached parse plus two
+    dictionary lookups. When the same url|version is added twice, the later
+    value wins.
+
+    Mapping-style access (`get`, `in`, `[]`, iteration, `len`) works on
+    canonical references and iterates over the distinct bare URLs, so the
+    index can stand in for a plain url → value dictionary.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, Dict[Optional[str], Any]] = {}
+        # url -> {None: latest, full or partial version: value}; version strings are
+        # interned so "4.0.1", "4.0" and "4" are shared across every URL
+        self._resolved: Dict[str, Dict[Optional[str], Any]] = {}
+
+    def add(self, url: str, version: Optional[str], value: Any) -> None:
+        """Add or replace one version of a canonical resource."""
+        versions = self._versions.setdefault(url, {})
+        # Re-insert so a replaced version counts as the most recently added
+        versions.pop(version, None)
+        versions[version] = value
+        self._resolve_versions(url)
+
+    def _resolve_versions(self, url: str) -> None:
+        """Recompute the resolvable versions of one URL after its versions changed."""
+        # Ascending stable sort: the highest version (latest insertion on ties) is assigned last
+        resolved: Dict[Optional[str], Any] = {}
+        for version, value in sorted(self._versions[url].items(), key=lambda item: _version_key(item[0])):
+            resolved[None] = value
+            if version is None:
+                continue
+            parts = version.split('.')
+            for end in range(1, len(parts)):
+                resolved[sys.intern('.'.join(parts[:end]))] = value
+        # Exact versions go last, so `url|1.0` is version 1.0 even when 1.0.1 is loaded
+        for version, value in self._versions[url].items():
+            if version is not None:
+                resolved[sys.intern(version)] = value
+        self._resolved[url] = resolved
+
+    def get(self, reference: Optional[str], default: Any = None) -> Any:
+        """Resolve a canonical reference, ignoring any #fragment."""
+        if not reference:
+            return default
+        ref = parse_canonical(reference)
+        resolved = self._resolved.get(ref.url)
+        if resolved is None:
+            return default
+        return resolved.get(ref.version, default)
+
+    def versions(self, url: str) -> List[Optional[str]]:
+        """Known versions of a canonical URL, oldest first."""
+        return sorted(self._versions.get(url, {}), key=_version_key)
+
+    def keys(self) -> List[str]:
+        """Distinct canonical URLs."""
+        return list(self._versions)
+
+    def values(self) -> List[Any]:
+        """The latest value of every canonical URL."""
+        return [self._resolved[url][None] for url in self._versions]
+
+    def items(self) -> List[Tuple[str, Any]]:
+        """(url, latest value) pairs."""
+        return [(url, self._resolved[url][None]) for url in self._versions]
+
+    def all_values(self) -> Iterator[Any]:
+        """Every stored value, including superseded versions."""
+        for versions in self._versions.values():
+            yield from versions.values()
+
+    def __contains__(self, reference: object) -> bool:
+        return isinstance(reference, str) and self.get(reference) is not None
+
+    def __getitem__(self, reference: str) -> Any:
+        value = self.get(reference)
+        if value is None:
+            raise KeyError(reference)
+        return value
+
+    def __setitem__(self, reference: str, value: Any) -> None:
+        ref = parse_canonical(reference)
+        self.add(ref.url, ref.version, value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._versions)
+
+    def __len__(self) -> int:
+        return len(self._versions)
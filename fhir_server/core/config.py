@@ -0,0 +1,110 @@
+"""
+PHCore Server Configuration
+Runtime settings for the validation server, read from PHCORE_* environment variables.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+def _env_str(name: str, default: Optional[str]) -> Optional[str]:
+    """Read a string setting; an empty value disables optional paths."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value or None
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting (1/true/yes/on)."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting."""
+    value = os.environ.get(name)
+    if not value:
+        return default
+    return int(value)
+
+
+@dataclass
+class ServerConfig:
+    """Settings used to build the FHIR server."""
+    resources_dir: str = "resources/phcore"
+    base_resources_dir: str = "resources/fhir_base"
+    snapshot_path: Optional[str] = ".cache/registry.snapshot"
+    lazy_bundles: bool = False
+    lazy_cache_size: int = 512
+    loader_workers: int = 1
+    hot_reload: bool = True
+    reload_interval: float = 2.0
+    workers: int = 1
+    validation_engine: str = "plan"
+    terminology_db: Optional[str] = None
+    result_cache_size: int = 0
+    result_cache_mb: int = 64
+    result_cache_ttl: float = 300.0
+    bundle_workers: int = 1
+    bundle_parallel_min: int = 256
+    bulk_chunk_lines: int = 1000
+    async_workers: int = 2
+    async_queue_size: int = 100
+    async_job_ttl: float = 3600.0
+    job_db: Optional[str] = None
+    validation_executor: str = "thread"
+    validation_workers: int = 4
+    validation_queue_size: int = 64
+    representation_cache_mb: int = 64
+    search_page_size: int = 50
+
+    @classmethod
+    def from_env(cls) -> "ServerConfig":
+        """Build a configuration from environment variables, falling back to defaults."""
+        defaults = cls()
+        return cls(
+            resources_dir=os.environ.get("PHCORE_RESOURCES_DIR", defaults.resources_dir),
+            base_resources_dir=os.environ.get("PHCORE_BASE_RESOURCES_DIR", defaults.base_resources_dir),
+            snapshot_path=_env_str("PHCORE_SNAPSHOT_PATH", defaults.snapshot_path),
+            lazy_bundles=_env_bool("PHCORE_LAZY_BUNDLES", defaults.lazy_bundles),
+            lazy_cache_size=_env_int("PHCORE_LAZY_CACHE_SIZE", defaults.lazy_cache_size),
+            loader_workers=_env_int("PHCORE_LOADER_WORKERS", defaults.loader_workers),
+            hot_reload=_env_bool("PHCORE_HOT_RELOAD", defaults.hot_reload),
+            reload_interval=float(os.environ.get("PHCORE_RELOAD_INTERVAL", defaults.reload_interval)),
+            workers=_env_int("PHCORE_WORKERS", defaults.workers),
+            validation_engine=os.environ.get("PHCORE_VALIDATION_ENGINE", defaults.validation_engine),
+            terminology_db=_env_str("PHCORE_TERMINOLOGY_DB", defaults.terminology_db),
+            result_cache_size=_env_int("PHCORE_RESULT_CACHE_SIZE", defaults.result_cache_size),
+            result_cache_mb=_env_int("PHCORE_RESULT_CACHE_MB", defaults.result_cache_mb),
+            result_cache_ttl=float(os.environ.get("PHCORE_RESULT_CACHE_TTL", defaults.result_cache_ttl)),
+            bundle_workers=_env_int("PHCORE_BUNDLE_WORKERS", defaults.bundle_workers),
+            bundle_parallel_min=_env_int("PHCORE_BUNDLE_PARALLEL_MIN", defaults.bundle_parallel_min),
+            bulk_chunk_lines=_env_int("PHCORE_BULK_CHUNK_LINES", defaults.bulk_chunk_lines),
+            async_workers=_env_int("PHCORE_ASYNC_WORKERS", defaults.async_workers),
+            async_queue_size=_env_int("PHCORE_ASYNC_QUEUE_SIZE", defaults.async_queue_size),
+            async_job_ttl=float(os.environ.get("PHCORE_ASYNC_JOB_TTL", defaults.async_job_ttl)),
+            job_db=_env_str("PHCORE_JOB_DB", defaults.job_db),
+            validation_executor=os.environ.get("PHCORE_VALIDATION_EXECUTOR", defaults.validation_executor),
+            validation_workers=_env_int("PHCORE_VALIDATION_WORKERS", defaults.validation_workers),
+            validation_queue_size=_env_int("PHCORE_VALIDATION_QUEUE_SIZE", defaults.validation_queue_size),
+            representation_cache_mb=_env_int("PHCORE_REPRESENTATION_CACHE_MB", defaults.representation_cache_mb),
+            search_page_size=_env_int("PHCORE_SEARCH_PAGE_SIZE", defaults.search_page_size),
+        )
+
+    def job_store_path(self) -> Optional[str]:
+        """
+        SQLite file for asynchronous validation jobs, or None to keep them in memory.
+
+        Forked workers each run their own job queue and a status URL may reach
+        any of them, so with more than one worker jobs default to a file in the
+        cache directory next to the registry snapshot.
+        """
+        if self.job_db or self.workers <= 1:
+            return self.job_db
+        cache_dir = Path(self.snapshot_path).parent if self.snapshot_path else Path(".cache")
+        return str(cache_dir / "jobs.db")
@@ -0,0 +1,33 @@
+"""
+PHCore JSON Codec
+Decodes request bodies and encodes responses with orjson when it is installed, falling back to json.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is an optional speed-up
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+
+def loads(data: bytes) -> Any:
+    """Parse JSON from bytes or str; raises ValueError on malformed input."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any, sort_keys: bool = False) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes; unknown types are written as strings."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+        except TypeError:
+            # Integers beyond 64 bits and non-string keys are left to json
+            pass
+    return json.dumps(value, default=str, sort_keys=sort_keys, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
@@ -0,0 +1,62 @@
+"""
+PHCore String Interning
+Shares repeated registry strings (canonical URLs, type codes, element paths) across resources.
+"""
+
+import sys
+from typing import Dict, Any, Optional
+
+
+def intern_optional(value: Optional[str]) -> Optional[str]:
+    """Intern a string, passing through None and non-string values."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def intern_resource_strings(content: Dict[str, Any]) -> None:
+    """
+    Intern the strings of a resource that repeat across the registry, in place.
+
+    The canonical URL of every resource is interned. For StructureDefinitions
+    the element ids, paths, type codes and profile/binding canonicals of both
+    differential and snapshot are interned as well; these repeat across
+    thousands of elements of the base definitions.
+    """
+    if isinstance(content.get('url'), str):
+        content['url'] = sys.intern(content['url'])
+    if isinstance(content.get('resourceType'), str):
+        content['resourceType'] = sys.intern(content['resourceType'])
+
+    if content.get('resourceType') != 'StructureDefinition':
+        return
+
+    for key in ('type', 'baseDefinition'):
+        if isinstance(content.get(key), str):
+            content[key] = sys.intern(content[key])
+
+    for view in ('differential', 'snapshot'):
+        for element in content.get(view, {}).get('element', []):
+            _intern_element(element)
+
+
+def _intern_element(element: Dict[str, Any]) -> None:
+    """Intern the shared strings of one ElementDefinition."""
+    for key in ('id', 'path', 'sliceName'):
+        if isinstance(element.get(key), str):
+            element[key] = sys.intern(element[key])
+
+    base = element.get('base')
+    if isinstance(base, dict) and isinstance(base.get('path'), str):
+        base['path'] = sys.intern(base['path'])
+
+    for type_def in element.get('type', []):
+        if isinstance(type_def.get('code'), str):
+            type_def['code'] = sys.intern(type_def['code'])
+        for key in ('profile', 'targetProfile'):
+            if isinstance(type_def.get(key), list):
+                type_def[key] = [intern_optional(url) for url in type_def[key]]
+
+    binding = element.get('binding')
+    if isinstance(binding, dict) and isinstance(binding.get('valueSet'), str):
+        binding['valueSet'] = sys.intern(binding['valueSet'])
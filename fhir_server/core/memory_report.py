@@ -0,0 +1,86 @@
+"""
+PHCore Registry Memory Report
+Measures the memory held by the loaded registry, broken down by resource type.
+"""
+
+import sys
+from typing import Dict, List, Any
+
+from fhir_server.core.canonical import CanonicalIndex
+from fhir_server.core.resource_loader import ResourceLoader, FhirResource
+
+
+def _deep_size(root: Any, seen: set) -> int:
+    """Size of an object graph in bytes, skipping objects already counted in `seen`."""
+    total = 0
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        obj_id = id(obj)
+        if obj_id in seen:
+            continue
+        seen.add(obj_id)
+        total += sys.getsizeof(obj)
+
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, FhirResource):
+            stack.extend(getattr(obj, name) for name in FhirResource.__slots__)
+        elif isinstance(obj, CanonicalIndex):
+            stack.append(vars(obj))
+    return total
+
+
+def registry_memory_report(resource_loader: ResourceLoader) -> Dict[str, Dict[str, int]]:
+    """
+    Measure registry memory per resource type.
+
+    Every object is counted once. Strings shared between resources (interned
+    URLs, type codes, paths, source files) are attributed to the first
+    resource type that references them, so the totals add up to the real
+    footprint rather than double-counting shared data.
+
+    Returns:
+        {resource_type: {"count", "bytes", "bytes_per_resource"}} sorted by bytes,
+        plus an "_indexes" entry for the lookup dictionaries themselves
+    """
+    seen: set = set()
+    report: Dict[str, Dict[str, int]] = {}
+
+    for resource_type, resources in resource_loader.by_type.items():
+        size = sum(_deep_size(resource, seen) for resource in resources)
+        report[resource_type] = {
+            "count": len(resources),
+            "bytes": size,
+            "bytes_per_resource": size // len(resources) if resources else 0,
+        }
+
+    # Container overhead of the indexes (their entries were counted above)
+    index_bytes = 0
+    for index in (resource_loader.resources, resource_loader.by_type, resource_loader.files):
+        index_bytes += sys.getsizeof(index)
+        if index is resource_loader.resources:
+            index_bytes += sum(_deep_size(key, seen) for key in index.keys())
+    index_bytes += _deep_size(resource_loader.by_url, seen)
+    for resources in list(resource_loader.by_type.values()) + list(resource_loader.files.values()):
+        index_bytes += sys.getsizeof(resources)
+
+    ordered = dict(sorted(report.items(), key=lambda item: item[1]["bytes"], reverse=True))
+    ordered["_indexes"] = {"count": len(resource_loader.resources), "bytes": index_bytes, "bytes_per_resource": 0}
+    return ordered
+
+
+def format_memory_report(report: Dict[str, Dict[str, int]]) -> List[str]:
+    """Render a memory report as aligned text lines."""
+    lines = [f"{'Resource type':<28} {'Count':>7} {'Total KiB':>11} {'Bytes/res':>10}"]
+    total = 0
+    for resource_type, row in report.items():
+        total += row["bytes"]
+        lines.append(
+            f"{resource_type:<28} {row['count']:>7} {row['bytes'] / 1024:>11.1f} {row['bytes_per_resource']:>10}"
+        )
+    lines.append(f"{'Total':<28} {'':>7} {total / 1024:>11.1f}")
+    return lines
@@ -0,0 +1,115 @@
+"""
+PHCore FHIR Package Archives
+Reads resources from FHIR packages (.zip and NPM-style .tgz) in place, without unpacking them.
+"""
+
+import json
+import posixpath
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Any
+
+PACKAGE_SUFFIXES = ('.zip', '.tgz', '.tar.gz')
+NPM_INDEX = 'package/.index.json'
+
+# Package metadata and JSON schemas that are never FHIR resources
+_SKIPPED_NAMES = ('package.json', '.index.json')
+_SKIPPED_SUFFIXES = ('.schema.json',)
+
+
+def is_package(path: Path) -> bool:
+    """Whether a path names a package archive the loader can read."""
+    return path.name.endswith(PACKAGE_SUFFIXES)
+
+
+def _is_zip(path: Path) -> bool:
+    return path.name.endswith('.zip')
+
+
+def _is_resource_member(name: str) -> bool:
+    """
+    Whether an archive member holds resources.
+
+    Like an unpacked directory, only JSON files at the top level are read:
+    the archive root, or `package/` for NPM packages (so `package/example/`
+    and `package/other/` are skipped).
+    """
+    directory, filename = posixpath.split(name)
+    if directory not in ('', 'package') or not filename.endswith('.json'):
+        return False
+    return filename not in _SKIPPED_NAMES and not filename.endswith(_SKIPPED_SUFFIXES)
+
+
+def read_package_index(path: Path) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Read the NPM `package/.index.json` of an archive.
+
+    Returns:
+        {member name: {"resourceType", "id", "url", "version", ...}} for every
+        indexed file, or None if the archive has no usable index
+    """
+    try:
+        raw = read_package_member(path, NPM_INDEX)
+    except KeyError:
+        return None
+
+    index = json.loads(raw)
+    files = index.get('files')
+    if not isinstance(files, list):
+        return None
+    return {
+        f"package/{entry['filename']}": entry
+        for entry in files
+        if isinstance(entry, dict) and entry.get('filename') and _is_resource_member(f"package/{entry['filename']}")
+    }
+
+
+def iter_package_members(path: Path, names: Optional[List[str]] = None) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield (name, bytes) for resource members, in archive order.
+
+    Args:
+        path: Archive path
+        names: Only decompress these members; defaults to every resource member
+
+    Zip members are decompressed individually. A tarball is compressed as a
+    single stream, so it is read in one sequential pass and members that are
+    not wanted are skipped without being extracted.
+    """
+    wanted = set(names) if names is not None else None
+    if _is_zip(path):
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                if (name in wanted) if wanted is not None else _is_resource_member(name):
+                    yield name, archive.read(name)
+        return
+
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            if (member.name in wanted) if wanted is not None else _is_resource_member(member.name):
+                yield member.name, archive.extractfile(member).read()
+
+
+def read_package_member(path: Path, name: str) -> bytes:
+    """
+    Decompress a single member of an archive.
+
+    Zip members are located through the central directory. A tarball is one
+    compressed stream without an index, so it is read sequentially up to the
+    member and closed there; read several members with one
+    iter_package_members pass instead.
+
+    Raises:
+        KeyError: If the archive has no such member
+    """
+    if _is_zip(path):
+        with zipfile.ZipFile(path) as archive:
+            return archive.read(name)
+    with tarfile.open(path, 'r|*') as archive:
+        for member in archive:
+            if member.name == name and member.isfile():
+                return archive.extractfile(member).read()
+    raise KeyError(name)
@@ -0,0 +1,146 @@
+"""
+PHCore Resource Projections
+`_summary` and `_elements` views of resources for the read and search endpoints.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from fhir_server.core.resource_loader import ResourceLoader
+
+SUMMARY_MODES = ("true", "text", "data", "count", "false")
+
+# Tag marking a resource that was returned with elements left out
+SUBSETTED_TAG = {"system": "http://terminology.hl7.org/CodeSystem/v3-ObservationValue", "code": "SUBSETTED"}
+
+# Elements every projection keeps
+_ALWAYS = frozenset({"resourceType", "id", "meta"})
+
+# Summary (isSummary) and mandatory (min 1) top-level elements of the FHIR R4 conformance resources,
+# used when the base StructureDefinition of the type is not loaded
+_R4_ELEMENTS: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {
+    "StructureDefinition": (
+        frozenset({"url", "identifier", "version", "name", "title", "status", "experimental", "date", "publisher",
+                   "contact", "useContext", "jurisdiction", "keyword", "fhirVersion", "kind", "abstract", "context",
+                   "contextInvariant", "type", "baseDefinition", "derivation"}),
+        frozenset({"url", "name", "status", "kind", "abstract", "type"}),
+    ),
+    "ValueSet": (
+        frozenset({"url", "identifier", "version", "name", "title", "status", "experimental", "date", "publisher",
+                   "contact", "useContext", "jurisdiction", "immutable"}),
+        frozenset({"status"}),
+    ),
+    "CodeSystem": (
+        frozenset({"url", "identifier", "version", "name", "title", "status", "experimental", "date", "publisher",
+                   "contact", "useContext", "jurisdiction", "caseSensitive", "valueSet", "hierarchyMeaning",
+                   "compositional", "versionNeeded", "content", "supplements", "count"}),
+        frozenset({"status", "content"}),
+    ),
+    "SearchParameter": (
+        frozenset({"url", "version", "name", "derivedFrom", "status", "experimental", "date", "publisher",
+                   "contact", "description", "useContext", "jurisdiction", "code", "base", "type"}),
+        frozenset({"url", "name", "status", "description", "code", "base", "type"}),
+    ),
+    "ImplementationGuide": (
+        frozenset({"url", "version", "name", "title", "status", "experimental", "date", "publisher", "contact",
+                   "useContext", "jurisdiction", "packageId", "license", "fhirVersion", "dependsOn", "global"}),
+        frozenset({"url", "name", "status", "packageId", "fhirVersion"}),
+    ),
+    "ConceptMap": (
+        frozenset({"url", "identifier", "version", "name", "title", "status", "experimental", "date", "publisher",
+                   "contact", "useContext", "jurisdiction", "source[x]", "target[x]"}),
+        frozenset({"status"}),
+    ),
+    "NamingSystem": (
+        frozenset({"name", "status", "kind", "date", "publisher", "contact", "useContext", "jurisdiction",
+                   "uniqueId"}),
+        frozenset({"name", "status", "kind", "date", "uniqueId"}),
+    ),
+}
+
+
+class ProjectionError(ValueError):
+    """An invalid `_summary` or `_elements` value, or one the endpoint does not support."""
+
+
+@dataclass(frozen=True)
+class Projection:
+    """The view of a resource a request asked for; the default is the full resource."""
+    summary: str = "false"
+    elements: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def parse(cls, summary: Optional[str], elements: Optional[str]) -> "Projection":
+        """Projection for the `_summary` and `_elements` query parameters."""
+        if summary is not None and summary not in SUMMARY_MODES:
+            raise ProjectionError(f"_summary must be one of {', '.join(SUMMARY_MODES)}, got '{summary}'")
+        if summary not in (None, "false") and elements:
+            raise ProjectionError("_summary and _elements cannot be combined")
+        names = frozenset(name.strip() for name in (elements or "").split(',') if name.strip())
+        nested = sorted(name for name in names if '.' in name)
+        if nested:
+            raise ProjectionError(f"_elements only selects top-level elements, got {', '.join(nested)}")
+        return cls(summary or "false", names)
+
+    @property
+    def is_full(self) -> bool:
+        return self.summary == "false" and not self.elements
+
+
+def _type_elements(loader: ResourceLoader, resource_type: str) -> Optional[Tuple[FrozenSet[str], FrozenSet[str]]]:
+    """Summary and mandatory top-level element names of a resource type, or None if unknown."""
+    base = loader.get_resource_by_url(f"http://hl7.org/fhir/StructureDefinition/{resource_type}")
+    snapshot = ((base.content or {}).get("snapshot") or {}).get("element", []) if base else []
+    if snapshot:
+        prefix = f"{resource_type}."
+        top_level = [element for element in snapshot
+                     if element.get("path", "").startswith(prefix) and element["path"].count('.') == 1]
+        return (
+            frozenset(element["path"][len(prefix):] for element in top_level if element.get("isSummary")),
+            frozenset(element["path"][len(prefix):] for element in top_level if element.get("min", 0) > 0),
+        )
+    return _R4_ELEMENTS.get(resource_type)
+
+
+def _selects(names: FrozenSet[str], key: str) -> bool:
+    if key in names:
+        return True
+    # Choice elements such as source[x] select sourceUri, sourceCanonical...
+    return any(name.endswith("[x]") and key.startswith(name[:-3]) and key[len(name) - 3:len(name) - 2].isupper()
+               for name in names)
+
+
+def _subsetted(content: Dict[str, Any], keep) -> Dict[str, Any]:
+    projected = {key: value for key, value in content.items() if key in _ALWAYS or keep(key)}
+    meta = dict(projected.get("meta") or {})
+    meta["tag"] = [*meta.get("tag", []), SUBSETTED_TAG]
+    projected["meta"] = meta
+    return projected
+
+
+def project(loader: ResourceLoader, content: Dict[str, Any], projection: Projection) -> Dict[str, Any]:
+    """
+    The view of a resource selected by projection; the content is never modified.
+
+    Elements are selected at the top level and shared with the full
+    resource. Anything left out is flagged with the SUBSETTED tag.
+    `_summary=true` on a type whose summary elements are unknown returns
+    the resource unchanged, which FHIR allows.
+    """
+    if projection.is_full or projection.summary == "count":
+        return content
+    elements = _type_elements(loader, content.get("resourceType", ""))
+    summary, mandatory = elements if elements is not None else (None, frozenset())
+
+    if projection.elements:
+        wanted = projection.elements | mandatory
+        return _subsetted(content, lambda key: _selects(wanted, key))
+    if projection.summary == "data":
+        if "text" not in content:
+            return content
+        return _subsetted(content, lambda key: key != "text")
+    if projection.summary == "text":
+        return _subsetted(content, lambda key: key in ("text", "implicitRules") or _selects(mandatory, key))
+    if summary is None:
+        return content
+    return _subsetted(content, lambda key: key == "implicitRules" or _selects(summary, key))
@@ -0,0 +1,151 @@
+"""
+PHCore Registry Versions
+Immutable snapshots of the loaded IG with atomic hot reload when resource files change.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.core.search import SearchIndex
+from fhir_server.validation.validator import FhirValidator
+
+
+@dataclass(frozen=True)
+class RegistryVersion:
+    """A consistent pair of resource indexes and validator maps."""
+    version: int
+    resource_loader: ResourceLoader
+    validator: FhirValidator
+    loaded_at: float
+    # (mtime in nanoseconds, size) of every source file this version was built from
+    source_stats: Dict[str, Tuple[int, int]] = field(default_factory=dict, repr=False)
+    # Search parameter indexes over this version's resources
+    search_index: Optional[SearchIndex] = field(default=None, repr=False)
+
+    def info(self) -> Dict[str, object]:
+        """Summary of the version for status endpoints."""
+        return {
+            "version": self.version,
+            "loadedAt": datetime.fromtimestamp(self.loaded_at, tz=timezone.utc).isoformat(),
+            "resources": self.resource_loader.resource_count,
+            "files": len(self.source_stats),
+            "searchIndex": self.search_index.info() if self.search_index is not None else None,
+        }
+
+
+class RegistryManager:
+    """
+    Holds the current RegistryVersion and swaps in new versions on reload.
+
+    Request handlers read `current` once and use that version for the whole
+    request, so a swap never affects validations already in flight.
+    """
+
+    def __init__(self, resource_loader: ResourceLoader, validator: FhirValidator):
+        self._current = RegistryVersion(
+            version=1,
+            resource_loader=resource_loader,
+            validator=validator,
+            loaded_at=time.time(),
+            source_stats=resource_loader.source_stats(),
+            search_index=SearchIndex.build(resource_loader)
+        )
+        self._reload_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    @property
+    def current(self) -> RegistryVersion:
+        """The registry version new requests should use."""
+        return self._current
+
+    def changed_files(self) -> Tuple[Dict[str, Tuple[int, int]], List[str], List[str]]:
+        """
+        Compare source files on disk with the current version.
+
+        Returns:
+            Tuple of (current stats, changed or added files, removed files)
+        """
+        previous = self._current.source_stats
+        stats = self._current.resource_loader.source_stats()
+        changed = [path for path, stat in stats.items() if previous.get(path) != stat]
+        removed = [path for path in previous if path not in stats]
+        return stats, changed, removed
+
+    def reload(self) -> Optional[RegistryVersion]:
+        """
+        Rebuild the registry from changed files and atomically swap it in.
+
+        Returns:
+            The new RegistryVersion, or None if no source file changed
+        """
+        with self._reload_lock:
+            stats, changed, removed = self.changed_files()
+            if not changed and not removed:
+                return None
+
+            start = time.perf_counter()
+            previous = self._current
+            resource_loader = previous.resource_loader.reloaded(changed)
+            validator = FhirValidator(resource_loader, engine=previous.validator.engine,
+                                      terminology_store=previous.validator.terminology_store,
+                                      result_cache=previous.validator.result_cache,
+                                      bundle_pool=previous.validator.bundle_pool)
+            validator.inherit_compiled_state(previous.validator)
+
+            # Files that failed to parse keep their old stats so the next poll retries them
+            for path in resource_loader.load_errors:
+                if path in previous.source_stats:
+                    stats[path] = previous.source_stats[path]
+                else:
+                    stats.pop(path, None)
+
+            new_version = RegistryVersion(
+                version=previous.version + 1,
+                resource_loader=resource_loader,
+                validator=validator,
+                loaded_at=time.time(),
+                source_stats=stats,
+                search_index=SearchIndex(resource_loader)
+            )
+            self._current = new_version
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"🔄 Registry v{new_version.version} active in {elapsed_ms:.0f} ms "
+                  f"({len(changed)} changed, {len(removed)} removed)")
+
+        # Index and refresh the boot snapshot outside the swap path; searches wait for the index
+        new_version.search_index.ensure_built()
+        resource_loader.save_snapshot()
+        return new_version
+
+    def start_watching(self, interval: float = 2.0) -> None:
+        """Poll the resource directories in a background thread and reload on change."""
+        if self._watcher and self._watcher.is_alive():
+            return
+        self._stop_event.clear()
+        self._watcher = threading.Thread(
+            target=self._watch_loop,
+            args=(interval,),
+            name="phcore-registry-watcher",
+            daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        """Stop the background watcher."""
+        self._stop_event.set()
+        if self._watcher:
+            self._watcher.join(timeout=5)
+            self._watcher = None
+
+    def _watch_loop(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"⚠️ Registry reload failed: {e}")
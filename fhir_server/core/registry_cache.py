@@ -0,0 +1,83 @@
+"""
+PHCore Registry Snapshot Cache
+Persists the fully indexed resource registry to disk so warm boots skip JSON parsing.
+"""
+
+import os
+import pickle
+import struct
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple, Iterable
+
+# Bump whenever the pickled registry layout changes so stale snapshots are ignored
+SNAPSHOT_FORMAT = 11
+SNAPSHOT_MAGIC = b"PHCSNAP"
+
+
+def source_fingerprint(files: Iterable[Path], options: Tuple[Any, ...] = ()) -> Tuple[Any, ...]:
+    """
+    Build the cache key for a set of source files.
+
+    Args:
+        files: Source files the registry is built from, in load order
+        options: Loader options that change the indexed result
+
+    Returns:
+        Key combining format version, options and (path, mtime, size) per file
+    """
+    entries = []
+    for file_path in files:
+        stat = os.stat(file_path)
+        entries.append((str(file_path), stat.st_mtime_ns, stat.st_size))
+    return (SNAPSHOT_FORMAT, tuple(options), tuple(entries))
+
+
+def save_snapshot(snapshot_path: Path, fingerprint: Tuple[Any, ...], state: Dict[str, Any]) -> None:
+    """
+    Write a registry snapshot atomically.
+
+    The file starts with a small header holding the fingerprint so a stale
+    snapshot can be rejected without unpickling the registry itself.
+    """
+    snapshot_path = Path(snapshot_path)
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+
+    header = pickle.dumps(fingerprint, protocol=pickle.HIGHEST_PROTOCOL)
+    payload = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        f.write(payload)
+    os.replace(tmp_path, snapshot_path)
+
+
+def load_snapshot(snapshot_path: Path, fingerprint: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    """
+    Load a registry snapshot in a single read.
+
+    Returns:
+        The stored registry state, or None if the snapshot is missing, corrupt
+        or was built from different source files
+    """
+    try:
+        with open(snapshot_path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    try:
+        if not data.startswith(SNAPSHOT_MAGIC):
+            return None
+        offset = len(SNAPSHOT_MAGIC)
+        (header_length,) = struct.unpack_from('<Q', data, offset)
+        offset += 8
+        stored_fingerprint = pickle.loads(data[offset:offset + header_length])
+        if stored_fingerprint != fingerprint:
+            return None
+        return pickle.loads(memoryview(data)[offset + header_length:])
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable registry snapshot {snapshot_path}: {e}")
+        return None
@@ -5,87 +5,397 @@ Loads and indexes FHIR resources from the resources directory.
 
 import json
 import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, Tuple
+from dataclasses import dataclass, replace
 
+from fhir_server.core.bundle_scanner import scan_bundle, read_entry_resource, parse_entry_resource
+from fhir_server.core.canonical import CanonicalIndex
+from fhir_server.core.interning import intern_optional, intern_resource_strings
+from fhir_server.core.packages import (
+    PACKAGE_SUFFIXES, is_package, read_package_index, iter_package_members, read_package_member
+)
+from fhir_server.core.registry_cache import source_fingerprint, load_snapshot, save_snapshot
 
-@dataclass
+
+@dataclass(slots=True)
 class FhirResource:
-    """Represents a FHIR resource with metadata."""
+    """Represents a FHIR resource with metadata; slotted to keep large registries compact."""
     id: str
     resource_type: str
     url: Optional[str]
-    content: Dict[str, Any]
+    content: Optional[Dict[str, Any]]
     source_file: str
+    # Byte range of the Bundle entry in source_file for lazily indexed resources
+    offset: int = -1
+    length: int = 0
+    version: Optional[str] = None
+    # Archive member holding the resource when source_file is a package archive
+    member: Optional[str] = None
+    # Header fields (bundle_scanner.HEADER_FIELDS) of a lazily indexed entry, None when it was indexed without them
+    header_fields: Optional[Dict[str, Any]] = None
+    
+    @property
+    def is_loaded(self) -> bool:
+        """Whether the resource content is held in memory."""
+        return self.content is not None
 
 
 class ResourceLoader:
     """Loads and manages FHIR resources from the resources directory."""
     
-    def __init__(self, resources_dir: str = "resources/phcore", base_resources_dir: str = "resources/fhir_base"):
+    def __init__(self, resources_dir: str = "resources/phcore", base_resources_dir: str = "resources/fhir_base",
+                 snapshot_path: Optional[str] = None, lazy: bool = False, lazy_cache_size: int = 512,
+                 workers: int = 1, on_demand_types: Tuple[str, ...] = ()):
         self.resources_dir = Path(resources_dir)
         self.base_resources_dir = Path(base_resources_dir)
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        # In lazy mode Bundle entries are indexed by header and parsed on first access
+        self.lazy = lazy
+        self.lazy_cache_size = lazy_cache_size
+        # Types indexed by header only and read from their source on access, such as
+        # CodeSystems compiled into a terminology store
+        self.on_demand_types = tuple(on_demand_types)
+        self._content_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._content_lock = threading.Lock()
+        # Last decompressed package members, shared by lazy entries of the same member
+        self._member_cache: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        # Number of processes used to parse source files; 1 parses in-process
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.load_timings: Dict[str, float] = {}
         self.resources: Dict[str, FhirResource] = {}
         self.by_type: Dict[str, List[FhirResource]] = {}
-        self.by_url: Dict[str, FhirResource] = {}
+        # Every version of each canonical URL; resolves url, url|version and partial versions
+        self.by_url = CanonicalIndex()
+        # Resources parsed from each source file, in load order
+        self.files: Dict[str, List[FhirResource]] = {}
+        # Shared source-file path strings referenced by every resource
+        self.source_files: Dict[str, str] = {}
+        self.load_errors: Dict[str, str] = {}
+        # Derived conformance maps registered by FhirValidator, persisted with the snapshot
+        self.conformance_index: Optional[Dict[str, Dict[str, Any]]] = None
+        self.loaded_from_snapshot = False
+        # Snapshot key of the source files as they were when this registry was read; worker
+        # processes compare it to tell whether they loaded the same registry version
+        self.fingerprint: Optional[Tuple[Any, ...]] = None
+        self._loaded_count = 0
         
     def load_all_resources(self) -> int:
-        """Load all FHIR resources from both directories."""
+        """Load all FHIR resources from both directories, using the snapshot cache when fresh."""
+        self.fingerprint = self._snapshot_fingerprint()
+        if self.snapshot_path and self._restore_from_snapshot():
+            self._print_resource_summary()
+            return self._loaded_count
+            
+        # Discover source files in load order (PHCore first, then base FHIR)
+        start = time.perf_counter()
+        files = self._source_files()
+        discovered = time.perf_counter()
+        
+        # Parse files, optionally across a process pool
+        if self.workers > 1 and len(files) > 1:
+            parsed = self._parse_files_parallel(files)
+        else:
+            parsed = [_parse_file_job(str(file_path), self.lazy, self.on_demand_types) for file_path in files]
+        parsed_at = time.perf_counter()
+        
+        # Merge partial indexes in file order so later files win on duplicates
         count = 0
+        for file_path, resources, error in parsed:
+            if error:
+                print(f"⚠️ Error loading {file_path}: {error}")
+                self.load_errors[file_path] = error
+                continue
+            self._index_file(file_path, resources)
+            count += len(resources)
+        indexed = time.perf_counter()
         
-        # Load PHCore resources
-        if self.resources_dir.exists():
-            count += self._load_from_directory(self.resources_dir)
-            
-        # Load base FHIR resources
-        if self.base_resources_dir.exists():
-            count += self._load_from_directory(self.base_resources_dir)
-            
+        self.load_timings = {
+            "discover": discovered - start,
+            "parse": parsed_at - discovered,
+            "index": indexed - parsed_at,
+        }
+        self._loaded_count = count
         self._print_resource_summary()
         return count
         
-    def _load_from_directory(self, directory: Path) -> int:
-        """Load resources from a specific directory."""
+    def _parse_files_parallel(self, files: List[Path]) -> List[Tuple[str, List[FhirResource], Optional[str]]]:
+        """Parse files on a process pool, returning results in submission order."""
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(_parse_file_job, [str(f) for f in files], [self.lazy] * len(files),
+                                     [self.on_demand_types] * len(files)))
+        
+    def reloaded(self, changed_files: List[str]) -> "ResourceLoader":
+        """
+        Build a new loader that re-parses only the given files.
+        
+        Unchanged files reuse their already parsed resources and deleted files
+        are dropped; this loader is left untouched so in-flight requests keep
+        a consistent view. A changed file that fails to parse keeps its
+        previous resources and is reported in load_errors.
+        
+        Args:
+            changed_files: Paths of source files that were added or modified
+            
+        Returns:
+            A new, fully indexed ResourceLoader
+        """
+        loader = ResourceLoader(
+            str(self.resources_dir),
+            str(self.base_resources_dir),
+            snapshot_path=str(self.snapshot_path) if self.snapshot_path else None,
+            lazy=self.lazy,
+            lazy_cache_size=self.lazy_cache_size,
+            workers=self.workers,
+            on_demand_types=self.on_demand_types
+        )
+        loader.fingerprint = loader._snapshot_fingerprint()
+        changed = set(changed_files)
+        
         count = 0
-        for file_path in directory.glob("*.json"):
+        for file_path in self._source_files():
+            key = str(file_path)
+            resources = self.files.get(key)
+            if key in changed or resources is None:
+                _, parsed, error = _parse_file_job(key, self.lazy, self.on_demand_types)
+                if error:
+                    print(f"⚠️ Error reloading {key}: {error}")
+                    loader.load_errors[key] = error
+                    if resources is None:
+                        continue
+                else:
+                    resources = parsed
+            loader._index_file(key, resources)
+            count += len(resources)
+            
+        loader._loaded_count = count
+        return loader
+        
+    def source_stats(self) -> Dict[str, Tuple[int, int]]:
+        """Current (mtime in nanoseconds, size) of every source file on disk."""
+        stats = {}
+        for file_path in self._source_files():
             try:
-                resources = self._load_resource_file(file_path)
-                count += len(resources)
-            except Exception as e:
-                print(f"⚠️ Error loading {file_path}: {e}")
-        return count
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            stats[str(file_path)] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+        
+    @property
+    def resource_count(self) -> int:
+        """Number of resources loaded from the source files."""
+        return self._loaded_count
         
-    def _load_resource_file(self, file_path: Path) -> List[FhirResource]:
-        """Load a single JSON file and return list of resources."""
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+    def _source_files(self) -> List[Path]:
+        """List the source files of both directories in load order."""
+        files = []
+        for directory in (self.resources_dir, self.base_resources_dir):
+            if directory.exists():
+                files.extend(self._directory_files(directory))
+        return files
         
+    def _directory_files(self, directory: Path) -> List[Path]:
+        """List the JSON files and package archives of a directory in a stable order."""
+        files = list(directory.glob("*.json"))
+        for suffix in PACKAGE_SUFFIXES:
+            files.extend(directory.glob(f"*{suffix}"))
+        return sorted(set(files))
+        
+    def _snapshot_fingerprint(self):
+        """Cache key for the snapshot of the current source files."""
+        return source_fingerprint(self._source_files(), options=(self.lazy, self.on_demand_types))
+        
+    def _restore_from_snapshot(self) -> bool:
+        """Restore the indexed registry from the snapshot if it matches the source files."""
+        start = time.perf_counter()
+        state = load_snapshot(self.snapshot_path, self.fingerprint)
+        if state is None:
+            return False
+            
+        self.resources = state["resources"]
+        self.by_type = state["by_type"]
+        self.by_url = state["by_url"]
+        self.files = state["files"]
+        self.source_files = {path: path for path in self.files}
+        self.conformance_index = state["conformance_index"]
+        self._loaded_count = state["count"]
+        self._content_cache.clear()
+        self.loaded_from_snapshot = True
+        
+        elapsed = time.perf_counter() - start
+        self.load_timings = {"snapshot": elapsed}
+        print(f"⚡ Restored registry snapshot {self.snapshot_path} in {elapsed * 1000:.0f} ms")
+        return True
+        
+    def save_snapshot(self) -> bool:
+        """Persist the indexed registry, including validator conformance maps, to the snapshot file."""
+        if not self.snapshot_path:
+            return False
+            
+        state = {
+            "resources": self.resources,
+            "by_type": self.by_type,
+            "by_url": self.by_url,
+            "files": self.files,
+            "conformance_index": self.conformance_index,
+            "count": self._loaded_count,
+        }
+        try:
+            # Keyed by the files the registry was read from, so a later edit is not masked
+            save_snapshot(self.snapshot_path, self.fingerprint or self._snapshot_fingerprint(), state)
+        except Exception as e:
+            print(f"⚠️ Could not write registry snapshot {self.snapshot_path}: {e}")
+            return False
+        return True
+        
+    @staticmethod
+    def _parse_resource_file(file_path: Path, lazy: bool = False,
+                             on_demand_types: Tuple[str, ...] = ()) -> List[FhirResource]:
+        """Parse a single JSON file or package archive into a list of unindexed resources."""
+        if is_package(file_path):
+            return ResourceLoader._parse_package(file_path, lazy, on_demand_types)
+            
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+            
+        if lazy:
+            resources = ResourceLoader._scan_resource_bytes(raw, sys.intern(str(file_path)))
+        else:
+            resources = ResourceLoader._resources_from_data(json.loads(raw), file_path)
+        return ResourceLoader._defer_contents(resources, raw, None, on_demand_types)
+        
+    @staticmethod
+    def _parse_package(file_path: Path, lazy: bool = False,
+                       on_demand_types: Tuple[str, ...] = ()) -> List[FhirResource]:
+        """
+        Parse the resource members of a package archive without unpacking it.
+        
+        In lazy mode an NPM `package/.index.json` supplies every header, so no
+        resource member is decompressed until first access; without an index,
+        Bundle members are scanned for entry headers like plain files.
+        """
+        source_file = sys.intern(str(file_path))
+        if lazy:
+            index = read_package_index(file_path)
+            if index is not None:
+                # Bundles are indexed by their entries, so only those members are decompressed
+                bundles = [member for member, header in index.items() if header.get('resourceType') == 'Bundle']
+                bundle_data = dict(iter_package_members(file_path, bundles)) if bundles else {}
+                resources = []
+                for member, header in index.items():
+                    if member in bundle_data:
+                        resources.extend(ResourceLoader._scan_resource_bytes(bundle_data[member], source_file, sys.intern(member)))
+                    elif header.get('resourceType') and header.get('id'):
+                        resources.append(FhirResource(
+                            id=header['id'],
+                            resource_type=sys.intern(header['resourceType']),
+                            url=intern_optional(header.get('url')),
+                            content=None,
+                            source_file=source_file,
+                            version=intern_optional(header.get('version')),
+                            member=sys.intern(member)
+                        ))
+                return resources
+                
+        resources = []
+        for member, raw in iter_package_members(file_path):
+            if lazy:
+                parsed = ResourceLoader._scan_resource_bytes(raw, source_file, sys.intern(member))
+            else:
+                parsed = ResourceLoader._resources_from_data(json.loads(raw), file_path)
+            resources.extend(ResourceLoader._defer_contents(parsed, raw, sys.intern(member), on_demand_types))
+        return resources
+        
+    @staticmethod
+    def _scan_resource_bytes(raw: bytes, source_file: str, member: Optional[str] = None) -> List[FhirResource]:
+        """Index a document by Bundle entry headers, loading single resources fully."""
+        headers = scan_bundle(raw)
+        if headers is None:
+            # Single resources are small; keep them fully loaded
+            return ResourceLoader._resources_from_data(json.loads(raw), Path(source_file))
+            
+        return [
+            FhirResource(
+                id=header.id,
+                resource_type=sys.intern(header.resource_type),
+                url=intern_optional(header.url),
+                content=None,
+                source_file=source_file,
+                offset=header.offset,
+                length=header.length,
+                version=intern_optional(header.version),
+                member=member,
+                header_fields={name: intern_optional(value) for name, value in header.fields.items()}
+            )
+            for header in headers
+        ]
+        
+    @staticmethod
+    def _defer_contents(resources: List[FhirResource], raw: bytes, member: Optional[str],
+                        on_demand_types: Tuple[str, ...]) -> List[FhirResource]:
+        """
+        Drop the parsed content of on-demand types, keeping their headers.
+        
+        Bundle entries keep their byte range in the document, so reading one
+        parses only that entry; a single resource is re-read from its file or
+        archive member.
+        """
+        deferred = [resource for resource in resources
+                    if resource.resource_type in on_demand_types and resource.content is not None]
+        if not deferred:
+            return resources
+            
+        headers = scan_bundle(raw)
+        entries = {(header.resource_type, header.id): header for header in headers or ()}
+        for resource in deferred:
+            if headers is None:
+                resource.content = None
+                resource.member = member
+                continue
+            header = entries.get((resource.resource_type, resource.id))
+            if header is not None:
+                resource.content = None
+                resource.member = member
+                resource.offset = header.offset
+                resource.length = header.length
+                resource.header_fields = {name: intern_optional(value) for name, value in header.fields.items()}
+        return resources
+        
+    @staticmethod
+    def _resources_from_data(data: Dict[str, Any], file_path: Path) -> List[FhirResource]:
+        """Create resources from parsed file contents."""
         resources = []
+        source_file = sys.intern(str(file_path))
         
         # Handle Bundle resources (like valuesets.json)
         if data.get("resourceType") == "Bundle" and "entry" in data:
             for entry in data["entry"]:
                 if "resource" in entry:
                     resource_data = entry["resource"]
-                    resource = self._create_fhir_resource(resource_data, str(file_path))
+                    resource = ResourceLoader._create_fhir_resource(resource_data, source_file)
                     if resource:
                         resources.append(resource)
-                        self._index_resource(resource)
         else:
             # Handle single resources
-            resource = self._create_fhir_resource(data, str(file_path))
+            resource = ResourceLoader._create_fhir_resource(data, source_file)
             if resource:
                 resources.append(resource)
-                self._index_resource(resource)
                 
         return resources
         
-    def _create_fhir_resource(self, data: Dict[str, Any], source_file: str) -> Optional[FhirResource]:
+    @staticmethod
+    def _create_fhir_resource(data: Dict[str, Any], source_file: str) -> Optional[FhirResource]:
         """Create a FhirResource from JSON data."""
         if "resourceType" not in data or "id" not in data:
             return None
             
+        intern_resource_strings(data)
         resource_type = data["resourceType"]
         resource_id = data["id"]
         url = data.get("url")
@@ -95,9 +405,20 @@ class ResourceLoader:
             resource_type=resource_type,
             url=url,
             content=data,
-            source_file=source_file
+            source_file=source_file,
+            version=intern_optional(data.get("version"))
         )
         
+    def _index_file(self, file_path: str, resources: List[FhirResource]) -> None:
+        """Index all resources parsed from one source file."""
+        # Resources parsed in worker processes arrive with their own path copies;
+        # point them all at the loader's shared source-file string
+        source_file = self.source_files.setdefault(file_path, sys.intern(file_path))
+        self.files[source_file] = resources
+        for resource in resources:
+            resource.source_file = source_file
+            self._index_resource(resource)
+            
     def _index_resource(self, resource: FhirResource):
         """Index a resource for quick lookup."""
         # Index by composite key ResourceType/id for uniqueness across types
@@ -109,29 +430,110 @@ class ResourceLoader:
             self.by_type[resource.resource_type] = []
         self.by_type[resource.resource_type].append(resource)
         
-        # Index by URL if available
+        # Index by canonical URL and version if available
         if resource.url:
-            self.by_url[resource.url] = resource
+            self.by_url.add(resource.url, resource.version, resource)
             
     def get_resource(self, resource_type: str, resource_id: str) -> Optional[FhirResource]:
         """Get a resource by type and ID."""
         key = f"{resource_type}/{resource_id}"
-        return self.resources.get(key)
+        return self._materialize(self.resources.get(key))
         
     def get_resources_by_type(self, resource_type: str) -> List[FhirResource]:
         """Get all resources of a specific type."""
-        return self.by_type.get(resource_type, [])
+        resources = self.by_type.get(resource_type, [])
+        if not self.lazy and resource_type not in self.on_demand_types:
+            return resources
+        return [self._materialize(resource) for resource in resources]
+        
+    def get_resources_at(self, resource_type: str, positions: List[int]) -> List[FhirResource]:
+        """Get resources of a type by position in `by_type`, parsing only those positions when lazy."""
+        resources = self.by_type.get(resource_type, [])
+        return [self._materialize(resources[position]) for position in positions]
         
     def get_resource_by_url(self, url: str) -> Optional[FhirResource]:
-        """Get a resource by its canonical URL."""
-        return self.by_url.get(url)
+        """Get a resource by canonical reference: url (latest version), url|version or url|partial-version."""
+        return self._materialize(self.by_url.get(url))
         
     def get_all_resources(self) -> List[FhirResource]:
         """Get all loaded resources."""
-        return list(self.resources.values())
+        return [self._materialize(resource) for resource in self.resources.values()]
+        
+    def load_content(self, resource: FhirResource) -> Dict[str, Any]:
+        """Content of a resource, parsing a lazily indexed entry without adding it to the LRU."""
+        if resource.content is not None:
+            return resource.content
+            
+        with self._content_lock:
+            content = self._content_cache.get(self._content_key(resource))
+        return content if content is not None else self._read_lazy_resource(resource)
+        
+    def _materialize(self, resource: Optional[FhirResource]) -> Optional[FhirResource]:
+        """Return the resource with its content loaded, parsing lazily indexed entries through the LRU."""
+        if resource is None or resource.content is not None:
+            return resource
+            
+        key = self._content_key(resource)
+        with self._content_lock:
+            content = self._content_cache.get(key)
+            if content is not None:
+                self._content_cache.move_to_end(key)
+                
+        if content is None:
+            content = self._read_lazy_resource(resource)
+            intern_resource_strings(content)
+            with self._content_lock:
+                self._content_cache[key] = content
+                while len(self._content_cache) > self.lazy_cache_size:
+                    self._content_cache.popitem(last=False)
+                    
+        return replace(resource, content=content)
+        
+    @staticmethod
+    def _content_key(resource: FhirResource) -> str:
+        return f"{resource.resource_type}/{resource.id}@{resource.source_file}!{resource.member}:{resource.offset}"
+        
+    def _read_lazy_resource(self, resource: FhirResource) -> Dict[str, Any]:
+        """Parse a lazily indexed resource from its source file or archive member."""
+        if resource.member is not None:
+            return self._read_member_resource(resource)
+        if resource.offset < 0:
+            with open(resource.source_file, 'rb') as f:
+                return json.loads(f.read())
+        return read_entry_resource(resource.source_file, resource.offset, resource.length)
+        
+    def _read_member_resource(self, resource: FhirResource) -> Dict[str, Any]:
+        """Parse a lazily indexed resource from its package archive member."""
+        key = (resource.source_file, resource.member)
+        with self._content_lock:
+            raw = self._member_cache.get(key)
+            
+        if raw is None:
+            raw = read_package_member(Path(resource.source_file), resource.member)
+            with self._content_lock:
+                self._member_cache[key] = raw
+                # Consecutive entries usually come from the same Bundle member
+                while len(self._member_cache) > 2:
+                    self._member_cache.popitem(last=False)
+                    
+        if resource.offset >= 0:
+            return parse_entry_resource(raw, resource.offset, resource.length)
+        return json.loads(raw)
         
     def _print_resource_summary(self) -> None:
         """Print a summary of loaded resources."""
         print("\nResource Summary:")
         for resource_type, resources in self.by_type.items():
             print(f"  {resource_type}: {len(resources)}")
+        if self.load_timings:
+            phases = ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in self.load_timings.items())
+            print(f"⏱️ Load phases: {phases}")
+
+
+def _parse_file_job(file_path: str, lazy: bool,
+                    on_demand_types: Tuple[str, ...] = ()) -> Tuple[str, List[FhirResource], Optional[str]]:
+    """Parse one source file; runs in the loader's process pool, so errors are returned, not raised."""
+    try:
+        return file_path, ResourceLoader._parse_resource_file(Path(file_path), lazy, on_demand_types), None
+    except Exception as e:
+        return file_path, [], str(e)
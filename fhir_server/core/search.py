@@ -0,0 +1,337 @@
+"""
+PHCore Search Index
+Per-type indexes of the common FHIR search parameters, built once per registry version.
+"""
+
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from fhir_server.core.bundle_scanner import HEADER_FIELDS
+from fhir_server.core.resource_loader import FhirResource, ResourceLoader
+from fhir_server.validation.fhirpath import CompiledExpression, FhirPathError, compile_expression
+
+# Search parameter codes served from the index; definitions come from the loaded SearchParameters
+SUPPORTED_PARAMETERS = ("_id", "url", "name", "version", "status", "base")
+
+# Parameters that shape the result rather than select resources
+RESULT_PARAMETERS = ("_count", "_offset", "_summary", "_elements", "_format", "_pretty")
+
+# Largest page a search may request with _count
+MAX_PAGE_SIZE = 1000
+
+# Parameter types and the modifiers accepted for each
+SEARCH_MODIFIERS = {
+    "string": ("", "exact"),
+    "token": ("",),
+    "uri": ("",),
+    "reference": ("",),
+}
+
+# Expression prefixes that apply to every resource type
+_ANY_TYPE_BASES = ("Resource", "DomainResource")
+
+# Top-level elements available on a lazily indexed entry without parsing it
+_HEADER_ELEMENTS = frozenset(("resourceType", "id", "url", "version", *HEADER_FIELDS))
+
+_PLAIN_PATH = re.compile(r'[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*')
+
+
+class SearchError(ValueError):
+    """A search the index cannot answer: unknown parameter, modifier or value."""
+
+
+def normalize_string(value: str) -> str:
+    """Case- and accent-insensitive form used for string parameters."""
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+def _string_values(values: Iterable[Any]) -> List[str]:
+    out: List[str] = []
+    for value in values:
+        if isinstance(value, str):
+            out.append(value)
+        elif isinstance(value, dict):
+            # HumanName, Address and the like match on any of their string parts
+            for key, child in value.items():
+                if not key.startswith('_') and key != 'extension':
+                    out.extend(_string_values(child if isinstance(child, list) else [child]))
+    return out
+
+
+def _token_values(values: Iterable[Any]) -> List[str]:
+    out: List[str] = []
+    for value in values:
+        if isinstance(value, (str, bool, int)):
+            out.append(str(value).lower() if isinstance(value, bool) else str(value))
+        elif isinstance(value, dict):
+            if 'code' in value:
+                out.append(str(value['code']))
+            elif 'value' in value:
+                out.append(str(value['value']))
+            out.extend(_token_values(value.get('coding', [])))
+    return out
+
+
+def _reference_values(values: Iterable[Any]) -> List[str]:
+    out: List[str] = []
+    for value in values:
+        if isinstance(value, str):
+            out.append(value)
+        elif isinstance(value, dict) and isinstance(value.get('reference'), str):
+            out.append(value['reference'])
+    return out
+
+
+_EXTRACTORS = {
+    "string": _string_values,
+    "token": _token_values,
+    "uri": lambda values: [value for value in values if isinstance(value, str)],
+    "reference": _reference_values,
+}
+
+
+@dataclass(frozen=True)
+class SearchParameterDef:
+    """A supported search parameter as it applies to one resource type."""
+    code: str
+    type: str
+    expression: CompiledExpression
+    definition: str
+    # Top-level elements the expression reads, None when it is not a union of plain paths
+    fields: Optional[FrozenSet[str]] = None
+
+    def values(self, content: Dict[str, Any]) -> List[str]:
+        """Indexable values of the parameter in a resource."""
+        return _EXTRACTORS[self.type](self.expression.evaluate(content))
+
+
+def _type_expression(expression: str, resource_type: str) -> Optional[str]:
+    """The parts of a union expression that apply to resource_type, with the type prefix removed."""
+    parts = []
+    for part in expression.split('|'):
+        part = part.strip()
+        for prefix in (resource_type, *_ANY_TYPE_BASES):
+            if part.startswith(prefix + '.'):
+                parts.append(part[len(prefix) + 1:])
+                break
+        else:
+            if part and part[0].islower():
+                parts.append(part)
+    return ' | '.join(parts) or None
+
+
+def _expression_fields(expression: str) -> Optional[FrozenSet[str]]:
+    """Top-level elements read by a union of plain paths such as `name | title.value`."""
+    parts = [part.strip() for part in expression.split('|')]
+    if not all(_PLAIN_PATH.fullmatch(part) for part in parts):
+        return None
+    return frozenset(part.split('.', 1)[0] for part in parts)
+
+
+def _parameter_definitions(loader: ResourceLoader,
+                           resource_types: Iterable[str]) -> Dict[str, Dict[str, SearchParameterDef]]:
+    """Supported parameters per resource type from the loaded SearchParameter resources."""
+    wanted = set(resource_types)
+    definitions: Dict[str, Dict[str, SearchParameterDef]] = {resource_type: {} for resource_type in wanted}
+    for search_parameter in loader.by_type.get("SearchParameter", []):
+        header = search_parameter.header_fields
+        if search_parameter.content is None and header is not None and header.get("code") not in SUPPORTED_PARAMETERS:
+            continue
+        content = loader.load_content(search_parameter)
+        code, param_type = content.get("code"), content.get("type")
+        if code not in SUPPORTED_PARAMETERS or param_type not in SEARCH_MODIFIERS or not content.get("expression"):
+            continue
+        bases = content.get("base", [])
+        targets = wanted if any(base in _ANY_TYPE_BASES for base in bases) else wanted.intersection(bases)
+        for resource_type in targets:
+            if code in definitions[resource_type]:
+                continue
+            expression = _type_expression(content["expression"], resource_type)
+            if expression is None:
+                continue
+            try:
+                compiled = compile_expression(expression)
+            except FhirPathError:
+                continue
+            definitions[resource_type][code] = SearchParameterDef(
+                code, param_type, compiled, content.get("url") or search_parameter.id, _expression_fields(expression)
+            )
+    return definitions
+
+
+def _indexed_content(loader: ResourceLoader, resource: FhirResource,
+                     fields: Optional[FrozenSet[str]]) -> Dict[str, Any]:
+    """
+    The content the index reads from a resource.
+
+    A lazily indexed entry whose header carries every field the type's
+    parameters read is indexed from the header alone; anything else is
+    parsed without going through the loader's LRU.
+    """
+    if resource.content is not None:
+        return resource.content
+    if fields is not None and resource.header_fields is not None and fields <= _HEADER_ELEMENTS:
+        content = {"resourceType": resource.resource_type, "id": resource.id}
+        if resource.url is not None:
+            content["url"] = resource.url
+        if resource.version is not None:
+            content["version"] = resource.version
+        content.update(resource.header_fields)
+        return content
+    return loader.load_content(resource)
+
+
+@dataclass
+class TypeIndex:
+    """Parameter values of every resource of one type, by position in the loader's type list."""
+    size: int
+    parameters: Dict[str, SearchParameterDef]
+    # parameter code -> value -> positions, for exact matches
+    exact: Dict[str, Dict[str, List[int]]] = field(default_factory=dict)
+    # string parameter code -> sorted (normalized value, position), for prefix matches
+    prefixes: Dict[str, List[Tuple[str, int]]] = field(default_factory=dict)
+
+    def add(self, position: int, content: Dict[str, Any]) -> None:
+        for code, parameter in self.parameters.items():
+            values = parameter.values(content)
+            exact = self.exact.setdefault(code, {})
+            for value in dict.fromkeys(values):
+                exact.setdefault(value, []).append(position)
+            if parameter.type == "string":
+                self.prefixes.setdefault(code, []).extend(
+                    (normalized, position) for normalized in dict.fromkeys(map(normalize_string, values))
+                )
+
+    def freeze(self) -> None:
+        for entries in self.prefixes.values():
+            entries.sort()
+
+    def match(self, code: str, modifier: str, values: List[str]) -> Set[int]:
+        """Positions matching any of the values (comma-separated search values are ORed)."""
+        parameter = self.parameters[code]
+        matches: Set[int] = set()
+        for value in values:
+            if parameter.type == "string" and modifier != "exact":
+                entries = self.prefixes.get(code, [])
+                prefix = normalize_string(value)
+                index = bisect_left(entries, (prefix, -1))
+                while index < len(entries) and entries[index][0].startswith(prefix):
+                    matches.add(entries[index][1])
+                    index += 1
+            else:
+                if parameter.type == "token" and '|' in value:
+                    # system|code: the indexed parameters carry no system, so match on the code
+                    value = value.split('|', 1)[1]
+                matches.update(self.exact.get(code, {}).get(value, ()))
+        return matches
+
+
+class SearchIndex:
+    """
+    Search indexes for every resource type in one registry version.
+
+    Values are extracted once per version with the FHIRPath expressions of
+    the SearchParameter resources loaded from the base specification.
+    Exact-match parameters are hash lookups and string parameters are
+    prefix ranges over a sorted list, so a search never reads resource
+    content. Matches are positions in the loader's type list, in registry
+    order, so only the requested page is materialized.
+
+    Lazily indexed Bundle entries are indexed from the header fields the
+    scanner keeps, so building never fills the loader's LRU. A hot reload
+    creates the index unbuilt and builds it after the new version is
+    swapped in; the first search waits for it.
+    """
+
+    def __init__(self, loader: ResourceLoader):
+        self.loader = loader
+        self.types: Dict[str, TypeIndex] = {}
+        self.build_seconds = 0.0
+        self._built = False
+        self._build_lock = threading.Lock()
+
+    @classmethod
+    def build(cls, loader: ResourceLoader) -> "SearchIndex":
+        """Index every loaded resource type."""
+        return cls(loader).ensure_built()
+
+    def ensure_built(self) -> "SearchIndex":
+        """Build the indexes unless that already happened."""
+        if self._built:
+            return self
+        with self._build_lock:
+            if not self._built:
+                start = time.perf_counter()
+                self.types = self._build_types()
+                self.build_seconds = time.perf_counter() - start
+                self._built = True
+        return self
+
+    def _build_types(self) -> Dict[str, TypeIndex]:
+        loader = self.loader
+        resource_types = list(loader.by_type)
+        definitions = _parameter_definitions(loader, resource_types)
+        types: Dict[str, TypeIndex] = {}
+        for resource_type in resource_types:
+            resources = loader.by_type[resource_type]
+            type_index = TypeIndex(size=len(resources), parameters=definitions[resource_type])
+            if type_index.parameters:
+                fields: Optional[FrozenSet[str]] = frozenset()
+                for parameter in type_index.parameters.values():
+                    fields = fields | parameter.fields if fields is not None and parameter.fields is not None else None
+                for position, resource in enumerate(resources):
+                    type_index.add(position, _indexed_content(loader, resource, fields))
+                type_index.freeze()
+            types[resource_type] = type_index
+        return types
+
+    def parameters(self, resource_type: str) -> Dict[str, str]:
+        """Supported parameter codes of a resource type and their types."""
+        type_index = self.ensure_built().types.get(resource_type)
+        return {code: parameter.type for code, parameter in type_index.parameters.items()} if type_index else {}
+
+    def search(self, resource_type: str, criteria: List[Tuple[str, str]]) -> List[int]:
+        """
+        Positions of the resources matching every criterion, in registry order.
+
+        Criteria are (name[:modifier], value) pairs as they appear in the
+        query string; repeated parameters are ANDed and comma-separated
+        values ORed. Raises SearchError for anything the index cannot answer.
+        """
+        type_index = self.ensure_built().types.get(resource_type)
+        if type_index is None:
+            return []
+        selected: Optional[Set[int]] = None
+        for name, value in criteria:
+            code, _, modifier = name.partition(':')
+            parameter = type_index.parameters.get(code)
+            if parameter is None:
+                raise SearchError(f"Unknown search parameter '{code}' for {resource_type}")
+            if modifier not in SEARCH_MODIFIERS[parameter.type]:
+                raise SearchError(f"Modifier ':{modifier}' is not supported for {parameter.type} parameter '{code}'")
+            values = [part for part in value.split(',') if part]
+            if not values:
+                raise SearchError(f"Search parameter '{name}' has no value")
+            matches = type_index.match(code, modifier, values)
+            selected = matches if selected is None else selected & matches
+            if not selected:
+                return []
+        if selected is None:
+            return list(range(type_index.size))
+        return sorted(selected)
+
+    def info(self) -> Dict[str, Any]:
+        """Indexed types and parameters for status endpoints."""
+        if not self._built:
+            return {"types": None, "parameters": None, "buildMs": None}
+        return {
+            "types": len(self.types),
+            "parameters": sum(len(type_index.parameters) for type_index in self.types.values()),
+            "buildMs": round(self.build_seconds * 1000, 1),
+        }
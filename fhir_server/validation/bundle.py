@@ -0,0 +1,112 @@
+"""
+PHCore Bundle Validation Pool
+Validates the entries of large Bundles on worker processes.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from fhir_server.validation.workers import RegistryMismatchError, ValidatorSpec, worker_context
+
+if TYPE_CHECKING:
+    from fhir_server.validation.validator import FhirValidator, ValidationIssue
+
+# (entry index, entry resource) pairs and the issues found for each
+BundleEntries = List[Tuple[int, Dict[str, Any]]]
+EntryIssues = List[Tuple[int, List["ValidationIssue"]]]
+
+# Chunks handed out per worker, so a slow chunk does not leave the others idle
+_CHUNKS_PER_WORKER = 4
+
+# Validator built by each pool worker when it starts, or why it could not be
+_worker_validator: Optional["FhirValidator"] = None
+_worker_error: Optional[RegistryMismatchError] = None
+
+
+def _init_worker(spec: ValidatorSpec) -> None:
+    global _worker_validator, _worker_error
+    try:
+        _worker_validator = spec.build()
+    except RegistryMismatchError as e:
+        # Chunks are rejected rather than validated against a different registry version
+        _worker_error = e
+
+
+def _validate_chunk(entries: BundleEntries, verbose: bool) -> EntryIssues:
+    if _worker_validator is None:
+        raise _worker_error
+    return [(index, _worker_validator.validate_bundle_entry(resource, verbose)) for index, resource in entries]
+
+
+class BundleValidationPool:
+    """
+    Process pool for validating Bundle entries.
+
+    Workers are started from a clean process (see worker_context) on the
+    first large Bundle and each loads the registry from its snapshot, so
+    they never inherit locks held by the server's threads. A pool serves
+    one validator; after a hot reload the next large Bundle retires the old
+    workers and starts new ones that load the reloaded resource files. If
+    the files changed again before the workers loaded them, the workers
+    reject their chunks and the Bundle is validated serially against the
+    validator it was submitted with.
+    """
+
+    def __init__(self, workers: int = 0, min_entries: int = 256):
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.min_entries = min_entries
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._validator: Optional["FhirValidator"] = None
+        # Validator whose registry version the workers failed to load
+        self._mismatched: Optional["FhirValidator"] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """Whether entries can be spread across worker processes."""
+        return self.workers > 1
+
+    def _executor_for(self, validator: "FhirValidator") -> ProcessPoolExecutor:
+        with self._lock:
+            if self._validator is not validator:
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False, cancel_futures=False)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=worker_context(),
+                    initializer=_init_worker,
+                    initargs=(ValidatorSpec.from_validator(validator),)
+                )
+                self._validator = validator
+            return self._executor
+
+    def validate(self, validator: "FhirValidator", entries: BundleEntries, verbose: bool) -> EntryIssues:
+        """Validate entries on the pool, returning their issues in entry order."""
+        if not self.available or len(entries) < self.min_entries or self._mismatched is validator:
+            return [(index, validator.validate_bundle_entry(resource, verbose)) for index, resource in entries]
+
+        executor = self._executor_for(validator)
+        chunk_size = max(1, -(-len(entries) // (self.workers * _CHUNKS_PER_WORKER)))
+        futures = [executor.submit(_validate_chunk, entries[start:start + chunk_size], verbose)
+                   for start in range(0, len(entries), chunk_size)]
+        results: EntryIssues = []
+        try:
+            for future in futures:
+                results.extend(future.result())
+        except RegistryMismatchError:
+            for future in futures:
+                future.cancel()
+            self._mismatched = validator
+            return [(index, validator.validate_bundle_entry(resource, verbose)) for index, resource in entries]
+        return results
+
+    def shutdown(self) -> None:
+        """Stop the worker processes."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._validator = None
+            self._mismatched = None
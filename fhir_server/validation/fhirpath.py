@@ -0,0 +1,663 @@
+"""
+PHCore FHIRPath Evaluator
+Compiles the FHIRPath subset used by StructureDefinition constraints into cached closure trees.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Environment variables available to constraint expressions
+UCUM_SYSTEM = "http://unitsofmeasure.org"
+
+# Type suffixes of choice elements, so `value` finds valueQuantity but `period` does not find periodUnit
+_CHOICE_TYPES = frozenset({
+    'Base64Binary', 'Boolean', 'Canonical', 'Code', 'Date', 'DateTime', 'Decimal', 'Id', 'Instant',
+    'Integer', 'Markdown', 'Oid', 'PositiveInt', 'String', 'Time', 'UnsignedInt', 'Uri', 'Url', 'Uuid',
+    'Address', 'Age', 'Annotation', 'Attachment', 'CodeableConcept', 'Coding', 'ContactDetail',
+    'ContactPoint', 'Contributor', 'Count', 'DataRequirement', 'Distance', 'Dosage', 'Duration',
+    'Expression', 'HumanName', 'Identifier', 'Meta', 'Money', 'ParameterDefinition', 'Period',
+    'Quantity', 'Range', 'Ratio', 'Reference', 'RelatedArtifact', 'SampledData', 'Signature',
+    'Timing', 'TriggerDefinition', 'UsageContext',
+})
+
+# FHIR date, dateTime and instant: each group is one precision, the last one the timezone
+_DATE_TIME = re.compile(r'(\d{4})(?:-(\d{2})(?:-(\d{2})(?:T(\d{2}):(\d{2})(?::(\d{2}(?:\.\d+)?))?'
+                        r'(Z|[+-]\d{2}:\d{2})?)?)?)?')
+
+_STRING_ESCAPES = {"'": "'", '"': '"', '`': '`', '\\': '\\', '/': '/', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.)*')
+  | (?P<delimited>`(?:[^`\\]|\\.)*`)
+  | (?P<number>\d+(?:\.\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<special>[$%][A-Za-z_][A-Za-z0-9_]*|%`(?:[^`\\]|\\.)*`|%'(?:[^'\\]|\\.)*')
+  | (?P<op><=|>=|!=|!~|[=~<>|&+\-*/(),.\[\]{}])
+""", re.VERBOSE | re.DOTALL)
+
+
+class FhirPathError(ValueError):
+    """An expression outside the supported subset, or one that cannot be evaluated."""
+
+
+class _Context:
+    """Evaluation state: the resource root, the constraint's focus node and the current $this."""
+    __slots__ = ('root', 'context', 'this')
+
+    def __init__(self, root: Any, context: List[Any], this: List[Any]):
+        self.root = root
+        self.context = context
+        self.this = this
+
+    def iterate(self, item: Any) -> "_Context":
+        return _Context(self.root, self.context, [item])
+
+
+# A compiled (sub)expression: (context, input collection) -> output collection
+Evaluator = Callable[[_Context, List[Any]], List[Any]]
+
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """A parsed FHIRPath expression; evaluate it against a node of a resource."""
+    expression: str
+    _evaluate: Evaluator
+
+    def evaluate(self, focus: Any, root: Any = None) -> List[Any]:
+        """Evaluate with `focus` as the context node and `root` as %resource."""
+        focus_list = [focus]
+        return self._evaluate(_Context(focus if root is None else root, focus_list, focus_list), focus_list)
+
+    def is_satisfied(self, focus: Any, root: Any = None) -> bool:
+        """
+        Whether a constraint holds for a node.
+
+        Only an explicit false fails; an empty result (e.g. comparing dates of
+        different precision) is not reported.
+        """
+        return _to_boolean(self.evaluate(focus, root)) is not False
+
+
+# --- collection helpers ---------------------------------------------------
+
+def _is_primitive(value: Any) -> bool:
+    return isinstance(value, (str, int, float, bool))
+
+
+def _fan_out(value: Any, out: List[Any]) -> None:
+    if isinstance(value, list):
+        out.extend(item for item in value if item is not None)
+    elif value is not None:
+        out.append(value)
+
+
+def _to_boolean(values: List[Any]) -> Optional[bool]:
+    """Singleton evaluation of a collection in a boolean context."""
+    if not values:
+        return None
+    if len(values) > 1:
+        raise FhirPathError(f"Expected a single value, got {len(values)}")
+    value = values[0]
+    return value if isinstance(value, bool) else True
+
+
+def _singleton(values: List[Any]) -> Any:
+    if len(values) > 1:
+        raise FhirPathError(f"Expected a single value, got {len(values)}")
+    return values[0] if values else None
+
+
+def _string_input(values: List[Any]) -> Optional[str]:
+    value = _singleton(values)
+    return value if isinstance(value, str) else None
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _equals(left: Any, right: Any) -> bool:
+    if _is_number(left) and _is_number(right):
+        return left == right
+    if isinstance(left, bool) or isinstance(right, bool):
+        return left is right
+    return left == right
+
+
+def _contains(collection: List[Any], value: Any) -> bool:
+    return any(_equals(item, value) for item in collection)
+
+
+def _distinct(values: List[Any]) -> List[Any]:
+    out: List[Any] = []
+    for value in values:
+        if not _contains(out, value):
+            out.append(value)
+    return out
+
+
+def _date_time(value: str) -> Optional[Tuple[List[float], Optional[str]]]:
+    """Components of a date/dateTime string down to its precision, and its timezone; None if it is not one."""
+    match = _DATE_TIME.fullmatch(value)
+    if match is None:
+        return None
+    *parts, zone = match.groups()
+    return [float(part) for part in parts if part is not None], zone
+
+
+def _in_utc(parts: List[float], zone: str) -> List[float]:
+    """Shift dateTime components with a timezone to UTC, keeping their precision."""
+    seconds = parts[5] if len(parts) > 5 else 0.0
+    moment = datetime(*map(int, parts[:5]), int(seconds), round(seconds % 1 * 1e6))
+    if zone != 'Z':
+        sign = -1 if zone[0] == '-' else 1
+        moment -= sign * timedelta(hours=int(zone[1:3]), minutes=int(zone[4:6]))
+    utc = [moment.year, moment.month, moment.day, moment.hour, moment.minute,
+           moment.second + moment.microsecond / 1e6]
+    return [float(part) for part in utc[:len(parts)]]
+
+
+def _compare_date_times(left: str, right: str) -> Optional[int]:
+    """
+    Order two date/dateTime values the FHIRPath way.
+
+    Components are compared down to the coarser precision; when they are
+    all equal but the precisions differ the order is unknown (None).
+    Values that both carry a time and a timezone are compared in UTC.
+    """
+    parsed_left, parsed_right = _date_time(left), _date_time(right)
+    if parsed_left is None or parsed_right is None:
+        return None
+    (left_parts, left_zone), (right_parts, right_zone) = parsed_left, parsed_right
+    if left_zone and right_zone:
+        try:
+            left_parts, right_parts = _in_utc(left_parts, left_zone), _in_utc(right_parts, right_zone)
+        except ValueError:
+            return None
+    for a, b in zip(left_parts, right_parts):
+        if a != b:
+            return -1 if a < b else 1
+    return 0 if len(left_parts) == len(right_parts) else None
+
+
+def _compare(left: Any, right: Any) -> Optional[int]:
+    """Order two values; None when they are not comparable."""
+    if isinstance(left, dict) and isinstance(right, dict):
+        # Quantities compare by value when their units agree
+        if left.get('code', left.get('unit')) != right.get('code', right.get('unit')):
+            return None
+        left, right = left.get('value'), right.get('value')
+    if isinstance(left, str) and isinstance(right, str) and (_DATE_TIME.fullmatch(left) or _DATE_TIME.fullmatch(right)):
+        # Dates and dateTimes are JSON strings; order them as points in time
+        return _compare_date_times(left, right)
+    if _is_number(left) and _is_number(right) or isinstance(left, str) and isinstance(right, str):
+        return (left > right) - (left < right)
+    return None
+
+
+def _children(values: List[Any]) -> List[Any]:
+    out: List[Any] = []
+    for value in values:
+        if isinstance(value, dict):
+            for key, child in value.items():
+                if key != 'resourceType' and not key.startswith('_'):
+                    _fan_out(child, out)
+    return out
+
+
+# --- operators ------------------------------------------------------------
+
+def _member(name: str) -> Callable[[List[Any]], List[Any]]:
+    size = len(name)
+
+    def member(values: List[Any]) -> List[Any]:
+        out: List[Any] = []
+        for value in values:
+            if not isinstance(value, dict):
+                continue
+            if name in value:
+                _fan_out(value[name], out)
+                continue
+            for key, child in value.items():
+                if len(key) > size and key.startswith(name) and key[size:] in _CHOICE_TYPES:
+                    _fan_out(child, out)
+        return out
+    return member
+
+
+def _boolean_operator(op: str, left: Evaluator, right: Evaluator) -> Evaluator:
+    if op == 'and':
+        def evaluate(ctx, focus):
+            lhs = _to_boolean(left(ctx, focus))
+            if lhs is False:
+                return [False]
+            rhs = _to_boolean(right(ctx, focus))
+            if rhs is False:
+                return [False]
+            return [True] if lhs and rhs else []
+    elif op == 'or':
+        def evaluate(ctx, focus):
+            lhs = _to_boolean(left(ctx, focus))
+            if lhs is True:
+                return [True]
+            rhs = _to_boolean(right(ctx, focus))
+            if rhs is True:
+                return [True]
+            return [False] if lhs is False and rhs is False else []
+    elif op == 'xor':
+        def evaluate(ctx, focus):
+            lhs, rhs = _to_boolean(left(ctx, focus)), _to_boolean(right(ctx, focus))
+            return [] if lhs is None or rhs is None else [lhs != rhs]
+    else:  # implies
+        def evaluate(ctx, focus):
+            lhs = _to_boolean(left(ctx, focus))
+            if lhs is False:
+                return [True]
+            rhs = _to_boolean(right(ctx, focus))
+            if rhs is True:
+                return [True]
+            return [False] if lhs is True and rhs is False else []
+    return evaluate
+
+
+def _equality_operator(op: str, left: Evaluator, right: Evaluator) -> Evaluator:
+    negate = op in ('!=', '!~')
+
+    def evaluate(ctx, focus):
+        lhs, rhs = left(ctx, focus), right(ctx, focus)
+        if not lhs or not rhs:
+            return []
+        equal = len(lhs) == len(rhs) and all(_equals(a, b) for a, b in zip(lhs, rhs))
+        return [equal != negate]
+    return evaluate
+
+
+_ORDERINGS = {'<': lambda c: c < 0, '>': lambda c: c > 0, '<=': lambda c: c <= 0, '>=': lambda c: c >= 0}
+
+
+def _comparison_operator(op: str, left: Evaluator, right: Evaluator) -> Evaluator:
+    accept = _ORDERINGS[op]
+
+    def evaluate(ctx, focus):
+        lhs, rhs = left(ctx, focus), right(ctx, focus)
+        if not lhs or not rhs:
+            return []
+        order = _compare(_singleton(lhs), _singleton(rhs))
+        return [] if order is None else [accept(order)]
+    return evaluate
+
+
+def _membership_operator(op: str, left: Evaluator, right: Evaluator) -> Evaluator:
+    if op == 'contains':
+        left, right = right, left
+
+    def evaluate(ctx, focus):
+        item = left(ctx, focus)
+        if not item:
+            return []
+        return [_contains(right(ctx, focus), _singleton(item))]
+    return evaluate
+
+
+def _union_operator(left: Evaluator, right: Evaluator) -> Evaluator:
+    return lambda ctx, focus: _distinct(left(ctx, focus) + right(ctx, focus))
+
+
+# --- functions ------------------------------------------------------------
+# Each factory takes the compiled arguments and returns an Evaluator applied to the input collection.
+
+def _fn_exists(args):
+    if args:
+        criteria = args[0]
+        return lambda ctx, values: [any(_to_boolean(criteria(ctx.iterate(v), [v])) for v in values)]
+    return lambda ctx, values: [bool(values)]
+
+
+def _fn_where(args):
+    criteria = args[0]
+    return lambda ctx, values: [v for v in values if _to_boolean(criteria(ctx.iterate(v), [v]))]
+
+
+def _fn_select(args):
+    projection = args[0]
+
+    def evaluate(ctx, values):
+        out: List[Any] = []
+        for value in values:
+            out.extend(projection(ctx.iterate(value), [value]))
+        return out
+    return evaluate
+
+
+def _fn_all(args):
+    criteria = args[0]
+    return lambda ctx, values: [all(_to_boolean(criteria(ctx.iterate(v), [v])) for v in values)]
+
+
+def _fn_iif(args):
+    criterion, true_result = args[0], args[1]
+    otherwise = args[2] if len(args) > 2 else (lambda ctx, focus: [])
+
+    def evaluate(ctx, values):
+        if _to_boolean(criterion(ctx, values)):
+            return true_result(ctx, values)
+        return otherwise(ctx, values)
+    return evaluate
+
+
+def _fn_not(args):
+    def evaluate(ctx, values):
+        value = _to_boolean(values)
+        return [] if value is None else [not value]
+    return evaluate
+
+
+def _string_function(operation: Callable[..., Any]):
+    """A function on a single string input whose arguments are single values."""
+    def factory(args):
+        def evaluate(ctx, values):
+            value = _string_input(values)
+            if value is None:
+                return []
+            arguments = [_singleton(arg(ctx, ctx.this)) for arg in args]
+            if any(argument is None for argument in arguments):
+                return []
+            result = operation(value, *arguments)
+            return [] if result is None else [result]
+        return evaluate
+    return factory
+
+
+def _substring(value: str, start: int, length: Optional[int] = None) -> Optional[str]:
+    if start < 0 or start >= len(value):
+        return None
+    return value[start:] if length is None else value[start:start + length]
+
+
+def _to_integer(values: List[Any]) -> List[Any]:
+    value = _singleton(values)
+    if _is_number(value) and int(value) == value:
+        return [int(value)]
+    if isinstance(value, str) and re.fullmatch(r'[+-]?\d+', value):
+        return [int(value)]
+    return []
+
+
+def _to_string(values: List[Any]) -> List[Any]:
+    value = _singleton(values)
+    if value is None or isinstance(value, (dict, list)):
+        return []
+    if isinstance(value, bool):
+        return ['true' if value else 'false']
+    return [str(value)]
+
+
+def _fn_extension(args):
+    url = args[0]
+
+    def evaluate(ctx, values):
+        wanted = _singleton(url(ctx, ctx.this))
+        extensions = _member('extension')(values)
+        return [ext for ext in extensions if isinstance(ext, dict) and ext.get('url') == wanted]
+    return evaluate
+
+
+def _fn_descendants(args):
+    def evaluate(ctx, values):
+        out: List[Any] = []
+        level = _children(values)
+        while level:
+            out.extend(level)
+            level = _children(level)
+        return out
+    return evaluate
+
+
+def _no_args(operation: Callable[[List[Any]], List[Any]]):
+    return lambda args: (lambda ctx, values: operation(values))
+
+
+_FUNCTIONS: Dict[str, Tuple[Callable[[List[Evaluator]], Evaluator], int, int]] = {
+    # name: (factory, min args, max args)
+    'exists': (_fn_exists, 0, 1),
+    'empty': (_no_args(lambda values: [not values]), 0, 0),
+    'count': (_no_args(lambda values: [len(values)]), 0, 0),
+    'not': (_fn_not, 0, 0),
+    'hasValue': (_no_args(lambda values: [len(values) == 1 and _is_primitive(values[0])]), 0, 0),
+    'children': (_no_args(_children), 0, 0),
+    'descendants': (_fn_descendants, 0, 0),
+    'first': (_no_args(lambda values: values[:1]), 0, 0),
+    'last': (_no_args(lambda values: values[-1:]), 0, 0),
+    'tail': (_no_args(lambda values: values[1:]), 0, 0),
+    'distinct': (_no_args(_distinct), 0, 0),
+    'isDistinct': (_no_args(lambda values: [len(_distinct(values)) == len(values)]), 0, 0),
+    'where': (_fn_where, 1, 1),
+    'select': (_fn_select, 1, 1),
+    'all': (_fn_all, 1, 1),
+    'iif': (_fn_iif, 2, 3),
+    'extension': (_fn_extension, 1, 1),
+    'startsWith': (_string_function(lambda value, prefix: value.startswith(prefix)), 1, 1),
+    'endsWith': (_string_function(lambda value, suffix: value.endswith(suffix)), 1, 1),
+    'contains': (_string_function(lambda value, part: part in value), 1, 1),
+    'matches': (_string_function(lambda value, pattern: _regex(pattern).search(value) is not None), 1, 1),
+    'substring': (_string_function(_substring), 1, 2),
+    'length': (_string_function(len), 0, 0),
+    'upper': (_string_function(str.upper), 0, 0),
+    'lower': (_string_function(str.lower), 0, 0),
+    'toInteger': (_no_args(_to_integer), 0, 0),
+    'toString': (_no_args(_to_string), 0, 0),
+    # trace() only logs in a full engine; here it passes its input through
+    'trace': (lambda args: (lambda ctx, values: values), 1, 2),
+    # XHTML narrative rules (txt-1, txt-2) are not checked
+    'htmlChecks': (lambda args: (lambda ctx, values: [True]), 0, 0),
+}
+
+
+@lru_cache(maxsize=256)
+def _regex(pattern: str) -> "re.Pattern":
+    try:
+        return re.compile(pattern)
+    except re.error as error:
+        raise FhirPathError(f"Invalid regular expression '{pattern}': {error}") from error
+
+
+# --- parser ---------------------------------------------------------------
+
+def _unescape(text: str) -> str:
+    """Decode FHIRPath string escapes; unknown escapes such as \\s are kept for regular expressions."""
+    out = []
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if char == '\\' and index + 1 < len(text):
+            following = text[index + 1]
+            if following == 'u' and index + 5 < len(text):
+                out.append(chr(int(text[index + 2:index + 6], 16)))
+                index += 6
+                continue
+            out.append(_STRING_ESCAPES.get(following, char + following))
+            index += 2
+            continue
+        out.append(char)
+        index += 1
+    return ''.join(out)
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(expression):
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise FhirPathError(f"Unexpected character '{expression[position]}' at {position} in: {expression}")
+        position = match.end()
+        kind = match.lastgroup
+        if kind != 'space':
+            tokens.append((kind, match.group()))
+    return tokens
+
+
+class _Parser:
+    """Recursive-descent parser that emits an Evaluator per grammar rule."""
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def parse(self) -> Evaluator:
+        evaluator = self._implies()
+        if self.position != len(self.tokens):
+            raise FhirPathError(f"Unexpected '{self.tokens[self.position][1]}' in: {self.expression}")
+        return evaluator
+
+    def _peek(self) -> Optional[str]:
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def _next(self) -> Tuple[str, str]:
+        if self.position >= len(self.tokens):
+            raise FhirPathError(f"Unexpected end of expression: {self.expression}")
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _expect(self, text: str) -> None:
+        kind, value = self._next()
+        if value != text:
+            raise FhirPathError(f"Expected '{text}' but found '{value}' in: {self.expression}")
+
+    def _binary(self, operators: Tuple[str, ...], operand: Callable[[], Evaluator], build) -> Evaluator:
+        left = operand()
+        while self._peek() in operators:
+            op = self._next()[1]
+            left = build(op, left, operand())
+        return left
+
+    def _implies(self) -> Evaluator:
+        return self._binary(('implies',), self._or, _boolean_operator)
+
+    def _or(self) -> Evaluator:
+        return self._binary(('or', 'xor'), self._and, _boolean_operator)
+
+    def _and(self) -> Evaluator:
+        return self._binary(('and',), self._membership, _boolean_operator)
+
+    def _membership(self) -> Evaluator:
+        return self._binary(('in', 'contains'), self._equality, _membership_operator)
+
+    def _equality(self) -> Evaluator:
+        return self._binary(('=', '!=', '~', '!~'), self._comparison, _equality_operator)
+
+    def _comparison(self) -> Evaluator:
+        return self._binary(('<', '>', '<=', '>='), self._union, _comparison_operator)
+
+    def _union(self) -> Evaluator:
+        return self._binary(('|',), self._term, lambda op, left, right: _union_operator(left, right))
+
+    def _term(self) -> Evaluator:
+        kind, value = self._next()
+        if kind == 'string':
+            literal = _unescape(value[1:-1])
+            evaluator = lambda ctx, focus: [literal]
+        elif kind == 'number':
+            number = float(value) if '.' in value else int(value)
+            evaluator = lambda ctx, focus: [number]
+        elif value in ('true', 'false'):
+            flag = value == 'true'
+            evaluator = lambda ctx, focus: [flag]
+        elif value == '(':
+            evaluator = self._implies()
+            self._expect(')')
+        elif value == '{':
+            self._expect('}')
+            evaluator = lambda ctx, focus: []
+        elif kind == 'special':
+            evaluator = self._special(value)
+        elif kind in ('name', 'delimited'):
+            evaluator = self._invocation(kind, value, initial=True)
+        else:
+            raise FhirPathError(f"Unexpected '{value}' in: {self.expression}")
+
+        while self._peek() in ('.', '['):
+            if self._next()[1] == '.':
+                kind, value = self._next()
+                if kind not in ('name', 'delimited'):
+                    raise FhirPathError(f"Expected a name after '.' but found '{value}' in: {self.expression}")
+                evaluator = _chain(evaluator, self._invocation(kind, value, initial=False))
+            else:
+                evaluator = _indexer(evaluator, self._implies())
+                self._expect(']')
+        return evaluator
+
+    def _special(self, value: str) -> Evaluator:
+        if value == '$this':
+            return lambda ctx, focus: ctx.this
+        name = value[1:].strip("`'")
+        if name == 'ucum':
+            return lambda ctx, focus: [UCUM_SYSTEM]
+        if name in ('resource', 'rootResource'):
+            return lambda ctx, focus: [ctx.root]
+        if name == 'context':
+            return lambda ctx, focus: ctx.context
+        raise FhirPathError(f"Unsupported variable '{value}' in: {self.expression}")
+
+    def _invocation(self, kind: str, value: str, initial: bool) -> Evaluator:
+        name = _unescape(value[1:-1]) if kind == 'delimited' else value
+        if kind == 'name' and self._peek() == '(':
+            self._next()
+            args: List[Evaluator] = []
+            if self._peek() != ')':
+                args.append(self._implies())
+                while self._peek() == ',':
+                    self._next()
+                    args.append(self._implies())
+            self._expect(')')
+            if name not in _FUNCTIONS:
+                raise FhirPathError(f"Unsupported function '{name}()' in: {self.expression}")
+            factory, min_args, max_args = _FUNCTIONS[name]
+            if not min_args <= len(args) <= max_args:
+                raise FhirPathError(f"Wrong number of arguments to '{name}()' in: {self.expression}")
+            function = factory(args)
+            if initial:
+                return lambda ctx, focus: function(ctx, ctx.this)
+            return function
+
+        member = _member(name)
+        if initial:
+            # A leading type name such as `Patient` selects the resource itself
+            def evaluate(ctx, focus):
+                this = ctx.this
+                if name[:1].isupper() and this and isinstance(this[0], dict) and this[0].get('resourceType') == name:
+                    return this
+                return member(this)
+            return evaluate
+        return lambda ctx, focus: member(focus)
+
+
+def _chain(left: Evaluator, right: Evaluator) -> Evaluator:
+    return lambda ctx, focus: right(ctx, left(ctx, focus))
+
+
+def _indexer(left: Evaluator, index: Evaluator) -> Evaluator:
+    def evaluate(ctx, focus):
+        values = left(ctx, focus)
+        position = _singleton(index(ctx, ctx.this))
+        return values[position:position + 1] if _is_number(position) and position >= 0 else []
+    return evaluate
+
+
+@lru_cache(maxsize=4096)
+def compile_expression(expression: str) -> CompiledExpression:
+    """
+    Compile a FHIRPath expression, e.g. a constraint's `extension.exists() != value.exists()`.
+
+    The expression is parsed once into nested closures; compiled expressions
+    are cached by their text, so a constraint shared by many elements and
+    profiles (ele-1, ext-1) is compiled once per process. Raises
+    FhirPathError for syntax outside the supported subset.
+    """
+    return CompiledExpression(expression, _Parser(expression).parse())
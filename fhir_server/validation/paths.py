@@ -0,0 +1,90 @@
+"""
+PHCore Element Path Accessors
+Compiles ElementDefinition paths into cached functions that locate every matching node in a resource.
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, List, Tuple
+
+# A located value: (concrete location such as "Patient.telecom[2].system", value)
+Node = Tuple[str, Any]
+
+
+@dataclass(frozen=True)
+class PathAccessor:
+    """A compiled element path; call it with a resource to get every matching node."""
+    path: str
+    root: str
+    _steps: Tuple[Callable[[List[Node]], List[Node]], ...]
+
+    def __call__(self, resource: Any) -> List[Node]:
+        nodes: List[Node] = [(self.root, resource)]
+        for step in self._steps:
+            nodes = step(nodes)
+            if not nodes:
+                break
+        return nodes
+
+    def exists(self, resource: Any) -> bool:
+        """Whether at least one node matches."""
+        return bool(self(resource))
+
+    def values(self, resource: Any) -> List[Any]:
+        """The matching values without their locations."""
+        return [value for _, value in self(resource)]
+
+
+def _fan_out(location: str, value: Any, out: List[Node]) -> None:
+    """Append a child value, expanding arrays into one node per item."""
+    if isinstance(value, list):
+        for index, item in enumerate(value):
+            if item is not None:
+                out.append((f"{location}[{index}]", item))
+    elif value is not None:
+        out.append((location, value))
+
+
+def _field_step(name: str) -> Callable[[List[Node]], List[Node]]:
+    """Step into a named child of every object node."""
+    def step(nodes: List[Node]) -> List[Node]:
+        out: List[Node] = []
+        for location, node in nodes:
+            if isinstance(node, dict) and name in node:
+                _fan_out(f"{location}.{name}", node[name], out)
+        return out
+    return step
+
+
+def _choice_step(prefix: str) -> Callable[[List[Node]], List[Node]]:
+    """Step into a choice element such as value[x], matching valueQuantity, valueString, ..."""
+    size = len(prefix)
+
+    def step(nodes: List[Node]) -> List[Node]:
+        out: List[Node] = []
+        for location, node in nodes:
+            if not isinstance(node, dict):
+                continue
+            for key, value in node.items():
+                if len(key) > size and key.startswith(prefix) and key[size].isupper():
+                    _fan_out(f"{location}.{key}", value, out)
+        return out
+    return step
+
+
+@lru_cache(maxsize=4096)
+def compile_path(path: str) -> PathAccessor:
+    """
+    Compile an element path like `Patient.telecom.system` or `Observation.value[x]`.
+
+    The first segment names the root and is used only for locations. Arrays
+    are fanned out at every level, so `Patient.name.given` yields each given
+    name of each name, located as `Patient.name[1].given[0]`. Accessors are
+    cached by path, so each path is split and compiled once per process.
+    """
+    root, *segments = path.split('.')
+    steps = tuple(
+        _choice_step(segment[:-3]) if segment.endswith('[x]') else _field_step(segment)
+        for segment in segments
+    )
+    return PathAccessor(path, root, steps)
@@ -0,0 +1,284 @@
+"""
+PHCore Validation Plans
+Compiles StructureDefinition differentials into immutable, reusable validation plans.
+"""
+
+from typing import Callable, Dict, List, Any, Optional, Tuple, Union
+from dataclasses import dataclass, field
+
+from fhir_server.core.canonical import parse_canonical
+from fhir_server.validation.fhirpath import CompiledExpression, FhirPathError, compile_expression
+from fhir_server.validation.snapshot_generator import ExpandedSnapshot, BASE_STRUCTURE_DEFINITION
+
+# Resolves a StructureDefinition reference to its expanded snapshot
+SnapshotResolver = Callable[[str], Optional[ExpandedSnapshot]]
+
+
+@dataclass(frozen=True)
+class BindingRule:
+    """Terminology binding declared on an element."""
+    value_set_url: str
+    strength: str
+
+
+@dataclass(frozen=True)
+class ElementRule:
+    """Cardinality and binding rule for a non-sliced element."""
+    path: str
+    field_path: str
+    field_parts: Tuple[str, ...]
+    min_occurs: int
+    max_occurs: str
+    binding: Optional[BindingRule] = None
+
+
+@dataclass(frozen=True)
+class SliceRule:
+    """Cardinality rule for a single named slice."""
+    path: str
+    field_path: str
+    field_parts: Tuple[str, ...]
+    slice_name: str
+    min_occurs: int
+    max_occurs: str
+    extension_url: Optional[str] = None
+    # Binding on the value[x] of the extension profile, checked for each matching extension
+    value_binding: Optional[BindingRule] = None
+
+    @property
+    def is_extension(self) -> bool:
+        """Whether this slice discriminates extensions by URL."""
+        return self.field_path == 'extension'
+
+
+@dataclass(frozen=True)
+class InvariantRule:
+    """A FHIRPath constraint checked on every node at an element path."""
+    path: str
+    key: str
+    severity: str
+    human: str
+    expression: CompiledExpression = field(compare=False)
+    # Set for constraints of an extension slice; only extensions with this URL are checked
+    extension_url: Optional[str] = None
+
+
+PlanRule = Union[ElementRule, SliceRule, InvariantRule]
+
+
+@dataclass(frozen=True)
+class ProfilePlan:
+    """Precompiled validation plan for a single StructureDefinition."""
+    url: str
+    resource_type: Optional[str]
+    rules: Tuple[PlanRule, ...]
+    # The StructureDefinition content the plan was compiled from; used to detect profile changes
+    source: Dict[str, Any] = field(compare=False, repr=False, default_factory=dict)
+    # (reference, content) of every other StructureDefinition the plan's snapshots were expanded from:
+    # extension profiles, type profiles and base definitions
+    dependencies: Tuple[Tuple[str, Any], ...] = field(compare=False, repr=False, default=())
+
+    def is_current(self, structure_def: Dict[str, Any],
+                   resolve: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None) -> bool:
+        """
+        Check whether the plan was compiled from the given StructureDefinition content.
+
+        With resolve, every dependency must also still resolve to the same
+        content, which is how plans carried across a hot reload are checked.
+        """
+        if self.source is not structure_def:
+            return False
+        return resolve is None or all(resolve(reference) is content for reference, content in self.dependencies)
+
+
+def compile_profile_plan(profile_url: str, structure_def: Dict[str, Any],
+                         resolve_snapshot: Optional[SnapshotResolver] = None) -> ProfilePlan:
+    """
+    Compile a StructureDefinition differential into a validation plan.
+
+    Elements are grouped by path in order of first appearance. A group containing
+    any slice definition contributes only its slice rules; other groups contribute
+    one element rule per element. Root elements (e.g. "Patient") are skipped.
+    Invariant rules for the constraints of the profile and of its element types
+    follow the differential rules.
+
+    Args:
+        profile_url: Canonical URL the profile is registered under
+        structure_def: StructureDefinition content
+        resolve_snapshot: Lookup for expanded snapshots; without it only
+            constraints declared in the differential are compiled
+
+    Returns:
+        Immutable ProfilePlan
+    """
+    elements = structure_def.get('differential', {}).get('element', [])
+
+    # Group elements by path for slice detection
+    elements_by_path: Dict[str, List[Dict[str, Any]]] = {}
+    for element in elements:
+        path = element.get('path', '')
+        if path not in elements_by_path:
+            elements_by_path[path] = []
+        elements_by_path[path].append(element)
+
+    rules: List[PlanRule] = []
+    for path, path_elements in elements_by_path.items():
+        # Skip root element (e.g., "Patient")
+        if '.' not in path:
+            continue
+
+        field_path = path.split('.', 1)[1]
+        field_parts = tuple(field_path.split('.'))
+
+        if any('sliceName' in element for element in path_elements):
+            for element in path_elements:
+                if 'sliceName' in element:
+                    rule = _compile_slice_rule(path, field_path, field_parts, element, resolve_snapshot)
+                    if rule:
+                        rules.append(rule)
+        else:
+            for element in path_elements:
+                rules.append(_compile_element_rule(path, field_path, field_parts, element))
+
+    rules.extend(_compile_invariant_rules(profile_url, structure_def, resolve_snapshot))
+
+    return ProfilePlan(
+        url=profile_url,
+        resource_type=structure_def.get('type'),
+        rules=tuple(rules),
+        source=structure_def
+    )
+
+
+def _compile_slice_rule(path: str, field_path: str, field_parts: Tuple[str, ...], element: Dict[str, Any],
+                        resolve_snapshot: Optional[SnapshotResolver] = None) -> Optional[SliceRule]:
+    """Compile a slice definition; extension slices without a profile URL are dropped."""
+    extension_url = None
+    if field_path == 'extension':
+        for type_def in element.get('type', []):
+            if type_def.get('code') == 'Extension':
+                profiles = type_def.get('profile', [])
+                if profiles:
+                    extension_url = parse_canonical(profiles[0]).url  # Remove version if present
+                    break
+        if not extension_url:
+            return None
+
+    return SliceRule(
+        path=path,
+        field_path=field_path,
+        field_parts=field_parts,
+        slice_name=element.get('sliceName'),
+        min_occurs=element.get('min', 0),
+        max_occurs=element.get('max', '*'),
+        extension_url=extension_url,
+        value_binding=_extension_value_binding(extension_url, resolve_snapshot) if extension_url else None
+    )
+
+
+def _extension_value_binding(extension_url: str, resolve_snapshot: Optional[SnapshotResolver]) -> Optional[BindingRule]:
+    """The binding on `Extension.value[x]` in the expanded extension profile."""
+    extension = resolve_snapshot(extension_url) if resolve_snapshot else None
+    value_element = extension.element('Extension.value[x]') if extension else None
+    if value_element is None:
+        return None
+    return _compile_binding(value_element)
+
+
+def _compile_element_rule(path: str, field_path: str, field_parts: Tuple[str, ...], element: Dict[str, Any]) -> ElementRule:
+    """Compile a regular (non-sliced) element definition."""
+    return ElementRule(
+        path=path,
+        field_path=field_path,
+        field_parts=field_parts,
+        min_occurs=element.get('min', 0),
+        max_occurs=element.get('max', '*'),
+        binding=_compile_binding(element)
+    )
+
+
+def _compile_binding(element: Dict[str, Any]) -> Optional[BindingRule]:
+    """Compile the terminology binding of an element, if it names a ValueSet."""
+    binding_def = element.get('binding')
+    if not binding_def or not binding_def.get('valueSet'):
+        return None
+    return BindingRule(
+        value_set_url=binding_def['valueSet'],
+        strength=binding_def.get('strength', 'required')
+    )
+
+
+def _compile_invariant_rules(profile_url: str, structure_def: Dict[str, Any],
+                             resolve_snapshot: Optional[SnapshotResolver]) -> List[InvariantRule]:
+    """
+    Compile the constraints that apply to a profile's elements.
+
+    Elements come from the expanded snapshot when available, otherwise from
+    the differential. Each element contributes its own constraints and those
+    on the root of its type (ext-1 on extensions, per-1 on periods, ...).
+    Constraints on slices are compiled only for extension slices, whose
+    members can be told apart by URL. Expressions outside the supported
+    FHIRPath subset are skipped with a warning.
+    """
+    snapshot = resolve_snapshot(profile_url) if resolve_snapshot else None
+    elements = snapshot.elements if snapshot else structure_def.get('differential', {}).get('element', [])
+
+    rules: List[InvariantRule] = []
+    seen = set()
+    for element in elements:
+        path = element.get('path', '')
+        element_id = element.get('id') or path
+        extension_url = None
+        if ':' in element_id:
+            extension_url = _extension_slice_url(element, element_id, path)
+            if extension_url is None:
+                continue
+
+        for constraint in list(element.get('constraint', [])) + _type_constraints(element, path, resolve_snapshot):
+            key, expression = constraint.get('key'), constraint.get('expression')
+            if not key or not expression or (path, extension_url, key) in seen:
+                continue
+            seen.add((path, extension_url, key))
+            try:
+                compiled = compile_expression(expression)
+            except FhirPathError as error:
+                print(f"⚠️ Skipping constraint {key} on {path} in {profile_url}: {error}")
+                continue
+            rules.append(InvariantRule(
+                path=path,
+                key=key,
+                severity='warning' if constraint.get('severity') == 'warning' else 'error',
+                human=constraint.get('human', expression),
+                expression=compiled,
+                extension_url=extension_url
+            ))
+    # A slice constraint already checked on every extension at the path adds nothing
+    return [rule for rule in rules if rule.extension_url is None or (rule.path, None, rule.key) not in seen]
+
+
+def _extension_slice_url(element: Dict[str, Any], element_id: str, path: str) -> Optional[str]:
+    """Profile URL of a top-level extension slice such as `Patient.extension:race`, else None."""
+    if not path.endswith('.extension') or element_id != f"{path}:{element.get('sliceName')}":
+        return None
+    for type_def in element.get('type', []):
+        if type_def.get('code') == 'Extension' and type_def.get('profile'):
+            return parse_canonical(type_def['profile'][0]).url
+    return None
+
+
+def _type_constraints(element: Dict[str, Any], path: str, resolve_snapshot: Optional[SnapshotResolver]) -> List[Dict[str, Any]]:
+    """Constraints on the root of the element's type (or type profile) snapshot."""
+    if resolve_snapshot is None:
+        return []
+    types = element.get('type', [])
+    if not types and path.rsplit('.', 1)[-1] in ('extension', 'modifierExtension'):
+        types = [{'code': 'Extension'}]
+    if len(types) != 1:
+        return []
+
+    type_def = types[0]
+    for reference in list(type_def.get('profile', [])) + [BASE_STRUCTURE_DEFINITION + type_def.get('code', '')]:
+        type_snapshot = resolve_snapshot(reference)
+        if type_snapshot is not None and type_snapshot.elements:
+            return list(type_snapshot.elements[0].get('constraint', []))
+    return []
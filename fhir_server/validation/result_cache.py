@@ -0,0 +1,113 @@
+"""
+PHCore Validation Result Cache
+Content-addressed LRU cache of finished validation results, shared across registry versions.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from fhir_server.core import fast_json
+
+# Rough per-object overheads used to estimate the memory held by an entry
+_ENTRY_OVERHEAD = 400
+_ISSUE_OVERHEAD = 250
+
+
+def resource_digest(resource_data: Dict[str, Any]) -> bytes:
+    """Hash of a resource's canonical JSON form; key order and whitespace do not matter."""
+    return hashlib.blake2b(fast_json.dumps(resource_data, sort_keys=True), digest_size=16).digest()
+
+
+def _estimate_size(result: Any) -> int:
+    size = _ENTRY_OVERHEAD
+    for issue in getattr(result, 'issues', ()):
+        size += _ISSUE_OVERHEAD + len(issue.details or '') + len(issue.location or '')
+    return size
+
+
+class ValidationResultCache:
+    """
+    LRU cache of ValidationResults bounded by entry count, estimated memory and age.
+
+    Keys carry the registry generation they were computed against. Each new
+    validator starts a generation, which drops every older entry and refuses
+    late inserts from validators of a previous version, so a hot reload
+    invalidates the cache without coordination. Cached results are shared
+    between callers and must not be modified.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def new_generation(self) -> int:
+        """Start a registry generation, invalidating every cached result."""
+        with self._lock:
+            self._generation += 1
+            if self._entries:
+                self.stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            return self._generation
+
+    def get(self, generation: int, key: Hashable) -> Optional[Any]:
+        """Cached result for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get((generation, key))
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, size, result = entry
+            if expires_at <= time.monotonic():
+                del self._entries[(generation, key)]
+                self._bytes -= size
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end((generation, key))
+            self.stats["hits"] += 1
+            return result
+
+    def put(self, generation: int, key: Hashable, result: Any) -> None:
+        """Store a result computed against the given generation."""
+        size = _estimate_size(result)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            previous = self._entries.pop((generation, key), None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[(generation, key)] = (time.monotonic() + self.ttl, size, result)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.stats["evictions"] += 1
+
+    def info(self) -> Dict[str, Any]:
+        """Counters and current occupancy for status endpoints."""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "hitRate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttl": self.ttl,
+            }
+
+    def __len__(self) -> int:
+        return len(self._entries)
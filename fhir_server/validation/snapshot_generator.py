@@ -0,0 +1,335 @@
+"""
+PHCore Snapshot Generator
+Expands StructureDefinition differentials onto their baseDefinition chain.
+"""
+
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from fhir_server.core.canonical import CanonicalIndex
+
+BASE_STRUCTURE_DEFINITION = "http://hl7.org/fhir/StructureDefinition/"
+
+# Recorded in place of the content of a seeded snapshot's definitions, which were not tracked
+UNTRACKED = object()
+
+# ElementDefinition lists that a differential extends instead of replacing
+_ACCUMULATED_KEYS = ('constraint', 'mapping')
+
+
+@dataclass(frozen=True)
+class ExpandedSnapshot:
+    """The snapshot elements of a StructureDefinition, expanded from its base chain."""
+    url: str
+    resource_type: str
+    elements: Tuple[Dict[str, Any], ...]
+    # False when some baseDefinition in the chain is not loaded; the elements
+    # then hold only what the loaded definitions declare
+    complete: bool
+    field_names: FrozenSet[str] = field(default=frozenset(), compare=False)
+
+    def element(self, element_id: str) -> Optional[Dict[str, Any]]:
+        """Find an element by id, e.g. `Patient.extension:indigenousPeople`."""
+        for element in self.elements:
+            if element.get('id') == element_id:
+                return element
+        return None
+
+
+def _element_id(element: Dict[str, Any]) -> str:
+    """Element id, derived from path and sliceName for elements without one."""
+    if element.get('id'):
+        return element['id']
+    if element.get('sliceName'):
+        return f"{element['path']}:{element['sliceName']}"
+    return element['path']
+
+
+def _field_names(structure_def: Dict[str, Any], elements: Tuple[Dict[str, Any], ...]) -> FrozenSet[str]:
+    """JSON property names allowed at the top level, with choice elements expanded per type."""
+    resource_type = structure_def.get('type', '')
+    names = {'resourceType'} if structure_def.get('kind') == 'resource' else set()
+    prefix = f"{resource_type}."
+    for element in elements:
+        path = element.get('path', '')
+        if not path.startswith(prefix) or '.' in path[len(prefix):] or element.get('sliceName'):
+            continue
+        name = path[len(prefix):]
+        if name.endswith('[x]'):
+            for type_def in element.get('type', []):
+                code = type_def.get('code', '')
+                names.add(name[:-3] + code[:1].upper() + code[1:])
+        else:
+            names.add(name)
+    return frozenset(names)
+
+
+def _merge_element(base: Dict[str, Any], diff: Dict[str, Any]) -> Dict[str, Any]:
+    """Apply a differential element to a copy of its base element."""
+    merged = dict(base)
+    for key, value in diff.items():
+        if key in _ACCUMULATED_KEYS and isinstance(value, list):
+            merged[key] = list(base.get(key, [])) + [item for item in value if item not in base.get(key, [])]
+        else:
+            merged[key] = value
+    return merged
+
+
+class SnapshotGenerator:
+    """
+    Generates snapshots by merging each differential onto its expanded base.
+
+    Definitions that already carry a snapshot (the base R4 types and
+    resources) are used as-is. Element ids of the differential locate the
+    base element to constrain; new slices copy the sliced element and
+    constraints on elements of a complex type unfold that type's snapshot
+    under the element. Results are memoized per canonical reference, so each
+    profile is expanded once per generator. The StructureDefinitions read
+    for each expansion are remembered, so callers can find out which
+    definitions a result was derived from (see `reads`).
+    """
+
+    def __init__(self, structure_definitions: CanonicalIndex):
+        self.structure_definitions = structure_definitions
+        self._snapshots: Dict[str, Optional[ExpandedSnapshot]] = {}
+        # reference -> content of every StructureDefinition read to expand it
+        self._dependencies: Dict[str, Dict[str, Any]] = {}
+        self._in_progress: set = set()
+        self._local = threading.local()
+
+    def generate(self, reference: str) -> Optional[ExpandedSnapshot]:
+        """Expanded snapshot of a StructureDefinition, or None if it is not loaded."""
+        if reference in self._snapshots:
+            self._record(self._dependencies.get(reference, {reference: UNTRACKED}))
+            return self._snapshots[reference]
+        structure_def = self.structure_definitions.get(reference)
+        if structure_def is None or reference in self._in_progress:
+            self._record({reference: structure_def})
+            return None
+
+        self._in_progress.add(reference)
+        stack = self._read_stack()
+        stack.append({reference: structure_def})
+        try:
+            snapshot = self._expand(reference, structure_def)
+        finally:
+            self._in_progress.discard(reference)
+            dependencies = stack.pop()
+        self._snapshots[reference] = snapshot
+        self._dependencies[reference] = dependencies
+        self._record(dependencies)
+        return snapshot
+
+    @contextmanager
+    def reads(self) -> Iterator[Dict[str, Any]]:
+        """
+        Collect the StructureDefinitions read by the generate calls made inside the block.
+
+        Yields a dict of reference to the content it resolved to (None for
+        references that were not loaded, UNTRACKED for seeded snapshots).
+        """
+        stack = self._read_stack()
+        stack.append({})
+        try:
+            yield stack[-1]
+        finally:
+            stack.pop()
+
+    def _read_stack(self) -> List[Dict[str, Any]]:
+        # Per thread, as validations compile plans concurrently on the executor
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _record(self, dependencies: Dict[str, Any]) -> None:
+        stack = self._read_stack()
+        if stack:
+            stack[-1].update(dependencies)
+
+    def expand_profiles(self) -> CanonicalIndex:
+        """Expand every loaded StructureDefinition that ships without a snapshot."""
+        expanded = CanonicalIndex()
+        for structure_def in self.structure_definitions.all_values():
+            url = structure_def.get('url')
+            if not url or structure_def.get('snapshot'):
+                continue
+            version = structure_def.get('version')
+            snapshot = self.generate(f"{url}|{version}" if version else url)
+            if snapshot is not None:
+                expanded.add(url, version, snapshot)
+        return expanded
+
+    @property
+    def dependencies(self) -> Dict[str, Dict[str, Any]]:
+        """Reference -> content of every StructureDefinition read to expand it, per memoized snapshot."""
+        return dict(self._dependencies)
+
+    def seed(self, snapshots: CanonicalIndex, dependencies: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """
+        Reuse previously expanded snapshots, e.g. restored from the registry snapshot.
+
+        Without the `dependencies` recorded when they were expanded, seeded
+        snapshots count as UNTRACKED and plans built on them are never
+        carried across a reload.
+        """
+        for url in snapshots:
+            for version in snapshots.versions(url):
+                reference = f"{url}|{version}" if version else url
+                self._snapshots[reference] = snapshots.get(reference)
+        self._dependencies.update(dependencies or {})
+
+    def invalidate(self, reference: str) -> None:
+        """Forget the memoized snapshot of a StructureDefinition that was replaced."""
+        self._snapshots.pop(reference, None)
+        self._dependencies.pop(reference, None)
+
+    def _expand(self, url: str, structure_def: Dict[str, Any]) -> ExpandedSnapshot:
+        resource_type = structure_def.get('type', '')
+        if structure_def.get('snapshot'):
+            elements = tuple(structure_def['snapshot'].get('element', []))
+            return ExpandedSnapshot(url, resource_type, elements, True, _field_names(structure_def, elements))
+
+        differential = structure_def.get('differential', {}).get('element', [])
+        base = self.generate(structure_def['baseDefinition']) if structure_def.get('baseDefinition') else None
+        if base is None:
+            elements = tuple(dict(element) for element in differential)
+            return ExpandedSnapshot(url, resource_type, elements, False, _field_names(structure_def, elements))
+
+        elements = self._rebase(list(base.elements), base.resource_type, resource_type)
+        complete = base.complete
+        for diff in differential:
+            position = self._locate(elements, diff)
+            if position is None:
+                # Nothing in the base to constrain; keep the element as declared
+                elements.append(dict(diff))
+                complete = False
+                continue
+            elements[position] = _merge_element(elements[position], diff)
+            elements[position]['id'] = _element_id(diff)
+
+        elements = tuple(elements)
+        return ExpandedSnapshot(url, resource_type, elements, complete, _field_names(structure_def, elements))
+
+    @staticmethod
+    def _rebase(elements: List[Dict[str, Any]], base_type: str, resource_type: str) -> List[Dict[str, Any]]:
+        """Copy base elements, renaming the root path when a specialization changes the type."""
+        if not base_type or base_type == resource_type:
+            return [dict(element) for element in elements]
+        rebased = []
+        for element in elements:
+            copy = dict(element)
+            for key in ('id', 'path'):
+                value = copy.get(key)
+                if isinstance(value, str) and (value == base_type or value.startswith(base_type + '.')):
+                    copy[key] = resource_type + value[len(base_type):]
+            rebased.append(copy)
+        return rebased
+
+    def _locate(self, elements: List[Dict[str, Any]], diff: Dict[str, Any]) -> Optional[int]:
+        """Index of the element a differential entry constrains, inserting slices and unfolded types as needed."""
+        element_id = _element_id(diff)
+        position = self._find(elements, element_id)
+        if position is not None:
+            return position
+
+        parent_id, _, name = element_id.rpartition('.')
+        if not parent_id:
+            return None
+        if self._find(elements, parent_id) is None and self._locate(elements, {'id': parent_id, 'path': parent_id}) is None:
+            return None
+        self._unfold(elements, parent_id)
+
+        element_name, _, slice_name = name.partition(':')
+        if slice_name:
+            return self._insert_slice(elements, f"{parent_id}.{element_name}", element_id, slice_name)
+
+        position = self._find(elements, f"{parent_id}.{element_name}")
+        if position is None:
+            # A type-specific name such as valueCodeableConcept constrains value[x]
+            position = self._find_choice(elements, parent_id, element_name)
+        return position
+
+    @staticmethod
+    def _find(elements: List[Dict[str, Any]], element_id: str) -> Optional[int]:
+        for index, element in enumerate(elements):
+            if _element_id(element) == element_id:
+                return index
+        return None
+
+    @staticmethod
+    def _subtree_end(elements: List[Dict[str, Any]], position: int) -> int:
+        """Index after the element at `position`, its children and its slices."""
+        element_id = _element_id(elements[position])
+        end = position + 1
+        while end < len(elements):
+            other = _element_id(elements[end])
+            if not (other.startswith(element_id + '.') or other.startswith(element_id + ':')):
+                break
+            end += 1
+        return end
+
+    def _find_choice(self, elements: List[Dict[str, Any]], parent_id: str, element_name: str) -> Optional[int]:
+        for index, element in enumerate(elements):
+            element_id = _element_id(element)
+            if not element_id.startswith(parent_id + '.') or not element_id.endswith('[x]'):
+                continue
+            choice = element_id[len(parent_id) + 1:-3]
+            if '.' not in choice and element_name.startswith(choice) and element_name[len(choice):][:1].isupper():
+                return index
+        return None
+
+    def _unfold(self, elements: List[Dict[str, Any]], parent_id: str) -> None:
+        """Insert the children of a complex-typed element from its type's snapshot, if not yet present."""
+        position = self._find(elements, parent_id)
+        if position is None or self._subtree_end(elements, position) > position + 1:
+            return
+
+        parent = elements[position]
+        types = parent.get('type', [])
+        if len(types) != 1:
+            return
+        type_def = types[0]
+        type_snapshot = None
+        for profile in type_def.get('profile', []):
+            type_snapshot = self.generate(profile)
+            if type_snapshot is not None:
+                break
+        if type_snapshot is None:
+            type_snapshot = self.generate(BASE_STRUCTURE_DEFINITION + type_def.get('code', ''))
+        if type_snapshot is None or len(type_snapshot.elements) < 2:
+            return
+
+        root = type_snapshot.elements[0]
+        root_id, root_path = _element_id(root), root.get('path', '')
+        children = []
+        for element in type_snapshot.elements[1:]:
+            copy = dict(element)
+            copy['id'] = parent_id + _element_id(element)[len(root_id):]
+            copy['path'] = parent.get('path', parent_id) + element.get('path', '')[len(root_path):]
+            children.append(copy)
+        elements[position + 1:position + 1] = children
+
+    def _insert_slice(self, elements: List[Dict[str, Any]], sliced_id: str, element_id: str, slice_name: str) -> Optional[int]:
+        """Add a slice after the sliced element and its existing slices, copying the sliced element's subtree."""
+        position = self._find(elements, sliced_id)
+        if position is None:
+            return None
+        end = self._subtree_end(elements, position)
+
+        subtree = []
+        for element in elements[position:end]:
+            other = _element_id(element)
+            if other != sliced_id and not other.startswith(sliced_id + '.'):
+                continue
+            copy = dict(element)
+            copy['id'] = element_id + other[len(sliced_id):]
+            subtree.append(copy)
+        subtree[0]['sliceName'] = slice_name
+        subtree[0]['min'] = 0
+        subtree[0].pop('slicing', None)
+
+        elements[end:end] = subtree
+        return end
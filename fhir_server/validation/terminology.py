@@ -0,0 +1,456 @@
+"""
+PHCore Terminology Expansions
+Indexes CodeSystem hierarchies and expands ValueSets once per registry version into hashed (system, code) sets.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+from fhir_server.core.canonical import CanonicalIndex
+
+# CodeSystem content modes that list every code of the system
+_COMPLETE_CONTENT = ('complete',)
+# CodeSystem content modes whose listed codes can be indexed
+INDEXED_CONTENT = ('complete', 'fragment', 'supplement')
+
+# $subsumes outcomes, from the point of view of code A
+EQUIVALENT = 'equivalent'
+SUBSUMES = 'subsumes'
+SUBSUMED_BY = 'subsumed-by'
+NOT_SUBSUMED = 'not-subsumed'
+
+Code = Tuple[str, str]
+
+
+class CodeSystemIndex:
+    """
+    The concepts of a CodeSystem with an interval-labelled hierarchy.
+
+    Concepts are numbered in depth-first preorder, so the descendants of a
+    concept occupy the positions after it up to the end of its subtree.
+    `is_a` is then two integer comparisons, `descendants` a list slice and
+    `parents` a single lookup. The hierarchy comes from nested `concept`
+    arrays and from the standard `parent` concept property; a concept given
+    several parents is placed under the first one.
+    """
+
+    def __init__(self, code_system: Dict[str, Any]):
+        self.url: str = code_system.get('url', '')
+        self.name: Optional[str] = code_system.get('name')
+        self.version: Optional[str] = code_system.get('version')
+        self.complete = code_system.get('content') in _COMPLETE_CONTENT
+
+        concepts: Dict[str, Dict[str, Any]] = {}
+        children: Dict[Optional[str], List[str]] = {}
+        self._collect(code_system.get('concept', []), None, concepts, children)
+
+        # Codes in depth-first preorder, with the end of each subtree and the parent position
+        self._codes: List[str] = []
+        self._displays: List[Optional[str]] = []
+        self._ends: List[int] = []
+        self._parents: List[int] = []
+        self._positions: Dict[str, int] = {}
+        for root in children.get(None, []):
+            self._label(root, -1, concepts, children)
+        # Concepts only reachable through a parent cycle become roots
+        for code in concepts:
+            if code not in self._positions:
+                self._label(code, -1, concepts, children)
+
+    @staticmethod
+    def _collect(concept_list: List[Dict[str, Any]], parent: Optional[str],
+                 concepts: Dict[str, Dict[str, Any]], children: Dict[Optional[str], List[str]]) -> None:
+        for concept in concept_list:
+            code = concept.get('code')
+            if not code or code in concepts:
+                continue
+            concepts[code] = concept
+            declared = [prop.get('valueCode') for prop in concept.get('property', [])
+                        if prop.get('code') == 'parent' and prop.get('valueCode')]
+            concept_parent = parent if parent is not None else (declared[0] if declared else None)
+            children.setdefault(concept_parent, []).append(code)
+            CodeSystemIndex._collect(concept.get('concept', []), code, concepts, children)
+
+    def _label(self, root: str, root_parent: int, concepts: Dict[str, Dict[str, Any]],
+               children: Dict[Optional[str], List[str]]) -> None:
+        """Number a subtree in preorder without recursion (hierarchies can be deep)."""
+        stack: List[Tuple[str, int, bool]] = [(root, root_parent, False)]
+        while stack:
+            code, parent, finished = stack.pop()
+            if finished:
+                self._ends[self._positions[code]] = len(self._codes)
+                continue
+            if code in self._positions:
+                continue
+            position = len(self._codes)
+            self._positions[code] = position
+            self._codes.append(code)
+            self._displays.append(concepts[code].get('display'))
+            self._ends.append(position + 1)
+            self._parents.append(parent)
+            stack.append((code, parent, True))
+            for child in reversed(children.get(code, [])):
+                if child in concepts:
+                    stack.append((child, position, False))
+
+    def rows(self) -> Iterator[Tuple[int, str, Optional[str], int, int]]:
+        """(position, code, display, subtree end, parent position) per concept, in preorder."""
+        return zip(range(len(self._codes)), self._codes, self._displays, self._ends, self._parents)
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._positions
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._codes)
+
+    def display(self, code: str) -> Optional[str]:
+        """Display of a code, or None if it is not in the CodeSystem."""
+        position = self._positions.get(code)
+        return None if position is None else self._displays[position]
+
+    def parents(self, code: str) -> Tuple[str, ...]:
+        """The parent of a code (empty for roots and unknown codes)."""
+        position = self._positions.get(code)
+        if position is None or self._parents[position] < 0:
+            return ()
+        return (self._codes[self._parents[position]],)
+
+    def children(self, code: str) -> List[str]:
+        """Direct children of a code."""
+        position = self._positions.get(code)
+        if position is None:
+            return []
+        children = []
+        child = position + 1
+        while child < self._ends[position]:
+            children.append(self._codes[child])
+            child = self._ends[child]
+        return children
+
+    def ancestors(self, code: str) -> List[str]:
+        """Ancestors of a code, nearest first."""
+        position = self._positions.get(code)
+        out = []
+        while position is not None and self._parents[position] >= 0:
+            position = self._parents[position]
+            out.append(self._codes[position])
+        return out
+
+    def descendants(self, code: str) -> List[str]:
+        """Every code below a code, in preorder."""
+        position = self._positions.get(code)
+        if position is None:
+            return []
+        return self._codes[position + 1:self._ends[position]]
+
+    def is_a(self, code: str, ancestor: str) -> bool:
+        """Whether `code` is `ancestor` or one of its descendants."""
+        position = self._positions.get(code)
+        ancestor_position = self._positions.get(ancestor)
+        if position is None or ancestor_position is None:
+            return False
+        return ancestor_position <= position < self._ends[ancestor_position]
+
+    def subsumes(self, code_a: str, code_b: str) -> Optional[str]:
+        """$subsumes outcome for two codes, or None if either is unknown."""
+        if code_a not in self._positions or code_b not in self._positions:
+            return None
+        if code_a == code_b:
+            return EQUIVALENT
+        if self.is_a(code_b, code_a):
+            return SUBSUMES
+        if self.is_a(code_a, code_b):
+            return SUBSUMED_BY
+        return NOT_SUBSUMED
+
+
+def build_code_system_indexes(code_systems: CanonicalIndex) -> CanonicalIndex:
+    """Index every CodeSystem that lists its concepts."""
+    indexes = CanonicalIndex()
+    for code_system in code_systems.all_values():
+        if code_system.get('url') and code_system.get('content') in INDEXED_CONTENT:
+            indexes.add(code_system['url'], code_system.get('version'), CodeSystemIndex(code_system))
+    return indexes
+
+
+# Hierarchy filter operators evaluated against a CodeSystem index
+HIERARCHY_FILTERS = ('is-a', 'descendent-of', 'is-not-a', 'generalizes')
+
+
+@dataclass(frozen=True)
+class SystemSelection:
+    """
+    Codes of a store-backed CodeSystem selected by hierarchy filters, tested per code.
+
+    Whole-system and filter includes over a TerminologyStore are not
+    expanded: copying a 40k-concept system into every worker is what the
+    store exists to avoid. Membership is a few indexed queries per code.
+    """
+    system: str
+    index: Any
+    # (op, value) hierarchy filters, all of which must match
+    filters: Tuple[Tuple[str, str], ...] = ()
+
+    def contains(self, system: Optional[str], code: str) -> bool:
+        if system and system != self.system:
+            return False
+        if code not in self.index:
+            return False
+        return all(_filter_matches(self.index, op, value, code) for op, value in self.filters)
+
+
+@dataclass(frozen=True)
+class Intersection:
+    """Codes contained in every part; an include that combines a lazy selection with imported ValueSets."""
+    parts: Tuple[Any, ...]
+
+    def contains(self, system: Optional[str], code: str) -> bool:
+        return all(part.contains(system, code) for part in self.parts)
+
+
+@dataclass(frozen=True)
+class ValueSetExpansion:
+    """The codes of a ValueSet as (system, code) pairs."""
+    url: str
+    codes: FrozenSet[Code]
+    # False when some part of the compose could not be expanded (a CodeSystem
+    # that is not loaded or does not list its codes, a filter, a missing
+    # imported ValueSet); membership of codes outside `codes` is then unknown
+    complete: bool
+    bare_codes: FrozenSet[str] = field(default=frozenset(), compare=False)
+    # Selections tested per code instead of listed in `codes`, and the
+    # excludes that apply to them (`codes` already has every exclude removed)
+    included: Tuple[Any, ...] = ()
+    excluded: Tuple[Any, ...] = ()
+
+    def contains(self, system: Optional[str], code: str) -> bool:
+        """Whether a code is in the expansion; codes without a system match on code alone."""
+        if system:
+            if (system, code) in self.codes:
+                return True
+        elif code in self.bare_codes:
+            return True
+        return (any(term.contains(system, code) for term in self.included)
+                and not any(term.contains(system, code) for term in self.excluded))
+
+    @property
+    def is_listed(self) -> bool:
+        """Whether `codes` holds every code of the expansion."""
+        return not self.included
+
+
+class ValueSetExpander:
+    """
+    Expands ValueSets from their compose definitions.
+
+    `compose.include` entries contribute their listed concepts, every code of
+    a whole CodeSystem, the codes selected by hierarchy filters (`is-a`,
+    `descendent-of`, `is-not-a`, `generalizes`), or the intersection of the
+    imported `valueSet`s; `compose.exclude` entries are expanded the same way
+    and removed. Whole systems and filters over a TerminologyStore are kept
+    as SystemSelections and tested per code instead of being listed. A
+    ValueSet carrying a precomputed `expansion` is used as-is. Results are
+    memoized per canonical reference.
+    """
+
+    def __init__(self, value_sets: CanonicalIndex, code_system_indexes: CanonicalIndex):
+        self.value_sets = value_sets
+        self.code_system_indexes = code_system_indexes
+        self._expansions: Dict[str, Optional[ValueSetExpansion]] = {}
+        self._in_progress: set = set()
+
+    def expand(self, reference: str) -> Optional[ValueSetExpansion]:
+        """Expansion of a ValueSet, or None if it is not loaded."""
+        if reference in self._expansions:
+            return self._expansions[reference]
+        value_set = self.value_sets.get(reference)
+        if value_set is None:
+            return None
+        if reference in self._in_progress:
+            # An import cycle; the partial result is marked incomplete by the caller
+            return ValueSetExpansion(reference, frozenset(), False)
+
+        self._in_progress.add(reference)
+        try:
+            expansion = self._expand(reference, value_set)
+        finally:
+            self._in_progress.discard(reference)
+        self._expansions[reference] = expansion
+        return expansion
+
+    def expand_all(self) -> CanonicalIndex:
+        """Expand every loaded ValueSet."""
+        expanded = CanonicalIndex()
+        for value_set in self.value_sets.all_values():
+            url = value_set.get('url')
+            if not url:
+                continue
+            version = value_set.get('version')
+            expansion = self.expand(f"{url}|{version}" if version else url)
+            if expansion is not None:
+                expanded.add(url, version, expansion)
+        return expanded
+
+    def seed(self, expansions: CanonicalIndex) -> None:
+        """Reuse previously computed expansions, e.g. restored from the registry snapshot."""
+        for url in expansions:
+            for version in expansions.versions(url):
+                reference = f"{url}|{version}" if version else url
+                self._expansions[reference] = expansions.get(reference)
+
+    def _expand(self, url: str, value_set: Dict[str, Any]) -> ValueSetExpansion:
+        contains = value_set.get('expansion', {}).get('contains')
+        if contains is not None:
+            codes: Set[Code] = set()
+            self._expansion_codes(contains, codes)
+            return self._build(url, codes, True)
+
+        compose = value_set.get('compose')
+        if not compose:
+            return self._build(url, set(), False)
+
+        codes = set()
+        included: List[Any] = []
+        complete = True
+        for include in compose.get('include', []):
+            include_codes, include_term, include_complete = self._include_codes(include)
+            codes |= include_codes
+            if include_term is not None:
+                included.append(include_term)
+            complete = complete and include_complete
+
+        excluded: List[Any] = []
+        for exclude in compose.get('exclude', []):
+            exclude_codes, exclude_term, exclude_complete = self._include_codes(exclude)
+            codes -= exclude_codes
+            if exclude_term is not None:
+                codes = {(system, code) for system, code in codes if not exclude_term.contains(system, code)}
+                excluded.append(exclude_term)
+            elif exclude_codes and included:
+                excluded.append(self._build(url, exclude_codes, True))
+            complete = complete and exclude_complete
+        return self._build(url, codes, complete, tuple(included), tuple(excluded) if included else ())
+
+    @staticmethod
+    def _build(url: str, codes: Set[Code], complete: bool,
+               included: Tuple[Any, ...] = (), excluded: Tuple[Any, ...] = ()) -> ValueSetExpansion:
+        return ValueSetExpansion(url, frozenset(codes), complete, frozenset(code for _, code in codes),
+                                 included, excluded)
+
+    def _expansion_codes(self, contains: List[Dict[str, Any]], out: Set[Code]) -> None:
+        for entry in contains:
+            if entry.get('system') and entry.get('code'):
+                out.add((entry['system'], entry['code']))
+            if entry.get('contains'):
+                self._expansion_codes(entry['contains'], out)
+
+    def _include_codes(self, include: Dict[str, Any]) -> Tuple[Set[Code], Optional[Any], bool]:
+        """
+        Codes selected by one include/exclude entry and whether they are fully known.
+
+        Returns listed codes, or a term to test codes against when every part
+        of the entry is a store-backed selection or a ValueSet that is not
+        listed itself; listed parts otherwise narrow down the listed codes.
+        """
+        selections: List[Set[Code]] = []
+        terms: List[Any] = []
+        complete = True
+
+        system = include.get('system')
+        if system:
+            if include.get('concept'):
+                selections.append({(system, concept['code']) for concept in include['concept'] if concept.get('code')})
+            else:
+                index = self.code_system_indexes.get(f"{system}|{include['version']}" if include.get('version') else system)
+                filters = [_hierarchy_filter(filter_def) for filter_def in include.get('filter', [])]
+                if index is None or not index.complete:
+                    selections.append(set())
+                    complete = False
+                elif None in filters:
+                    # Property filters other than the hierarchy are not evaluated
+                    selections.append(set())
+                    complete = False
+                elif not isinstance(index, CodeSystemIndex):
+                    terms.append(SystemSelection(system, index, tuple(filters)))
+                else:
+                    for op, value in filters:
+                        selections.append({(system, code) for code in _filter_codes(index, op, value)})
+                    if not filters:
+                        selections.append({(system, code) for code in index})
+
+        for reference in include.get('valueSet', []):
+            imported = self.expand(reference)
+            if imported is None:
+                selections.append(set())
+                complete = False
+            else:
+                if imported.is_listed:
+                    selections.append(set(imported.codes))
+                else:
+                    terms.append(imported)
+                complete = complete and imported.complete
+
+        if not selections:
+            if not terms:
+                return set(), None, False
+            return set(), terms[0] if len(terms) == 1 else Intersection(tuple(terms)), complete
+        codes = selections[0]
+        for selection in selections[1:]:
+            codes &= selection
+        if terms:
+            codes = {(system, code) for system, code in codes if all(term.contains(system, code) for term in terms)}
+        return codes, None, complete
+
+
+def _hierarchy_filter(filter_def: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(op, value) of a hierarchy filter, or None for filters that are not supported."""
+    value = filter_def.get('value')
+    op = filter_def.get('op')
+    if filter_def.get('property') != 'concept' or value is None or op not in HIERARCHY_FILTERS:
+        return None
+    return op, value
+
+
+def _filter_codes(index: CodeSystemIndex, op: str, value: str) -> Set[str]:
+    """Codes of an in-memory index selected by a hierarchy filter."""
+    if op == 'is-a':
+        return {value, *index.descendants(value)} if value in index else set()
+    if op == 'descendent-of':
+        return set(index.descendants(value))
+    if op == 'is-not-a':
+        return {code for code in index if not index.is_a(code, value)}
+    return {value, *index.ancestors(value)} if value in index else set()
+
+
+def _filter_matches(index: Any, op: str, value: str, code: str) -> bool:
+    """Whether a code of the index passes a hierarchy filter."""
+    if op == 'is-a':
+        return index.is_a(code, value)
+    if op == 'descendent-of':
+        return code != value and index.is_a(code, value)
+    if op == 'is-not-a':
+        return not index.is_a(code, value)
+    return index.is_a(value, code)
+
+
+def coded_values(value: Any) -> Optional[List[Tuple[Optional[str], str]]]:
+    """
+    The (system, code) pairs carried by a code, Coding or CodeableConcept value.
+
+    Returns None for values that are not coded, and an empty list for a
+    Coding or CodeableConcept without any code (e.g. text only).
+    """
+    if isinstance(value, str):
+        return [(None, value)]
+    if not isinstance(value, dict):
+        return None
+    if 'coding' in value or 'text' in value:
+        codings = value.get('coding') or []
+        return [(coding.get('system'), coding['code']) for coding in codings
+                if isinstance(coding, dict) and coding.get('code')]
+    if 'code' in value or 'system' in value:
+        return [(value.get('system'), value['code'])] if value.get('code') else []
+    return None
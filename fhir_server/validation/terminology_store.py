@@ -0,0 +1,225 @@
+"""
+PHCore Terminology Store
+Compiles CodeSystems into an SQLite file that every worker queries through the shared page cache.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fhir_server.core.canonical import CanonicalIndex
+from fhir_server.validation.terminology import (
+    CodeSystemIndex, EQUIVALENT, SUBSUMES, SUBSUMED_BY, NOT_SUBSUMED, INDEXED_CONTENT
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS code_system (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    version TEXT,
+    name TEXT,
+    complete INTEGER NOT NULL,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS concept (
+    system INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    display TEXT,
+    subtree_end INTEGER NOT NULL,
+    parent INTEGER NOT NULL,
+    PRIMARY KEY (system, position)
+) WITHOUT ROWID;
+CREATE UNIQUE INDEX IF NOT EXISTS concept_code ON concept (system, code);
+CREATE INDEX IF NOT EXISTS concept_parent ON concept (system, parent);
+"""
+
+# Bytes of the file the read connections map into memory
+_MMAP_SIZE = 1 << 30
+
+# Resource types whose content lives in the store; loaders read them from source on demand
+STORED_RESOURCE_TYPES = ('CodeSystem',)
+
+# Elements of a stored CodeSystem kept in memory alongside its concept count
+CODE_SYSTEM_HEADER = ('resourceType', 'id', 'url', 'version', 'name', 'title', 'status', 'content')
+
+
+def _fingerprint(code_system: Dict[str, Any]) -> str:
+    """Content hash of a CodeSystem; unchanged CodeSystems are not compiled again."""
+    encoded = json.dumps(code_system, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+class TerminologyStore:
+    """
+    An SQLite file of compiled CodeSystems.
+
+    Concepts are stored with the same preorder interval labels as
+    CodeSystemIndex, keyed by (system, position) with an index on code, so
+    hierarchy queries are range scans. Read connections are opened per
+    process and thread, read-only and memory-mapped, so forked workers share
+    the file through the page cache instead of each holding the concepts.
+    CodeSystems are compiled once per distinct content and kept; delete the
+    file to reclaim space after large terminology updates.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Connections are per process; only the location is persisted
+        return {'path': self.path}
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.path = state['path']
+        self._local = threading.local()
+
+    def compile(self, code_systems: Iterable[Dict[str, Any]]) -> CanonicalIndex:
+        """
+        Compile every CodeSystem that lists its concepts, returning stored handles.
+
+        CodeSystems are consumed one at a time, so a generator reading them
+        from source never holds more than one in memory.
+        """
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        handles = CanonicalIndex()
+        connection = sqlite3.connect(self.path, timeout=30.0)
+        try:
+            connection.executescript(_SCHEMA)
+            for code_system in code_systems:
+                if not code_system.get('url') or code_system.get('content') not in INDEXED_CONTENT:
+                    continue
+                handle = self._compile_code_system(connection, code_system)
+                handles.add(handle.url, handle.version, handle)
+        finally:
+            connection.close()
+        return handles
+
+    def _compile_code_system(self, connection: sqlite3.Connection, code_system: Dict[str, Any]) -> "StoredCodeSystem":
+        fingerprint = _fingerprint(code_system)
+        # Workers reloading at the same time serialize here; the first one compiles
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT id, url, version, name, complete, count FROM code_system WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+            if row is None:
+                index = CodeSystemIndex(code_system)
+                cursor = connection.execute(
+                    "INSERT INTO code_system (fingerprint, url, version, name, complete, count) VALUES (?, ?, ?, ?, ?, ?)",
+                    (fingerprint, index.url, index.version, index.name, int(index.complete), len(index))
+                )
+                system_id = cursor.lastrowid
+                connection.executemany(
+                    "INSERT INTO concept (system, position, code, display, subtree_end, parent) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((system_id, *row) for row in index.rows())
+                )
+                row = (system_id, index.url, index.version, index.name, int(index.complete), len(index))
+        system_id, url, version, name, complete, count = row
+        return StoredCodeSystem(self, system_id, url, version, name, bool(complete), count)
+
+    def connection(self) -> sqlite3.Connection:
+        """Read-only connection of the calling process and thread."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(f"{Path(self.path).resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+            connection.execute(f"PRAGMA mmap_size = {_MMAP_SIZE}")
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+
+class StoredCodeSystem:
+    """A CodeSystem in a TerminologyStore, answering the same queries as CodeSystemIndex."""
+    __slots__ = ('store', 'system_id', 'url', 'version', 'name', 'complete', '_count')
+
+    def __init__(self, store: TerminologyStore, system_id: int, url: str, version: Optional[str],
+                 name: Optional[str], complete: bool, count: int):
+        self.store = store
+        self.system_id = system_id
+        self.url = url
+        self.version = version
+        self.name = name
+        self.complete = complete
+        self._count = count
+
+    def __getstate__(self) -> Tuple[Any, ...]:
+        return (self.store, self.system_id, self.url, self.version, self.name, self.complete, self._count)
+
+    def __setstate__(self, state: Tuple[Any, ...]) -> None:
+        self.store, self.system_id, self.url, self.version, self.name, self.complete, self._count = state
+
+    def _query(self, sql: str, *params: Any) -> List[Tuple[Any, ...]]:
+        return self.store.connection().execute(sql, (self.system_id, *params)).fetchall()
+
+    def _position(self, code: str) -> Optional[Tuple[int, int, int]]:
+        rows = self._query("SELECT position, subtree_end, parent FROM concept WHERE system = ? AND code = ?", code)
+        return rows[0] if rows else None
+
+    def __contains__(self, code: str) -> bool:
+        return self._position(code) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self._query("SELECT code FROM concept WHERE system = ? ORDER BY position"))
+
+    def display(self, code: str) -> Optional[str]:
+        rows = self._query("SELECT display FROM concept WHERE system = ? AND code = ?", code)
+        return rows[0][0] if rows else None
+
+    def parents(self, code: str) -> Tuple[str, ...]:
+        rows = self._query(
+            "SELECT p.code FROM concept c JOIN concept p ON p.system = c.system AND p.position = c.parent "
+            "WHERE c.system = ? AND c.code = ?", code)
+        return tuple(row[0] for row in rows)
+
+    def children(self, code: str) -> List[str]:
+        location = self._position(code)
+        if location is None:
+            return []
+        return [row[0] for row in self._query(
+            "SELECT code FROM concept WHERE system = ? AND parent = ? ORDER BY position", location[0])]
+
+    def ancestors(self, code: str) -> List[str]:
+        location = self._position(code)
+        out = []
+        while location is not None and location[2] >= 0:
+            rows = self._query("SELECT code, position, subtree_end, parent FROM concept WHERE system = ? AND position = ?", location[2])
+            if not rows:
+                break
+            out.append(rows[0][0])
+            location = rows[0][1:]
+        return out
+
+    def descendants(self, code: str) -> List[str]:
+        location = self._position(code)
+        if location is None:
+            return []
+        return [row[0] for row in self._query(
+            "SELECT code FROM concept WHERE system = ? AND position > ? AND position < ? ORDER BY position",
+            location[0], location[1])]
+
+    def is_a(self, code: str, ancestor: str) -> bool:
+        location, ancestor_location = self._position(code), self._position(ancestor)
+        if location is None or ancestor_location is None:
+            return False
+        return ancestor_location[0] <= location[0] < ancestor_location[1]
+
+    def subsumes(self, code_a: str, code_b: str) -> Optional[str]:
+        if code_a not in self or code_b not in self:
+            return None
+        if code_a == code_b:
+            return EQUIVALENT
+        if self.is_a(code_b, code_a):
+            return SUBSUMES
+        if self.is_a(code_a, code_b):
+            return SUBSUMED_BY
+        return NOT_SUBSUMED
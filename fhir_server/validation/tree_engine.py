@@ -0,0 +1,173 @@
+"""
+PHCore Tree-Walk Validation Engine
+Walks a resource once, collecting the nodes of every path the declared profiles need.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+from fhir_server.validation.paths import compile_path, Node
+
+if TYPE_CHECKING:
+    from fhir_server.validation.plan import ProfilePlan
+    from fhir_server.validation.validator import FhirValidator, ValidationIssue
+
+# Compiled trees kept per validator, least recently used first out
+MAX_CACHED_TREES = 256
+
+
+class _PathTrieNode:
+    """One path segment; `key` is the relative path whose nodes are collected here."""
+    __slots__ = ('key', 'collect', 'fields', 'choices')
+
+    def __init__(self, key: str):
+        self.key = key
+        self.collect = False
+        self.fields: Dict[str, "_PathTrieNode"] = {}
+        # (prefix, node) for choice segments such as value[x]
+        self.choices: List[Tuple[str, "_PathTrieNode"]] = []
+
+    def child(self, segment: str) -> "_PathTrieNode":
+        key = f"{self.key}.{segment}"
+        if segment.endswith('[x]'):
+            prefix = segment[:-3]
+            for existing_prefix, node in self.choices:
+                if existing_prefix == prefix:
+                    return node
+            node = _PathTrieNode(key)
+            self.choices.append((prefix, node))
+            return node
+        if segment not in self.fields:
+            self.fields[segment] = _PathTrieNode(key)
+        return self.fields[segment]
+
+
+class PathTree:
+    """
+    The element paths needed by a set of profiles, merged into one trie.
+
+    Paths are stored relative to their root type, so profiles of different
+    types (or a profile applied to a resource of another type in verbose
+    mode) share one walk; the root name is only prepended to locations.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        self._root = _PathTrieNode('')
+        self._relative: Dict[str, Tuple[str, str]] = {}
+        for path in paths:
+            root, _, relative = path.partition('.')
+            if not relative:
+                continue
+            node = self._root
+            for segment in relative.split('.'):
+                node = node.child(segment)
+            node.collect = True
+            self._relative[path] = (root, node.key)
+
+    def index(self, resource: Dict[str, Any]) -> "NodeIndex":
+        """Walk the resource once and bucket the nodes found under every collected path."""
+        buckets: Dict[str, List[Node]] = {}
+        if isinstance(resource, dict):
+            _walk(self._root, '', resource, buckets)
+        return NodeIndex(self._relative, buckets, resource)
+
+
+def _walk(trie: _PathTrieNode, location: str, obj: Dict[str, Any], buckets: Dict[str, List[Node]]) -> None:
+    """Visit the children of an object that some path continues into, in document order."""
+    for key, value in obj.items():
+        child = trie.fields.get(key)
+        if child is not None:
+            _visit(child, f"{location}.{key}", value, buckets)
+        for prefix, choice in trie.choices:
+            if len(key) > len(prefix) and key.startswith(prefix) and key[len(prefix)].isupper():
+                _visit(choice, f"{location}.{key}", value, buckets)
+
+
+def _visit(trie: _PathTrieNode, location: str, value: Any, buckets: Dict[str, List[Node]]) -> None:
+    """Record a value (one node per array item) and descend where deeper paths continue."""
+    if isinstance(value, list):
+        items = [(f"{location}[{index}]", item) for index, item in enumerate(value) if item is not None]
+    elif value is not None:
+        items = [(location, value)]
+    else:
+        return
+
+    if trie.collect:
+        buckets.setdefault(trie.key, []).extend(items)
+    if trie.fields or trie.choices:
+        for item_location, item in items:
+            if isinstance(item, dict):
+                _walk(trie, item_location, item, buckets)
+
+
+class NodeIndex:
+    """Nodes of one resource, bucketed by path during a single walk."""
+
+    def __init__(self, relative: Dict[str, Tuple[str, str]], buckets: Dict[str, List[Node]], resource: Dict[str, Any]):
+        self._relative = relative
+        self._buckets = buckets
+        self._resource = resource
+
+    def nodes(self, path: str) -> List[Node]:
+        """Located nodes of an element path, as compile_path(path) would return them."""
+        relative = self._relative.get(path)
+        if relative is None:
+            # Not part of the compiled tree; evaluate the path directly
+            return compile_path(path)(self._resource)
+        root, key = relative
+        return [(root + location, value) for location, value in self._buckets.get(key, ())]
+
+
+class TreeValidationEngine:
+    """
+    Validates a resource against all declared profiles with one traversal.
+
+    The paths of every rule of every declared profile (and of the verbose
+    resource-type checks) are compiled into a PathTree, cached in a bounded
+    LRU per set of resolved plans, so profile URLs that resolve to nothing
+    never add entries. Validation walks the resource once to fill a NodeIndex, then runs
+    the same rule checks as the plan engine in plan order, each reading its
+    nodes from the index, so both engines report identical issues.
+    """
+
+    def __init__(self, validator: "FhirValidator", max_trees: int = MAX_CACHED_TREES):
+        self.validator = validator
+        self.max_trees = max_trees
+        # (plan identities, verbose) -> (plans, tree); entries hold their plans, so the ids stay unique
+        self._trees: "OrderedDict[Tuple[Tuple[int, ...], bool], Tuple[Tuple[ProfilePlan, ...], PathTree]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, resource_data: Dict[str, Any], profile_urls: List[str], verbose: bool) -> List["ValidationIssue"]:
+        """Validate against every profile in `profile_urls`, in order."""
+        tree = self._tree_for(tuple(profile_urls), verbose)
+        index = tree.index(resource_data)
+
+        issues = []
+        for profile_url in profile_urls:
+            issues.extend(self.validator._validate_against_profile(resource_data, profile_url, verbose, nodes=index.nodes))
+        return issues
+
+    def _tree_for(self, profile_urls: Tuple[str, ...], verbose: bool) -> PathTree:
+        """The compiled tree for the plans of a profile set; recompiled plans get a new tree."""
+        plans = tuple(plan for plan in map(self.validator.get_profile_plan, profile_urls) if plan is not None)
+        if not plans:
+            return PathTree({})
+        key = (tuple(map(id, plans)), verbose)
+        with self._lock:
+            cached = self._trees.get(key)
+            if cached is not None:
+                self._trees.move_to_end(key)
+                return cached[1]
+
+        paths = []
+        for plan in plans:
+            paths.extend(rule.path for rule in plan.rules)
+            if verbose:
+                paths.extend(self.validator.STRUCTURE_CHECK_PATHS.get(plan.resource_type, ()))
+        tree = PathTree(dict.fromkeys(paths))
+        with self._lock:
+            self._trees[key] = (plans, tree)
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+        return tree
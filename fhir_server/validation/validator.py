@@ -4,9 +4,19 @@ Validates FHIR resources against PHCore profiles and terminologies.
 """
 
 import json
-from typing import Dict, List, Any, Optional, Tuple
-from dataclasses import dataclass
+from typing import Callable, Dict, List, Any, Optional, Tuple
+from dataclasses import dataclass, replace
+from fhir_server.core.canonical import CanonicalIndex
 from fhir_server.core.resource_loader import ResourceLoader, FhirResource
+from fhir_server.validation.bundle import BundleValidationPool
+from fhir_server.validation.fhirpath import FhirPathError
+from fhir_server.validation.plan import ProfilePlan, ElementRule, SliceRule, BindingRule, InvariantRule, compile_profile_plan
+from fhir_server.validation.paths import compile_path, Node
+from fhir_server.validation.result_cache import ValidationResultCache, resource_digest
+from fhir_server.validation.snapshot_generator import SnapshotGenerator, ExpandedSnapshot, BASE_STRUCTURE_DEFINITION
+from fhir_server.validation.terminology import CodeSystemIndex, ValueSetExpander, ValueSetExpansion, build_code_system_indexes, coded_values
+from fhir_server.validation.terminology_store import CODE_SYSTEM_HEADER, TerminologyStore
+from fhir_server.validation.tree_engine import TreeValidationEngine
 
 
 @dataclass
@@ -26,42 +36,172 @@ class ValidationResult:
     profile_url: Optional[str] = None
 
 
+# Validation engines selectable with PHCORE_VALIDATION_ENGINE
+VALIDATION_ENGINES = ("plan", "tree", "compare")
+
+# Returns the located nodes of an element path in the resource being validated
+NodeLookup = Callable[[str], List[Node]]
+
+
 class FhirValidator:
     """Validates FHIR resources against PHCore implementation guide."""
     
-    def __init__(self, resource_loader: ResourceLoader):
+    # Element paths read by the verbose resource-type checks, per resource type
+    STRUCTURE_CHECK_PATHS = {
+        'Patient': ('Patient.telecom.system', 'Patient.extension'),
+        'Medication': ('Medication.ingredient',),
+    }
+    
+    def __init__(self, resource_loader: ResourceLoader, engine: str = "plan",
+                 terminology_store: Optional[TerminologyStore] = None,
+                 result_cache: Optional[ValidationResultCache] = None,
+                 bundle_pool: Optional[BundleValidationPool] = None):
+        if engine not in VALIDATION_ENGINES:
+            raise ValueError(f"Unknown validation engine '{engine}', expected one of: {', '.join(VALIDATION_ENGINES)}")
         self.resource_loader = resource_loader
-        self.structure_definitions = {}
-        self.value_sets = {}
-        self.code_systems = {}
+        # "plan" runs each rule with its own path lookup, "tree" walks the resource
+        # once for all rules, "compare" runs both and reports any difference
+        self.engine = engine
+        self.engine_stats = {"compared": 0, "mismatches": 0}
+        self._tree_engine = TreeValidationEngine(self)
+        # Optional SQLite store that holds CodeSystem concepts instead of in-memory indexes
+        self.terminology_store = terminology_store
+        # Optional process pool that validates the entries of large Bundles
+        self.bundle_pool = bundle_pool
+        # Canonical indexes: url (latest), url|version and url|partial-version all resolve
+        self.structure_definitions = CanonicalIndex()
+        self.value_sets = CanonicalIndex()
+        self.code_systems = CanonicalIndex()
+        # Snapshots expanded from each profile's baseDefinition chain
+        self.snapshots = CanonicalIndex()
+        # CodeSystem hierarchies, and ValueSets expanded to (system, code) sets for binding checks
+        self.code_system_indexes = CanonicalIndex()
+        self.expansions = CanonicalIndex()
+        self._plans: Dict[str, ProfilePlan] = {}
         self._index_conformance_resources()
         
+        # Optional result cache shared across registry versions; starting a
+        # generation here drops results computed against the previous IG
+        self.result_cache = result_cache
+        self._cache_generation = result_cache.new_generation() if result_cache is not None else 0
+        
     def _index_conformance_resources(self) -> None:
         """Index StructureDefinitions, ValueSets, and CodeSystems for validation."""
+        # Reuse maps restored from the loader's registry snapshot
+        cached_index = self.resource_loader.conformance_index
+        if cached_index is not None:
+            self.structure_definitions = cached_index["structure_definitions"]
+            self.value_sets = cached_index["value_sets"]
+            self.code_systems = cached_index["code_systems"]
+            self.snapshots = cached_index["snapshots"]
+            self._snapshot_generator = SnapshotGenerator(self.structure_definitions)
+            self._snapshot_generator.seed(self.snapshots, cached_index["snapshot_dependencies"])
+            self.code_system_indexes = self._restore_code_system_indexes(cached_index["code_system_indexes"])
+            self._value_set_expander = ValueSetExpander(self.value_sets, self.code_system_indexes)
+            if self.code_system_indexes is cached_index["code_system_indexes"]:
+                self.expansions = cached_index["expansions"]
+                self._value_set_expander.seed(self.expansions)
+            else:
+                # Expansions may select codes through the indexes that were replaced
+                self.expansions = self._value_set_expander.expand_all()
+                cached_index["code_systems"] = self.code_systems
+                cached_index["code_system_indexes"] = self.code_system_indexes
+                cached_index["expansions"] = self.expansions
+            self._print_index_summary()
+            return
+            
         # Index StructureDefinitions
         structure_defs = self.resource_loader.get_resources_by_type("StructureDefinition")
         for sd in structure_defs:
             if sd.url:
-                self.structure_definitions[sd.url] = sd.content
+                self.structure_definitions.add(sd.url, sd.version, sd.content)
                 
         # Index ValueSets
         value_sets = self.resource_loader.get_resources_by_type("ValueSet")
         for vs in value_sets:
             if vs.url:
-                self.value_sets[vs.url] = vs.content
+                self.value_sets.add(vs.url, vs.version, vs.content)
                 
-        # Index CodeSystems
-        code_systems = self.resource_loader.get_resources_by_type("CodeSystem")
-        for cs in code_systems:
-            if cs.url:
-                self.code_systems[cs.url] = cs.content
+        # Expand profiles without a snapshot once per registry version
+        self._snapshot_generator = SnapshotGenerator(self.structure_definitions)
+        self.snapshots = self._snapshot_generator.expand_profiles()
+        
+        # Index CodeSystems and their hierarchies, and expand ValueSets once per registry version
+        self.code_systems, self.code_system_indexes = self._build_code_system_indexes()
+        self._value_set_expander = ValueSetExpander(self.value_sets, self.code_system_indexes)
+        self.expansions = self._value_set_expander.expand_all()
                 
+        # Register the maps with the loader so they are persisted in its snapshot
+        self.resource_loader.conformance_index = {
+            "structure_definitions": self.structure_definitions,
+            "value_sets": self.value_sets,
+            "code_systems": self.code_systems,
+            "snapshots": self.snapshots,
+            "snapshot_dependencies": self._snapshot_generator.dependencies,
+            "code_system_indexes": self.code_system_indexes,
+            "expansions": self.expansions,
+        }
+        self._print_index_summary()
+        
+    def _build_code_system_indexes(self) -> Tuple[CanonicalIndex, CanonicalIndex]:
+        """
+        Index CodeSystems and their hierarchies in memory, or compile them into the terminology store.
+        
+        With a store, CodeSystems are read from the loader one at a time and
+        only their headers and concept counts are kept.
+        """
+        if self.terminology_store is None:
+            code_systems = CanonicalIndex()
+            for cs in self.resource_loader.get_resources_by_type("CodeSystem"):
+                if cs.url:
+                    code_systems.add(cs.url, cs.version, cs.content)
+            return code_systems, build_code_system_indexes(code_systems)
+            
+        headers = CanonicalIndex()
+        
+        def contents():
+            for cs in self.resource_loader.by_type.get("CodeSystem", []):
+                if cs.url:
+                    content = self.resource_loader.load_content(cs)
+                    header = {field: content[field] for field in CODE_SYSTEM_HEADER if field in content}
+                    headers.add(cs.url, cs.version, header)
+                    yield content
+                    
+        indexes = self.terminology_store.compile(contents())
+        for index in indexes.all_values():
+            header = headers.get(f"{index.url}|{index.version}" if index.version else index.url)
+            if header is not None:
+                header['count'] = len(index)
+        return headers, indexes
+        
+    def _restore_code_system_indexes(self, cached_indexes: CanonicalIndex) -> CanonicalIndex:
+        """Reuse snapshot indexes unless a terminology store is configured or was when they were written."""
+        if self.terminology_store is None and all(
+                isinstance(index, CodeSystemIndex) for index in cached_indexes.all_values()):
+            return cached_indexes
+        # Unchanged CodeSystems are looked up in the store by fingerprint, not recompiled
+        self.code_systems, indexes = self._build_code_system_indexes()
+        return indexes
+        
+    def _print_index_summary(self) -> None:
+        """Print a summary of indexed conformance resources."""
         print(f"Indexed {len(self.structure_definitions)} StructureDefinitions")
         print(f"Indexed {len(self.value_sets)} ValueSets")
         print(f"Indexed {len(self.code_systems)} CodeSystems")
         
     def validate_resource(self, resource_data: Dict[str, Any], profile_url: Optional[str] = None, verbose: bool = False) -> ValidationResult:
-        """Validate a FHIR resource."""
+        """Validate a FHIR resource, reusing the cached result of an identical request."""
+        if self.result_cache is None:
+            return self._validate_resource(resource_data, profile_url, verbose)
+            
+        key = (resource_digest(resource_data), profile_url, verbose)
+        result = self.result_cache.get(self._cache_generation, key)
+        if result is None:
+            result = self._validate_resource(resource_data, profile_url, verbose)
+            self.result_cache.put(self._cache_generation, key, result)
+        return result
+        
+    def _validate_resource(self, resource_data: Dict[str, Any], profile_url: Optional[str], verbose: bool) -> ValidationResult:
         issues = []
         
         # Basic FHIR resource validation
@@ -69,19 +209,20 @@ class FhirValidator:
         issues.extend(basic_issues)
         
         # Profile-specific validation
+        profile_urls = []
         if profile_url:
-            profile_issues = self._validate_against_profile(resource_data, profile_url, verbose)
-            issues.extend(profile_issues)
-        elif 'meta' in resource_data and 'profile' in resource_data['meta']:
+            profile_urls = [profile_url]
+        elif isinstance(resource_data.get('meta'), dict) and 'profile' in resource_data['meta']:
             # Use profiles from meta.profile
             profiles = resource_data['meta']['profile']
-            if isinstance(profiles, list):
-                for profile in profiles:
-                    profile_issues = self._validate_against_profile(resource_data, profile, verbose)
-                    issues.extend(profile_issues)
-            else:
-                profile_issues = self._validate_against_profile(resource_data, profiles, verbose)
-                issues.extend(profile_issues)
+            profile_urls = profiles if isinstance(profiles, list) else [profiles]
+            
+        if profile_urls:
+            issues.extend(self._validate_profiles(resource_data, profile_urls, verbose))
+            
+        # Each Bundle entry is validated against its own meta.profile
+        if resource_data.get('resourceType') == 'Bundle':
+            issues.extend(self._validate_bundle_entries(resource_data, verbose))
         
         # Determine overall validation result
         has_errors = any(issue.severity == 'error' for issue in issues)
@@ -92,6 +233,39 @@ class FhirValidator:
             profile_url=profile_url
         )
         
+    def validate_bundle_entry(self, resource_data: Dict[str, Any], verbose: bool = False) -> List[ValidationIssue]:
+        """Issues of one Bundle entry resource, located relative to the resource."""
+        return self.validate_resource(resource_data, verbose=verbose).issues
+        
+    def _validate_bundle_entries(self, bundle: Dict[str, Any], verbose: bool) -> List[ValidationIssue]:
+        """Validate every entry.resource, on the bundle pool when the Bundle is large."""
+        entries = [(index, entry['resource']) for index, entry in enumerate(bundle.get('entry') or [])
+                   if isinstance(entry, dict) and isinstance(entry.get('resource'), dict)]
+        if not entries:
+            return []
+            
+        if self.bundle_pool is not None:
+            results = self.bundle_pool.validate(self, entries, verbose)
+        else:
+            results = [(index, self.validate_bundle_entry(resource, verbose)) for index, resource in entries]
+            
+        resources = dict(entries)
+        issues = []
+        for index, entry_issues in results:
+            prefix = f"Bundle.entry[{index}].resource"
+            resource_type = resources[index].get('resourceType')
+            for issue in entry_issues:
+                # Entry locations start with the entry's resource type, e.g. Patient.name[0]
+                location = issue.location
+                if not location or location == resource_type:
+                    location = prefix
+                elif isinstance(resource_type, str) and location.startswith((resource_type + '.', resource_type + '[')):
+                    location = prefix + location[len(resource_type):]
+                else:
+                    location = f"{prefix}.{location}"
+                issues.append(ValidationIssue(issue.severity, issue.code, issue.details, location))
+        return issues
+        
     def _validate_basic_structure(self, resource_data: Dict[str, Any]) -> List[ValidationIssue]:
         """Validate basic FHIR resource structure."""
         issues = []
@@ -113,13 +287,46 @@ class FhirValidator:
             
         return issues
         
-    def _validate_against_profile(self, resource_data: Dict[str, Any], profile_url: str, verbose: bool = False) -> List[ValidationIssue]:
-        """Validate resource against a specific StructureDefinition profile."""
+    def _validate_profiles(self, resource_data: Dict[str, Any], profile_urls: List[str], verbose: bool) -> List[ValidationIssue]:
+        """Validate against every declared profile with the configured engine."""
+        if self.engine == "tree":
+            return self._tree_engine.validate(resource_data, profile_urls, verbose)
+            
         issues = []
+        for profile in profile_urls:
+            issues.extend(self._validate_against_profile(resource_data, profile, verbose))
+            
+        if self.engine == "compare":
+            self.engine_stats["compared"] += 1
+            tree_issues = self._tree_engine.validate(resource_data, profile_urls, verbose)
+            if tree_issues != issues:
+                self.engine_stats["mismatches"] += 1
+                print(f"⚠️ Validation engines disagree for {resource_data.get('resourceType')}/{resource_data.get('id')} "
+                      f"against {profile_urls}: plan {len(issues)} issue(s), tree {len(tree_issues)} issue(s)")
+        return issues
         
-        # Get the StructureDefinition
-        structure_def = self.structure_definitions.get(profile_url)
-        if not structure_def:
+    def _validate_against_profile(self, resource_data: Dict[str, Any], profile_url: str, verbose: bool = False,
+                                  nodes: Optional[NodeLookup] = None) -> List[ValidationIssue]:
+        """
+        Validate resource against a specific StructureDefinition profile.
+        
+        Args:
+            nodes: Lookup for the located nodes of an element path; by default
+                each path is evaluated against the resource on demand
+        """
+        issues = []
+        if nodes is None:
+            # Rules and invariants often share a path; locate its nodes once
+            located: Dict[str, List[Node]] = {}
+            
+            def nodes(path: str) -> List[Node]:
+                if path not in located:
+                    located[path] = compile_path(path)(resource_data)
+                return located[path]
+        
+        # Get the compiled plan for the StructureDefinition
+        plan = self.get_profile_plan(profile_url)
+        if not plan:
             issues.append(ValidationIssue(
                 severity='warning',
                 code='not-found',
@@ -128,7 +335,7 @@ class FhirValidator:
             return issues
             
         # Validate resource type matches profile
-        expected_type = structure_def.get('type')
+        expected_type = plan.resource_type
         actual_type = resource_data.get('resourceType')
         
         if expected_type and actual_type != expected_type:
@@ -141,263 +348,258 @@ class FhirValidator:
             if not verbose:
                 return issues
             
-        # Validate differential elements
-        differential = structure_def.get('differential', {})
-        elements = differential.get('element', [])
-        
-        # Group elements by path for slice validation
-        elements_by_path = {}
-        for element in elements:
-            path = element.get('path', '')
-            if path not in elements_by_path:
-                elements_by_path[path] = []
-            elements_by_path[path].append(element)
-        
-        for path, path_elements in elements_by_path.items():
-            path_issues = self._validate_path_elements(resource_data, path, path_elements, profile_url, verbose)
-            issues.extend(path_issues)
+        # Run the precompiled differential rules
+        for rule in plan.rules:
+            if isinstance(rule, SliceRule):
+                if rule.is_extension:
+                    issues.extend(self._validate_extension_slice(rule, nodes(rule.path)))
+                else:
+                    issues.extend(self._validate_generic_slice(resource_data, rule, nodes(rule.path)))
+            elif isinstance(rule, InvariantRule):
+                issues.extend(self._validate_invariant(resource_data, rule, nodes(rule.path)))
+            else:
+                issues.extend(self._validate_element(rule, nodes(rule.path)))
             
         # In verbose mode, also validate additional structural issues
         if verbose:
-            structural_issues = self._validate_additional_structure(resource_data, expected_type)
+            structural_issues = self._validate_additional_structure(resource_data, expected_type, nodes)
             issues.extend(structural_issues)
             
         return issues
         
-    def _validate_path_elements(self, resource_data: Dict[str, Any], path: str, elements: List[Dict[str, Any]], profile_url: str, verbose: bool = False) -> List[ValidationIssue]:
-        """Validate elements for a specific path, handling slices."""
-        issues = []
-        
-        # Skip root element (e.g., "Patient")
-        if '.' not in path:
-            return issues
-            
-        # Check if this is a sliced element
-        has_slices = any('sliceName' in element for element in elements)
-        
-        if has_slices:
-            # Handle sliced elements
-            issues.extend(self._validate_sliced_elements(resource_data, path, elements, profile_url, verbose))
-        else:
-            # Handle regular elements
-            for element in elements:
-                element_issues = self._validate_element(resource_data, element, profile_url, verbose)
-                issues.extend(element_issues)
-                
-        return issues
-        
-    def _validate_sliced_elements(self, resource_data: Dict[str, Any], path: str, elements: List[Dict[str, Any]], profile_url: str, verbose: bool = False) -> List[ValidationIssue]:
-        """Validate sliced elements (like extension slices)."""
-        issues = []
-        
-        # Extract the field path (e.g., "Patient.extension" -> "extension")
-        field_path = path.split('.', 1)[1] if '.' in path else path
+    def get_snapshot(self, profile_url: str) -> Optional[ExpandedSnapshot]:
+        """Get the expanded snapshot of a StructureDefinition, generating it on first use."""
+        return self._snapshot_generator.generate(profile_url)
         
-        # Get the actual data for this path
-        actual_data = self._get_element_data(resource_data, field_path)
+    def get_code_system_index(self, system: str) -> Optional[CodeSystemIndex]:
+        """Get the hierarchy index of a CodeSystem by canonical URL (optionally url|version)."""
+        return self.code_system_indexes.get(system)
         
-        # Find slice definitions (elements with sliceName)
-        slice_elements = [e for e in elements if 'sliceName' in e]
+    def get_expansion(self, value_set_url: str) -> Optional[ValueSetExpansion]:
+        """Get the expansion of a ValueSet, expanding it on first use."""
+        return self._value_set_expander.expand(value_set_url)
         
-        for slice_element in slice_elements:
-            slice_name = slice_element.get('sliceName')
-            min_occurs = slice_element.get('min', 0)
-            max_occurs = slice_element.get('max', '*')
+    def get_profile_plan(self, profile_url: str) -> Optional[ProfilePlan]:
+        """Get the compiled validation plan for a profile, compiling it on first use."""
+        structure_def = self.structure_definitions.get(profile_url)
+        if not structure_def:
+            return None
             
-            # For extension slices, check by URL
-            if field_path == 'extension':
-                slice_issues = self._validate_extension_slice(
-                    resource_data, slice_element, slice_name, min_occurs, max_occurs, profile_url, verbose
-                )
-                issues.extend(slice_issues)
-            else:
-                # Handle other types of slices (identifiers, etc.)
-                slice_issues = self._validate_generic_slice(
-                    resource_data, field_path, slice_element, slice_name, min_occurs, max_occurs, profile_url, verbose
-                )
-                issues.extend(slice_issues)
-                
-        return issues
+        plan = self._plans.get(profile_url)
+        if plan is None or not plan.is_current(structure_def):
+            # First use, or the StructureDefinition was replaced since compilation
+            if plan is not None:
+                self._snapshot_generator.invalidate(profile_url)
+            with self._snapshot_generator.reads() as dependencies:
+                plan = compile_profile_plan(profile_url, structure_def, self.get_snapshot)
+            plan = replace(plan, dependencies=tuple(dependencies.items()))
+            self._plans[profile_url] = plan
+        return plan
+        
+    def inherit_compiled_state(self, previous: "FhirValidator") -> None:
+        """
+        Reuse compiled plans from the validator of a previous registry version.
+        
+        Plans whose StructureDefinition content is unchanged, and whose
+        extension, type and base definitions are all unchanged too, stay
+        valid; the others are recompiled on first use.
+        """
+        for profile_url, plan in previous._plans.items():
+            structure_def = self.structure_definitions.get(profile_url)
+            if structure_def is not None and plan.is_current(structure_def, self.structure_definitions.get):
+                self._plans[profile_url] = plan
+        
+    def invalidate_plans(self, profile_url: Optional[str] = None) -> None:
+        """Drop compiled plans for one profile, or for all profiles when no URL is given."""
+        if profile_url is None:
+            self._plans.clear()
+        else:
+            self._plans.pop(profile_url, None)
+        # Cached results may have been produced by the dropped plans
+        if self.result_cache is not None:
+            self._cache_generation = self.result_cache.new_generation()
         
-    def _validate_extension_slice(self, resource_data: Dict[str, Any], slice_element: Dict[str, Any], slice_name: str, min_occurs: int, max_occurs: str, profile_url: str, verbose: bool = False) -> List[ValidationIssue]:
+    def _validate_extension_slice(self, rule: SliceRule, extensions: List[Node]) -> List[ValidationIssue]:
         """Validate a specific extension slice."""
         issues = []
         
-        # Get the expected extension URL from the slice type profile
-        slice_type = slice_element.get('type', [])
-        expected_url = None
-        
-        for type_def in slice_type:
-            if type_def.get('code') == 'Extension':
-                profiles = type_def.get('profile', [])
-                if profiles:
-                    expected_url = profiles[0].split('|')[0]  # Remove version if present
-                    break
-        
-        if not expected_url:
-            return issues
-            
         # Count matching extensions in the resource
-        extensions = resource_data.get('extension', [])
         matching_count = 0
+        value_nodes = []
         
-        for ext in extensions:
-            if ext.get('url') == expected_url:
+        for location, ext in extensions:
+            if isinstance(ext, dict) and ext.get('url') == rule.extension_url:
                 matching_count += 1
+                value_nodes.extend((f'{location}.{key}', value) for key, value in ext.items() if key.startswith('value'))
                 
         # Check minimum cardinality
-        if matching_count < min_occurs:
+        if matching_count < rule.min_occurs:
             issues.append(ValidationIssue(
                 severity='error',
                 code='cardinality-min',
-                details=f'Extension slice "{slice_name}" requires minimum {min_occurs} occurrence(s), found {matching_count}. Expected URL: {expected_url}',
-                location=f'Patient.extension:{slice_name}'
+                details=f'Extension slice "{rule.slice_name}" requires minimum {rule.min_occurs} occurrence(s), found {matching_count}. Expected URL: {rule.extension_url}',
+                location=f'Patient.extension:{rule.slice_name}'
             ))
             
         # Check maximum cardinality
-        if max_occurs != '*' and matching_count > int(max_occurs):
+        if rule.max_occurs != '*' and matching_count > int(rule.max_occurs):
             issues.append(ValidationIssue(
                 severity='error',
                 code='cardinality-max',
-                details=f'Extension slice "{slice_name}" allows maximum {max_occurs} occurrence(s), found {matching_count}',
-                location=f'Patient.extension:{slice_name}'
+                details=f'Extension slice "{rule.slice_name}" allows maximum {rule.max_occurs} occurrence(s), found {matching_count}',
+                location=f'Patient.extension:{rule.slice_name}'
             ))
             
+        # Check extension values against the binding of the extension profile
+        if rule.value_binding and value_nodes:
+            issues.extend(self._validate_binding(value_nodes, f'{rule.path}:{rule.slice_name}', rule.value_binding))
+            
         return issues
         
-    def _validate_generic_slice(self, resource_data: Dict[str, Any], field_path: str, slice_element: Dict[str, Any], slice_name: str, min_occurs: int, max_occurs: str, profile_url: str, verbose: bool = False) -> List[ValidationIssue]:
+    def _validate_generic_slice(self, resource_data: Dict[str, Any], rule: SliceRule, field_nodes: List[Node]) -> List[ValidationIssue]:
         """Validate a generic slice (non-extension)."""
         issues = []
         
         # This is a placeholder for other types of slices
         # For now, just check basic cardinality
-        field_data = self._get_element_data(resource_data, field_path)
-        
-        if field_data is None:
-            if min_occurs > 0:
+        if not field_nodes:
+            if rule.min_occurs > 0:
                 issues.append(ValidationIssue(
                     severity='error',
                     code='cardinality-min',
-                    details=f'Slice "{slice_name}" requires minimum {min_occurs} occurrence(s), but field is missing',
-                    location=f'{resource_data.get("resourceType", "Unknown")}.{field_path}:{slice_name}'
+                    details=f'Slice "{rule.slice_name}" requires minimum {rule.min_occurs} occurrence(s), but field is missing',
+                    location=f'{resource_data.get("resourceType", "Unknown")}.{rule.field_path}:{rule.slice_name}'
                 ))
                 
         return issues
         
-    def _validate_element(self, resource_data: Dict[str, Any], element: Dict[str, Any], profile_url: str, verbose: bool = False) -> List[ValidationIssue]:
-        """Validate a specific element against its definition."""
+    def _validate_element(self, rule: ElementRule, nodes: List[Node]) -> List[ValidationIssue]:
+        """Validate a specific element against the nodes found at its path."""
         issues = []
         
-        path = element.get('path', '')
-        element_id = element.get('id', '')
-        min_occurs = element.get('min', 0)
-        max_occurs = element.get('max', '*')
-        
-        # Skip root element (e.g., "Patient")
-        if '.' not in path:
-            return issues
-            
-        # Extract the field path (e.g., "Patient.extension" -> "extension")
-        field_path = path.split('.', 1)[1] if '.' in path else path
-        
         # Check minimum cardinality
-        if min_occurs > 0:
-            if not self._element_exists(resource_data, field_path):
+        if rule.min_occurs > 0:
+            if not nodes:
                 issues.append(ValidationIssue(
                     severity='error',
                     code='required',
-                    details=f'Required element missing: {field_path}',
-                    location=path
+                    details=f'Required element missing: {rule.field_path}',
+                    location=rule.path
                 ))
                 
         # Validate binding if present
-        binding = element.get('binding')
-        if binding and self._element_exists(resource_data, field_path):
-            binding_issues = self._validate_binding(resource_data, field_path, binding)
+        if rule.binding and nodes:
+            binding_issues = self._validate_binding(nodes, rule.field_path, rule.binding)
             issues.extend(binding_issues)
             
         return issues
         
-    def _get_element_data(self, resource_data: Dict[str, Any], field_path: str) -> Any:
-        """Get the data for a specific field path."""
-        try:
-            parts = field_path.split('.')
-            current = resource_data
-            
-            for part in parts:
-                if isinstance(current, list):
-                    # For arrays, return the array itself
-                    return current
-                elif isinstance(current, dict):
-                    if part not in current:
-                        return None
-                    current = current[part]
-                else:
-                    return None
-                    
-            return current
-        except:
-            return None
+    def _validate_invariant(self, resource_data: Dict[str, Any], rule: InvariantRule, nodes: List[Node]) -> List[ValidationIssue]:
+        """Evaluate a compiled FHIRPath constraint on each node at its path."""
+        issues = []
         
-    def _element_exists(self, resource_data: Dict[str, Any], field_path: str) -> bool:
-        """Check if an element exists in the resource."""
-        try:
-            parts = field_path.split('.')
-            current = resource_data
-            
-            for part in parts:
-                if isinstance(current, list):
-                    # For arrays, check if any item has the field
-                    found = False
-                    for item in current:
-                        if isinstance(item, dict) and part in item:
-                            found = True
-                            current = item[part]
-                            break
-                    if not found:
-                        return False
-                elif isinstance(current, dict):
-                    if part not in current:
-                        return False
-                    current = current[part]
-                else:
-                    return False
-                    
-            return True
-        except:
-            return False
-            
-    def _validate_binding(self, resource_data: Dict[str, Any], field_path: str, binding: Dict[str, Any]) -> List[ValidationIssue]:
+        for location, node in nodes:
+            if rule.extension_url and not (isinstance(node, dict) and node.get('url') == rule.extension_url):
+                continue
+            try:
+                satisfied = rule.expression.is_satisfied(node, resource_data)
+            except FhirPathError:
+                # A node the supported subset cannot evaluate is not reported as a violation
+                continue
+            if not satisfied:
+                issues.append(ValidationIssue(
+                    severity=rule.severity,
+                    code='invariant',
+                    details=f'Constraint {rule.key} failed: {rule.human}',
+                    location=location
+                ))
+                
+        return issues
+        
+    def _validate_binding(self, nodes: List[Node], field_path: str, binding: BindingRule) -> List[ValidationIssue]:
         """Validate terminology binding."""
         issues = []
         
-        value_set_url = binding.get('valueSet')
-        strength = binding.get('strength', 'required')
-        
-        if not value_set_url:
-            return issues
-            
-        # Get the ValueSet
-        value_set = self.value_sets.get(value_set_url)
-        if not value_set:
-            if strength == 'required':
+        # Get the precomputed ValueSet expansion
+        expansion = self.get_expansion(binding.value_set_url)
+        if expansion is None:
+            if binding.strength == 'required':
                 issues.append(ValidationIssue(
                     severity='warning',
                     code='valueset-not-found',
-                    details=f'ValueSet not found for binding: {value_set_url}',
+                    details=f'ValueSet not found for binding: {binding.value_set_url}',
                     location=field_path
                 ))
             return issues
             
-        # For now, just record that we found the binding
-        # Full terminology validation would require more complex logic
-        
+        # Only required and extensible bindings constrain codes; codes outside an
+        # incomplete expansion cannot be judged
+        if binding.strength not in ('required', 'extensible') or not expansion.complete:
+            return issues
+            
+        for location, value in nodes:
+            codes = coded_values(value)
+            if codes is None:
+                continue
+            if any(expansion.contains(system, code) for system, code in codes):
+                continue
+            if not codes:
+                # Text alone is acceptable where the binding is extensible
+                if binding.strength == 'required':
+                    issues.append(ValidationIssue(
+                        severity='error',
+                        code='code-invalid',
+                        details=f'No code provided for required binding to ValueSet {binding.value_set_url}',
+                        location=location
+                    ))
+                continue
+            shown = ', '.join(f'{system}#{code}' if system else code for system, code in codes)
+            issues.append(ValidationIssue(
+                severity='error' if binding.strength == 'required' else 'warning',
+                code='code-invalid',
+                details=f'Code {shown} is not in ValueSet {binding.value_set_url} ({binding.strength} binding)',
+                location=location
+            ))
+            
         return issues
         
-    def _validate_additional_structure(self, resource_data: Dict[str, Any], expected_type: str) -> List[ValidationIssue]:
+    def _validate_additional_structure(self, resource_data: Dict[str, Any], expected_type: str, nodes: NodeLookup) -> List[ValidationIssue]:
         """Validate additional structural issues in verbose mode."""
         issues = []
         
+        # Valid fields come from the base resource snapshot when its definition is loaded
+        base_snapshot = self.get_snapshot(BASE_STRUCTURE_DEFINITION + expected_type) if expected_type else None
+        if base_snapshot is not None and base_snapshot.complete:
+            valid_fields = base_snapshot.field_names
+        else:
+            valid_fields = self._fallback_valid_fields(expected_type)
+        
+        # Check for invalid fields; types whose elements are unknown are not checked
+        invalid_fields = []
+        for field_name in resource_data.keys():
+            if valid_fields is not None and field_name not in valid_fields:
+                invalid_fields.append(field_name)
+        
+        for field in invalid_fields:
+            issues.append(ValidationIssue(
+                severity='error',
+                code='invalid-field',
+                details=f'Invalid field "{field}" found in {expected_type} resource',
+                location=f'{expected_type}.{field}'
+            ))
+        
+        # Resource-specific validation
+        if expected_type == 'Patient':
+            issues.extend(self._validate_patient_specific(resource_data, nodes))
+        elif expected_type == 'Encounter':
+            issues.extend(self._validate_encounter_specific(resource_data, nodes))
+        elif expected_type == 'Medication':
+            issues.extend(self._validate_medication_specific(resource_data, nodes))
+        
+        return issues
+    
+    def _fallback_valid_fields(self, expected_type: str) -> Optional[List[str]]:
+        """Known fields per resource type, used when the base resource definitions are not loaded; None if unknown."""
         # Define valid fields for different resource types
         common_fields = ['resourceType', 'id', 'meta', 'implicitRules', 'language', 
                         'text', 'contained', 'extension', 'modifierExtension']
@@ -429,34 +631,10 @@ class FhirValidator:
             ]
         }
         
-        # Get valid fields for this resource type, default to common fields only
-        valid_fields = valid_fields_by_type.get(expected_type, common_fields)
-        
-        # Check for invalid fields
-        invalid_fields = []
-        for field_name in resource_data.keys():
-            if field_name not in valid_fields:
-                invalid_fields.append(field_name)
-        
-        for field in invalid_fields:
-            issues.append(ValidationIssue(
-                severity='error',
-                code='invalid-field',
-                details=f'Invalid field "{field}" found in {expected_type} resource',
-                location=f'{expected_type}.{field}'
-            ))
-        
-        # Resource-specific validation
-        if expected_type == 'Patient':
-            issues.extend(self._validate_patient_specific(resource_data))
-        elif expected_type == 'Encounter':
-            issues.extend(self._validate_encounter_specific(resource_data))
-        elif expected_type == 'Medication':
-            issues.extend(self._validate_medication_specific(resource_data))
-        
-        return issues
+        # Get valid fields for this resource type; the common fields alone would flag every real element
+        return valid_fields_by_type.get(expected_type)
     
-    def _validate_patient_specific(self, resource_data: Dict[str, Any]) -> List[ValidationIssue]:
+    def _validate_patient_specific(self, resource_data: Dict[str, Any], nodes: NodeLookup) -> List[ValidationIssue]:
         """Validate Patient-specific structural issues."""
         issues = []
         
@@ -484,58 +662,52 @@ class FhirValidator:
                 ))
         
         # Check telecom format
-        if 'telecom' in resource_data:
-            telecoms = resource_data['telecom']
-            if isinstance(telecoms, list):
-                for i, telecom in enumerate(telecoms):
-                    if 'system' in telecom:
-                        system = telecom['system']
-                        valid_systems = ['phone', 'fax', 'email', 'pager', 'url', 'sms', 'other']
-                        if system not in valid_systems:
-                            issues.append(ValidationIssue(
-                                severity='error',
-                                code='invalid-value',
-                                details=f'Invalid telecom system: "{system}". Must be one of: {", ".join(valid_systems)}',
-                                location=f'Patient.telecom[{i}].system'
-                            ))
+        valid_systems = ['phone', 'fax', 'email', 'pager', 'url', 'sms', 'other']
+        for location, system in nodes('Patient.telecom.system'):
+            if system not in valid_systems:
+                issues.append(ValidationIssue(
+                    severity='error',
+                    code='invalid-value',
+                    details=f'Invalid telecom system: "{system}". Must be one of: {", ".join(valid_systems)}',
+                    location=location
+                ))
         
         # Check extensions for wrong data types
-        if 'extension' in resource_data:
-            extensions = resource_data['extension']
-            if isinstance(extensions, list):
-                for i, ext in enumerate(extensions):
-                    url = ext.get('url', '')
-                    
-                    # Check for religion extension with wrong type
-                    if 'religion' in url and 'valueString' in ext:
-                        issues.append(ValidationIssue(
-                            severity='error',
-                            code='wrong-data-type',
-                            details='Religion extension should use valueCodeableConcept, not valueString',
-                            location=f'Patient.extension[{i}]'
-                        ))
-                    
-                    # Check for educational attainment with wrong type
-                    if 'educational-attainment' in url and 'valueBoolean' in ext:
-                        issues.append(ValidationIssue(
-                            severity='error',
-                            code='wrong-data-type',
-                            details='Educational attainment extension should use valueCodeableConcept, not valueBoolean',
-                            location=f'Patient.extension[{i}]'
-                        ))
-                    
-                    # Check for invalid extension URLs
-                    if 'invalid-extension-url' in url or 'not-allowed' in url:
-                        issues.append(ValidationIssue(
-                            severity='error',
-                            code='invalid-extension',
-                            details=f'Invalid or unauthorized extension URL: {url}',
-                            location=f'Patient.extension[{i}]'
-                        ))
+        for location, ext in nodes('Patient.extension'):
+            if not isinstance(ext, dict):
+                continue
+            url = ext.get('url', '')
+            
+            # Check for religion extension with wrong type
+            if 'religion' in url and 'valueString' in ext:
+                issues.append(ValidationIssue(
+                    severity='error',
+                    code='wrong-data-type',
+                    details='Religion extension should use valueCodeableConcept, not valueString',
+                    location=location
+                ))
+            
+            # Check for educational attainment with wrong type
+            if 'educational-attainment' in url and 'valueBoolean' in ext:
+                issues.append(ValidationIssue(
+                    severity='error',
+                    code='wrong-data-type',
+                    details='Educational attainment extension should use valueCodeableConcept, not valueBoolean',
+                    location=location
+                ))
+            
+            # Check for invalid extension URLs
+            if 'invalid-extension-url' in url or 'not-allowed' in url:
+                issues.append(ValidationIssue(
+                    severity='error',
+                    code='invalid-extension',
+                    details=f'Invalid or unauthorized extension URL: {url}',
+                    location=location
+                ))
         
         return issues
     
-    def _validate_encounter_specific(self, resource_data: Dict[str, Any]) -> List[ValidationIssue]:
+    def _validate_encounter_specific(self, resource_data: Dict[str, Any], nodes: NodeLookup) -> List[ValidationIssue]:
         """Validate Encounter-specific structural issues."""
         issues = []
         
@@ -601,7 +773,7 @@ class FhirValidator:
         
         return issues
     
-    def _validate_medication_specific(self, resource_data: Dict[str, Any]) -> List[ValidationIssue]:
+    def _validate_medication_specific(self, resource_data: Dict[str, Any], nodes: NodeLookup) -> List[ValidationIssue]:
         """Validate Medication-specific structural issues."""
         issues = []
         
@@ -676,51 +848,50 @@ class FhirValidator:
                         ))
         
         # Check ingredient structure
-        if 'ingredient' in resource_data:
-            ingredients = resource_data['ingredient']
-            if isinstance(ingredients, list):
-                for i, ingredient in enumerate(ingredients):
-                    if 'itemString' in ingredient:
-                        issues.append(ValidationIssue(
-                            severity='error',
-                            code='wrong-data-type',
-                            details='Medication ingredient should use itemCodeableConcept, not itemString',
-                            location=f'Medication.ingredient[{i}]'
-                        ))
-                    
-                    if 'strength' in ingredient:
-                        strength = ingredient['strength']
-                        if isinstance(strength, str):
-                            issues.append(ValidationIssue(
-                                severity='error',
-                                code='wrong-data-type',
-                                details='Medication ingredient strength should be a Ratio object, not a string',
-                                location=f'Medication.ingredient[{i}].strength'
-                            ))
-                        elif isinstance(strength, dict):
-                            if 'numerator' in strength:
-                                numerator = strength['numerator']
-                                if isinstance(numerator, dict) and 'value' in numerator:
-                                    value = numerator['value']
-                                    if isinstance(value, str) or (isinstance(value, (int, float)) and value < 0):
-                                        issues.append(ValidationIssue(
-                                            severity='error',
-                                            code='invalid-value',
-                                            details=f'Invalid strength numerator value: "{value}". Must be a positive number',
-                                            location=f'Medication.ingredient[{i}].strength.numerator.value'
-                                        ))
-                            if 'denominator' in strength:
-                                denominator = strength['denominator']
-                                if isinstance(denominator, dict) and 'value' in denominator:
-                                    value = denominator['value']
-                                    if isinstance(value, str):
-                                        issues.append(ValidationIssue(
-                                            severity='error',
-                                            code='wrong-data-type',
-                                            details='Medication ingredient strength denominator value should be a number, not a string',
-                                            location=f'Medication.ingredient[{i}].strength.denominator.value'
-                                        ))
-        
+        for location, ingredient in nodes('Medication.ingredient'):
+            if not isinstance(ingredient, dict):
+                continue
+            if 'itemString' in ingredient:
+                issues.append(ValidationIssue(
+                    severity='error',
+                    code='wrong-data-type',
+                    details='Medication ingredient should use itemCodeableConcept, not itemString',
+                    location=location
+                ))
+            
+            if 'strength' in ingredient:
+                strength = ingredient['strength']
+                if isinstance(strength, str):
+                    issues.append(ValidationIssue(
+                        severity='error',
+                        code='wrong-data-type',
+                        details='Medication ingredient strength should be a Ratio object, not a string',
+                        location=f'{location}.strength'
+                    ))
+                elif isinstance(strength, dict):
+                    if 'numerator' in strength:
+                        numerator = strength['numerator']
+                        if isinstance(numerator, dict) and 'value' in numerator:
+                            value = numerator['value']
+                            if isinstance(value, str) or (isinstance(value, (int, float)) and value < 0):
+                                issues.append(ValidationIssue(
+                                    severity='error',
+                                    code='invalid-value',
+                                    details=f'Invalid strength numerator value: "{value}". Must be a positive number',
+                                    location=f'{location}.strength.numerator.value'
+                                ))
+                    if 'denominator' in strength:
+                        denominator = strength['denominator']
+                        if isinstance(denominator, dict) and 'value' in denominator:
+                            value = denominator['value']
+                            if isinstance(value, str):
+                                issues.append(ValidationIssue(
+                                    severity='error',
+                                    code='wrong-data-type',
+                                    details='Medication ingredient strength denominator value should be a number, not a string',
+                                    location=f'{location}.strength.denominator.value'
+                                ))
+
         # Check batch structure
         if 'batch' in resource_data:
             batch = resource_data['batch']
@@ -0,0 +1,89 @@
+"""
+PHCore Validation Workers
+Builds validators inside fresh worker processes for the Bundle and request pools.
+"""
+
+import contextlib
+import io
+import multiprocessing
+from dataclasses import dataclass
+from multiprocessing.context import BaseContext
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.validation.terminology_store import STORED_RESOURCE_TYPES, TerminologyStore
+
+if TYPE_CHECKING:
+    from fhir_server.validation.validator import FhirValidator
+
+
+def worker_context() -> BaseContext:
+    """
+    Start method for validation worker processes.
+
+    The server is multithreaded by the time a pool starts (event loop,
+    registry watcher, job workers), and a forked child inherits every lock
+    in whatever state another thread left it. Workers are therefore started
+    from the single-threaded forkserver, or spawned where it is unavailable.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+
+class RegistryMismatchError(RuntimeError):
+    """Raised when a worker process loaded a different registry version than its pool was started for."""
+
+
+@dataclass(frozen=True)
+class ValidatorSpec:
+    """Everything a worker process needs to rebuild a validator from the resource files."""
+    resources_dir: str
+    base_resources_dir: str
+    snapshot_path: Optional[str]
+    lazy: bool
+    lazy_cache_size: int
+    engine: str
+    terminology_db: Optional[str]
+    # Fingerprint of the source files the pinned registry version was read from
+    fingerprint: Optional[Tuple[Any, ...]] = None
+
+    @classmethod
+    def from_validator(cls, validator: "FhirValidator") -> "ValidatorSpec":
+        loader = validator.resource_loader
+        return cls(
+            resources_dir=str(loader.resources_dir),
+            base_resources_dir=str(loader.base_resources_dir),
+            snapshot_path=str(loader.snapshot_path) if loader.snapshot_path else None,
+            lazy=loader.lazy,
+            lazy_cache_size=loader.lazy_cache_size,
+            engine=validator.engine,
+            terminology_db=validator.terminology_store.path if validator.terminology_store is not None else None,
+            fingerprint=loader.fingerprint,
+        )
+
+    def build(self) -> "FhirValidator":
+        """
+        Load the registry and build a validator in the calling process.
+
+        The registry snapshot makes this a restore rather than a parse when
+        it is fresh. Worker validators keep no result cache and validate
+        nested Bundles serially.
+
+        Raises:
+            RegistryMismatchError: If the resource files changed since the
+                pinned registry version was read, so the files on disk no
+                longer hold that version
+        """
+        # The validator module imports the pools that import this one
+        from fhir_server.validation.validator import FhirValidator
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            loader = ResourceLoader(self.resources_dir, self.base_resources_dir, snapshot_path=self.snapshot_path,
+                                    lazy=self.lazy, lazy_cache_size=self.lazy_cache_size,
+                                    on_demand_types=STORED_RESOURCE_TYPES if self.terminology_db else ())
+            loader.load_all_resources()
+            if self.fingerprint is not None and loader.fingerprint != self.fingerprint:
+                raise RegistryMismatchError(
+                    f"Resource files in {self.resources_dir} changed since the registry was loaded")
+            store = TerminologyStore(self.terminology_db) if self.terminology_db else None
+            return FhirValidator(loader, engine=self.engine, terminology_store=store)
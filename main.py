@@ -4,19 +4,39 @@ PHCore FHIR Validation Server
 Main entry point to run the FHIR validation server.
 """
 
+import argparse
+import gc
+
 import uvicorn
 from fhir_server.api.server import create_server
+from fhir_server.core.config import ServerConfig
 
 
 def main():
     """Start the FHIR validation server."""
+    parser = argparse.ArgumentParser(description="PHCore FHIR Validation Server")
+    config = ServerConfig.from_env()
+    parser.add_argument("--workers", type=int, default=config.workers,
+                        help="Worker processes forked after the registry is loaded (default: PHCORE_WORKERS or 1)")
+    args = parser.parse_args()
+    config.workers = args.workers
+
     print("🚀 Starting PHCore FHIR Validation Server")
     print("📂 Loading resources from resources/ and fhir_base_resources/")
     print("🌐 Server will be available at: http://localhost:5072")
     print("📋 API Documentation: http://localhost:5072/docs")
     
+    if args.workers > 1:
+        from fhir_server.api.prefork import PreforkServer
+
+        # Load the registry once with the collector paused; the workers share its pages
+        gc.disable()
+        app = create_server(config=config)
+        PreforkServer(app, host="0.0.0.0", port=5072, workers=args.workers).run()
+        return
+
     # Create the FastAPI app
-    app = create_server()
+    app = create_server(config=config)
     
     # Start the server
     uvicorn.run(app, host="0.0.0.0", port=5072)
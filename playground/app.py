@@ -10,8 +10,10 @@ from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
 
+from fhir_server.api.executor import ValidationExecutor
+from fhir_server.core.registry import RegistryManager
 from fhir_server.core.resource_loader import ResourceLoader
-from fhir_server.validation.validator import FhirValidator
+from fhir_server.validation.validator import FhirValidator, ValidationResult
 
 
 class PlaygroundApp:
@@ -20,16 +22,23 @@ class PlaygroundApp:
     Provides a web-based interface for validation, documentation, and examples.
     """
     
-    def __init__(self, resource_loader: ResourceLoader, validator: FhirValidator):
+    def __init__(self, resource_loader: ResourceLoader, validator: FhirValidator, registry: Optional[RegistryManager] = None,
+                 executor: Optional[ValidationExecutor] = None):
         """
         Initialize the playground application.
         
         Args:
             resource_loader: ResourceLoader instance for FHIR resources
             validator: FhirValidator instance for validation operations
+            registry: Optional RegistryManager; when given, the current registry
+                version is used so hot reloads are picked up
+            executor: Optional ValidationExecutor; when given, validations run on
+                its pool instead of the event loop
         """
-        self.resource_loader = resource_loader
-        self.validator = validator
+        self._resource_loader = resource_loader
+        self._validator = validator
+        self.registry = registry
+        self.executor = executor
         
         # Initialize templates
         self.templates = self._setup_templates()
@@ -37,6 +46,20 @@ class PlaygroundApp:
         # Load example resources
         self.examples = self._load_examples()
         
+    @property
+    def resource_loader(self) -> ResourceLoader:
+        """Resource loader of the current registry version."""
+        if self.registry:
+            return self.registry.current.resource_loader
+        return self._resource_loader
+        
+    @property
+    def validator(self) -> FhirValidator:
+        """Validator of the current registry version."""
+        if self.registry:
+            return self.registry.current.validator
+        return self._validator
+        
     def _setup_templates(self) -> Jinja2Templates:
         """Set up Jinja2 template environment."""
         templates_dir = Path(__file__).parent / "templates"
@@ -202,41 +225,56 @@ class PlaygroundApp:
         """
         try:
             result = self.validator.validate_resource(resource_data, verbose=verbose)
-            
-            # Format issues for UI display
-            formatted_issues = []
-            for issue in result.issues:
-                formatted_issues.append({
-                    "severity": issue.severity,
-                    "code": issue.code,
-                    "details": issue.details,
-                    "location": issue.location or "root",
-                    "severity_class": self._get_severity_class(issue.severity)
-                })
-                
-            return {
-                "success": len(result.issues) == 0,
-                "issues": formatted_issues,
-                "total_issues": len(result.issues),
-                "error_count": len([i for i in result.issues if i.severity == "error"]),
-                "warning_count": len([i for i in result.issues if i.severity == "warning"])
-            }
-            
         except Exception as e:
-            return {
-                "success": False,
-                "issues": [{
-                    "severity": "error",
-                    "code": "exception",
-                    "details": f"Validation error: {str(e)}",
-                    "location": "root",
-                    "severity_class": "error"
-                }],
-                "total_issues": 1,
-                "error_count": 1,
-                "warning_count": 0
-            }
+            return self._format_validation_error(e)
+        return self._format_validation_result(result)
+        
+    async def validate_example_resource_async(self, resource_data: Dict[str, Any], verbose: bool = False) -> Dict[str, Any]:
+        """Validate an example resource on the executor, returning the same format as validate_example_resource."""
+        if self.executor is None:
+            return self.validate_example_resource(resource_data, verbose=verbose)
+        try:
+            result = await self.executor.validate(self.validator, resource_data, verbose=verbose)
+        except Exception as e:
+            return self._format_validation_error(e)
+        return self._format_validation_result(result)
+        
+    def _format_validation_result(self, result: ValidationResult) -> Dict[str, Any]:
+        """Format issues for UI display."""
+        formatted_issues = []
+        for issue in result.issues:
+            formatted_issues.append({
+                "severity": issue.severity,
+                "code": issue.code,
+                "details": issue.details,
+                "location": issue.location or "root",
+                "severity_class": self._get_severity_class(issue.severity)
+            })
             
+        return {
+            "success": len(result.issues) == 0,
+            "issues": formatted_issues,
+            "total_issues": len(result.issues),
+            "error_count": len([i for i in result.issues if i.severity == "error"]),
+            "warning_count": len([i for i in result.issues if i.severity == "warning"])
+        }
+        
+    def _format_validation_error(self, error: Exception) -> Dict[str, Any]:
+        """Format a validation failure as a single error issue."""
+        return {
+            "success": False,
+            "issues": [{
+                "severity": "error",
+                "code": "exception",
+                "details": f"Validation error: {str(error)}",
+                "location": "root",
+                "severity_class": "error"
+            }],
+            "total_issues": 1,
+            "error_count": 1,
+            "warning_count": 0
+        }
+        
     def _get_severity_class(self, severity: str) -> str:
         """Get CSS class for severity level."""
         severity_map = {
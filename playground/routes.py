@@ -87,7 +87,7 @@ def setup_playground_routes(app: FastAPI, playground_app: PlaygroundApp) -> None
             JSON response with validation results
         """
         try:
-            result = playground_app.validate_example_resource(
+            result = await playground_app.validate_example_resource_async(
                 request.resource, 
                 verbose=request.verbose
             )
@@ -206,7 +206,7 @@ def setup_playground_routes(app: FastAPI, playground_app: PlaygroundApp) -> None
             resource_data = json.loads(example_data)
             
             # Validate the resource
-            result = playground_app.validate_example_resource(resource_data, verbose=verbose)
+            result = await playground_app.validate_example_resource_async(resource_data, verbose=verbose)
             
             return JSONResponse(content=result)
             
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+$validate Request Path Benchmark
+Compares the pydantic request-model path with the raw-body fast JSON path for one resource.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Union
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from fhir_server.api.server import FhirServer, ValidationRequest
+from fhir_server.core import fast_json
+from fhir_server.core.config import ServerConfig
+
+DEFAULT_RESOURCE = "examples/valid/patient/test-patient-comprehensive.json"
+
+
+def _median_ms(run: Callable[[], Any], iterations: int) -> float:
+    timings: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    """Time decoding, validation and encoding on both request paths."""
+    parser = argparse.ArgumentParser(description="Benchmark the $validate request paths")
+    parser.add_argument("resource", nargs="?", default=DEFAULT_RESOURCE, help="JSON resource to validate")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    body = Path(args.resource).read_bytes()
+    print("⏱️  $validate Request Path Benchmark")
+    print("=" * 60)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = FhirServer(ServerConfig.from_env())
+    validator = server.registry.current.validator
+    build_outcome = server._create_operation_outcome
+    request_model = TypeAdapter(Union[ValidationRequest, Dict[str, Any]])
+
+    # What FastAPI does for a `Union[ValidationRequest, Dict]` body and a dict return value
+    def model_decode() -> Dict[str, Any]:
+        request = request_model.validate_python(json.loads(body))
+        return request if isinstance(request, dict) else request.dict()
+
+    def model_encode(outcome: Dict[str, Any]) -> bytes:
+        return JSONResponse(content=jsonable_encoder(outcome)).body
+
+    resource = fast_json.loads(body)
+    outcome = build_outcome(validator.validate_resource(resource))
+    lines = body.count(b'\n') + 1
+    print(f"Resource: {args.resource} ({len(body):,} bytes, {lines} lines)")
+    print(f"JSON backend: {fast_json.BACKEND}, {args.iterations} iterations, median per request\n")
+
+    rows = [
+        ("Decode", _median_ms(model_decode, args.iterations),
+         _median_ms(lambda: fast_json.loads(body), args.iterations)),
+        ("Validate", _median_ms(lambda: validator.validate_resource(model_decode()), args.iterations),
+         _median_ms(lambda: validator.validate_resource(fast_json.loads(body)), args.iterations)),
+        ("Encode", _median_ms(lambda: model_encode(outcome), args.iterations),
+         _median_ms(lambda: fast_json.dumps(outcome), args.iterations)),
+        ("Request", _median_ms(lambda: model_encode(build_outcome(validator.validate_resource(model_decode()))),
+                               args.iterations),
+         _median_ms(lambda: fast_json.dumps(build_outcome(validator.validate_resource(fast_json.loads(body)))),
+                    args.iterations)),
+    ]
+    # Validate and Request include decoding, as the resource differs between the paths
+    print(f"{'Stage':<10} {'Model path':>12} {'Fast path':>12} {'Speed-up':>10}")
+    print("-" * 48)
+    for stage, model_ms, fast_ms in rows:
+        print(f"{stage:<10} {model_ms:>10.3f}ms {fast_ms:>10.3f}ms {model_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,42 @@ Download FHIR R4 Base Resources
 Downloads the official FHIR R4 specification resources to fix validation warnings.
 """
 
+import argparse
 import urllib.request
 import zipfile
 import json
 import os
 from pathlib import Path
 
+DEFINITIONS_URL = "http://hl7.org/fhir/R4/definitions.json.zip"
+
+
+def download_fhir_r4_package(target_dir: str = "resources/fhir_base"):
+    """Download the FHIR R4 definitions archive; the resource loader reads it without unpacking."""
+    print("🔽 Downloading FHIR R4 definitions package...")
+    target = Path(target_dir) / "definitions.json.zip"
+    
+    try:
+        print(f"📥 Downloading from: {DEFINITIONS_URL}")
+        Path(target_dir).mkdir(parents=True, exist_ok=True)
+        urllib.request.urlretrieve(DEFINITIONS_URL, target)
+        
+        with zipfile.ZipFile(target, 'r') as zip_ref:
+            members = [name for name in zip_ref.namelist() if name.endswith('.json')]
+        print(f"✅ Saved: {target} ({target.stat().st_size / 1024 / 1024:.1f} MiB, {len(members)} JSON members)")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error downloading FHIR package: {e}")
+        return False
+
 
 def download_fhir_r4_resources():
     """Download and extract FHIR R4 specification resources."""
     print("🔽 Downloading FHIR R4 specification resources...")
     
     # Official FHIR R4 definitions download URL
-    url = "http://hl7.org/fhir/R4/definitions.json.zip"
+    url = DEFINITIONS_URL
     zip_file = "definitions.json.zip"
     extract_dir = "fhir_base_resources"
     
@@ -82,9 +105,21 @@ def download_fhir_r4_resources():
 
 def main():
     """Main function to download FHIR resources."""
+    parser = argparse.ArgumentParser(description="Download the FHIR R4 base resources")
+    parser.add_argument("--package", action="store_true",
+                        help="Keep the downloaded archive in resources/fhir_base instead of extracting it")
+    args = parser.parse_args()
+    
     print("🚀 FHIR R4 Base Resources Downloader")
     print("=" * 50)
     
+    if args.package:
+        if download_fhir_r4_package():
+            print("\n🎉 Download completed successfully! Restart the server to load the package.")
+        else:
+            print("\n❌ Download failed. Please check your internet connection and try again.")
+        return
+    
     success = download_fhir_r4_resources()
     
     if success:
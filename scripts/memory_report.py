@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Registry Memory Report
+Loads the PHCore and base FHIR resources and prints bytes held per resource type.
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fhir_server.core.memory_report import registry_memory_report, format_memory_report
+from fhir_server.core.resource_loader import ResourceLoader
+
+
+def main():
+    """Load the registry and print the memory report."""
+    parser = argparse.ArgumentParser(description="Report registry memory per resource type")
+    parser.add_argument("--resources-dir", default="resources/phcore")
+    parser.add_argument("--base-resources-dir", default="resources/fhir_base")
+    parser.add_argument("--lazy", action="store_true", help="Index Bundle files by entry header only")
+    args = parser.parse_args()
+
+    print("📊 Registry Memory Report")
+    print("=" * 60)
+
+    loader = ResourceLoader(args.resources_dir, args.base_resources_dir, lazy=args.lazy)
+    with contextlib.redirect_stdout(io.StringIO()):
+        count = loader.load_all_resources()
+    print(f"Loaded {count} resources ({'lazy' if args.lazy else 'eager'} mode)\n")
+
+    for line in format_memory_report(registry_memory_report(loader)):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
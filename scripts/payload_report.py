@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Read Payload Report
+Prints the bytes a full search of each conformance type sends under `_summary` and `_elements`.
+"""
+
+import argparse
+import contextlib
+import gzip
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fhir_server.core import fast_json
+from fhir_server.core.projection import Projection, project
+from fhir_server.core.resource_loader import ResourceLoader
+
+RESOURCE_TYPES = ("StructureDefinition", "ValueSet", "CodeSystem", "SearchParameter")
+
+PROJECTIONS = (
+    ("full", Projection()),
+    ("_summary=true", Projection.parse("true", None)),
+    ("_summary=data", Projection.parse("data", None)),
+    ("_elements=url,name,version,status", Projection.parse(None, "url,name,version,status")),
+)
+
+
+def main():
+    """Load the registry and print entry bytes per type and projection, plain and gzipped."""
+    parser = argparse.ArgumentParser(description="Report search payload sizes per projection")
+    parser.add_argument("--resources-dir", default="resources/phcore")
+    parser.add_argument("--base-resources-dir", default="resources/fhir_base")
+    args = parser.parse_args()
+
+    print("📦 Read Payload Report")
+    print("=" * 60)
+
+    loader = ResourceLoader(args.resources_dir, args.base_resources_dir)
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader.load_all_resources()
+
+    for resource_type in RESOURCE_TYPES:
+        resources = loader.get_resources_by_type(resource_type)
+        print(f"\n{resource_type} ({len(resources)} resources)")
+        full_size = None
+        for label, projection in PROJECTIONS:
+            body = b','.join(fast_json.dumps(project(loader, resource.content, projection)) for resource in resources)
+            zipped = len(gzip.compress(body, compresslevel=9))
+            full_size = full_size or len(body)
+            print(f"  {label:<36} {len(body):>11,} bytes {zipped:>10,} gzip  {len(body) / full_size:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
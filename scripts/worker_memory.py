@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Worker Memory Report
+Prints RSS, PSS and unique (private) memory of a pre-fork server and its workers.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fhir_server.api.prefork import child_pids, print_worker_memory
+
+
+def main():
+    """Report memory for the parent process given on the command line."""
+    parser = argparse.ArgumentParser(description="Report per-worker memory of a pre-fork PHCore server")
+    parser.add_argument("pid", type=int, help="PID of the parent process started with --workers N")
+    args = parser.parse_args()
+
+    workers = child_pids(args.pid)
+    if not workers:
+        print(f"❌ Process {args.pid} has no worker processes")
+        sys.exit(1)
+
+    print("📊 Worker Memory Report")
+    print("=" * 60)
+    print_worker_memory(args.pid, workers)
+
+
+if __name__ == "__main__":
+    main()
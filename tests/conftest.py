@@ -0,0 +1,62 @@
+"""
+PHCore Test Fixtures
+Loads the PHCore registry once per test session and hands out validators built on it.
+"""
+
+import contextlib
+import io
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.validation.validator import FhirValidator
+
+RESOURCES_DIR = Path(__file__).parent.parent / "resources"
+
+
+def load_registry(resources_dir: Optional[str] = None, lazy: bool = False,
+                  on_demand_types: Tuple[str, ...] = ()) -> ResourceLoader:
+    """Load resources quietly, without a registry snapshot; PHCore and the base specification by default."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        resource_loader = ResourceLoader(resources_dir or str(RESOURCES_DIR / "phcore"),
+                                         str(RESOURCES_DIR / "fhir_base"), snapshot_path=None, lazy=lazy,
+                                         on_demand_types=on_demand_types)
+        resource_loader.load_all_resources()
+    return resource_loader
+
+
+@pytest.fixture(scope="session")
+def resource_loader() -> ResourceLoader:
+    """The PHCore registry, loaded once for every test that reads it."""
+    return load_registry()
+
+
+@pytest.fixture(scope="session")
+def lazy_resource_loader() -> ResourceLoader:
+    """The PHCore registry with Bundle entries indexed lazily."""
+    return load_registry(lazy=True)
+
+
+@pytest.fixture
+def validator(resource_loader: ResourceLoader) -> FhirValidator:
+    """
+    A fresh validator on the shared registry.
+
+    Validators on one loader share its conformance maps, so a test that
+    edits them must restore them (monkeypatch) or use `registry_factory`.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return FhirValidator(resource_loader)
+
+
+@pytest.fixture
+def registry_factory():
+    """`load_registry`, for tests that need a private or differently configured registry."""
+    return load_registry
+
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+PHCore Bulk Validation Tests
+Checks that streamed NDJSON is validated chunk by chunk with one OperationOutcome per line.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.api.bulk import ISSUE_LINE_EXTENSION, BulkValidation, ndjson_lines
+EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+
+
+def outcome(result) -> dict:
+    """Minimal OperationOutcome builder."""
+    issues = [{"severity": issue.severity, "code": issue.code, "details": {"text": issue.details}}
+              for issue in result.issues]
+    return {"resourceType": "OperationOutcome", "issue": issues or [{"severity": "information", "code": "informational"}]}
+
+
+async def stream(data: bytes, size: int):
+    """Yield data in fixed-size pieces, as a request body arrives."""
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def collect(iterator) -> list:
+    return [item async for item in iterator]
+
+
+def test_lines_split_across_chunks():
+    """Lines are numbered across arbitrary chunk boundaries; blank lines are skipped, long lines flagged."""
+    data = b'{"a":1}\n\n{"b":2}\r\n' + b'x' * 50 + b'\n{"c":3}'
+    for size in (1, 3, 7, len(data)):
+        lines = asyncio.run(collect(ndjson_lines(stream(data, size), max_line_bytes=20)))
+        assert lines == [(1, b'{"a":1}'), (3, b'{"b":2}'), (4, None), (5, b'{"c":3}')]
+
+
+def test_outcomes_per_line(validator):
+    """Every line gets an OperationOutcome tagged with its line number, in input order."""
+    valid = (EXAMPLES_DIR / "valid" / "patient" / "test-patient-comprehensive.json").read_text()
+    invalid = (EXAMPLES_DIR / "invalid" / "patient" / "patient_missing_extension.json").read_text()
+    lines = [json.dumps(json.loads(valid)), "not json", json.dumps(json.loads(invalid))] * 5
+    data = ("\n".join(lines) + "\n").encode("utf-8")
+
+    bulk = BulkValidation(validator, outcome, chunk_lines=4)
+    output = b"".join(asyncio.run(collect(bulk.outcomes(stream(data, 1000)))))
+    outcomes = [json.loads(line) for line in output.splitlines()]
+    assert len(outcomes) == 15 and bulk.stats == {"lines": 15, "invalid": 10}
+    for line_number, result in enumerate(outcomes, start=1):
+        assert all(issue["extension"] == [{"url": ISSUE_LINE_EXTENSION, "valueInteger": line_number}]
+                   for issue in result["issue"])
+    assert [issue["code"] for issue in outcomes[1]["issue"]] == ["structure"]
+    expected = validator.validate_resource(json.loads(invalid))
+    assert [issue["details"]["text"] for issue in outcomes[2]["issue"]] == [issue.details for issue in expected.issues]
+
+
+def main():
+    """Run the bulk validation tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
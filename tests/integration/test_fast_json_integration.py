@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+PHCore Fast JSON Codec Tests
+Checks that the orjson and json backends used by the raw-body request paths agree.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core import fast_json
+
+EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+
+
+def with_backends(check):
+    """Run check with the installed backend and with the json fallback."""
+    installed = fast_json.orjson
+    try:
+        for backend in {installed, None}:
+            fast_json.orjson = backend
+            check()
+    finally:
+        fast_json.orjson = installed
+
+
+def test_backends_round_trip_resources():
+    """Both backends decode resources to the same values and encode compact UTF-8."""
+    body = (EXAMPLES_DIR / "valid" / "patient" / "test-patient-comprehensive.json").read_bytes()
+    expected = json.loads(body)
+
+    def check():
+        resource = fast_json.loads(body)
+        assert resource == expected
+        encoded = fast_json.dumps({"text": "Señora Dela Cruz", **resource})
+        assert b"Se\xc3\xb1ora" in encoded and b", " not in encoded[:40]
+        assert json.loads(encoded)["id"] == expected["id"]
+
+    with_backends(check)
+
+
+def test_sorted_and_fallback_encoding():
+    """sort_keys orders nested keys; values orjson rejects fall back to json."""
+    def check():
+        assert fast_json.dumps({"b": {"d": 1, "c": 2}, "a": 0}, sort_keys=True) == b'{"a":0,"b":{"c":2,"d":1}}'
+        assert fast_json.dumps({"n": 2 ** 70}) == b'{"n":1180591620717411303424}'
+        assert fast_json.dumps({"at": Path("x")}) == b'{"at":"x"}'
+
+    with_backends(check)
+
+
+def test_malformed_input_raises_value_error():
+    """Malformed bodies raise ValueError whichever backend is used."""
+    def check():
+        for body in (b"", b"{", b'{"resourceType": }'):
+            try:
+                fast_json.loads(body)
+            except ValueError:
+                continue
+            raise AssertionError(f"{body!r} was accepted")
+
+    with_backends(check)
+
+
+def main():
+    """Run the fast JSON codec tests."""
+    print(f"JSON backend: {fast_json.BACKEND}")
+    tests = [test_backends_round_trip_resources, test_sorted_and_fallback_encoding,
+             test_malformed_input_raises_value_error]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All fast JSON codec tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PHCore Package Archive Tests
+Checks that resources loaded from .zip and NPM .tgz packages match the unpacked directories.
+"""
+
+import contextlib
+import io
+import json
+import shutil
+import sys
+import tarfile
+import tempfile
+import zipfile
+from unittest import mock
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core import resource_loader
+from fhir_server.core.resource_loader import ResourceLoader
+
+RESOURCES_DIR = Path(__file__).parent.parent.parent / "resources"
+
+
+def load(resources_dir: str, base_resources_dir: str, lazy: bool) -> ResourceLoader:
+    """Load a registry quietly."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader = ResourceLoader(resources_dir, base_resources_dir, lazy=lazy)
+        loader.load_all_resources()
+    return loader
+
+
+def registry_contents(loader: ResourceLoader) -> dict:
+    """Materialized content of every indexed resource."""
+    return {key: loader.get_resource(*key.split('/', 1)).content for key in loader.resources}
+
+
+def build_packages(target: Path) -> None:
+    """Pack the PHCore resources as an NPM package and the base resources as a zip."""
+    (target / "phcore").mkdir()
+    (target / "base").mkdir()
+
+    staging = target / "staging" / "package"
+    (staging / "example").mkdir(parents=True)
+    index = []
+    for file_path in sorted((RESOURCES_DIR / "phcore").glob("*.json")):
+        resource = json.loads(file_path.read_text(encoding='utf-8'))
+        shutil.copy(file_path, staging / file_path.name)
+        index.append({"filename": file_path.name, "resourceType": resource["resourceType"],
+                      "id": resource["id"], "url": resource.get("url"), "version": resource.get("version")})
+    (staging / ".index.json").write_text(json.dumps({"index-version": 1, "files": index}), encoding='utf-8')
+    (staging / "package.json").write_text(json.dumps({"name": "ph.core", "version": "0.1.0"}), encoding='utf-8')
+    # Examples live outside the package root and are not loaded
+    (staging / "example" / "Patient-extra.json").write_text(json.dumps({"resourceType": "Patient", "id": "extra"}), encoding='utf-8')
+    with tarfile.open(target / "phcore" / "ph.core.tgz", "w:gz") as archive:
+        archive.add(staging, "package")
+
+    with zipfile.ZipFile(target / "base" / "definitions.json.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+        for file_path in sorted((RESOURCES_DIR / "fhir_base").glob("*.json")):
+            archive.write(file_path, file_path.name)
+
+
+def test_archives_match_directories():
+    """Eager and lazy loads from archives give the same registry as the unpacked files."""
+    expected = registry_contents(load(str(RESOURCES_DIR / "phcore"), str(RESOURCES_DIR / "fhir_base"), lazy=False))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_packages(Path(tmp))
+        for lazy in (False, True):
+            loader = load(str(Path(tmp) / "phcore"), str(Path(tmp) / "base"), lazy=lazy)
+            assert not loader.load_errors
+            assert loader.get_resource("Patient", "extra") is None
+
+            if lazy:
+                # The NPM index supplies headers, so package members stay compressed until used
+                profile = loader.by_url.get("http://localhost:5072/ph-core/fhir/StructureDefinition/ph-core-patient")
+                assert profile.member == "package/StructureDefinition-ph-core-patient.json"
+                assert not profile.is_loaded
+
+            # Lazy resources decompress only their own member and keep at most a couple of members around
+            with mock.patch("fhir_server.core.resource_loader.iter_package_members") as passes, \
+                    mock.patch("fhir_server.core.resource_loader.read_package_member",
+                               wraps=resource_loader.read_package_member) as reads:
+                assert registry_contents(loader) == expected
+            assert passes.call_count == 0
+            assert (reads.call_count > 0) == lazy
+            assert len(loader._member_cache) <= 2
+
+
+def main():
+    """Run the package archive tests."""
+    tests = [test_archives_match_directories]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All package archive tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+PHCore Resource Projection Tests
+Checks `_summary` and `_elements` views of registry resources.
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core.projection import SUBSETTED_TAG, Projection, ProjectionError, project
+
+
+def test_parse_rejects_invalid_requests():
+    """Unknown modes, _summary with _elements and nested element paths are rejected."""
+    assert Projection.parse(None, None).is_full and Projection.parse("false", "").is_full
+    assert Projection.parse(None, " url, name ").elements == frozenset({"url", "name"})
+    for summary, elements in (("yes", None), ("true", "url"), (None, "snapshot.element")):
+        try:
+            Projection.parse(summary, elements)
+        except ProjectionError:
+            continue
+        raise AssertionError(f"_summary={summary} _elements={elements} was accepted")
+
+
+def test_summary_and_elements_views(resource_loader):
+    """Views keep the selected and mandatory top-level elements, tagged SUBSETTED, without touching the resource."""
+    profile = resource_loader.get_resource("StructureDefinition", "ph-core-patient").content
+    original = copy.deepcopy(profile)
+
+    summary = project(resource_loader, profile, Projection.parse("true", None))
+    assert "differential" not in summary and "description" not in summary
+    assert {"url", "name", "status", "kind", "type", "baseDefinition"} <= set(summary)
+    assert summary["meta"]["tag"] == [SUBSETTED_TAG]
+
+    elements = project(resource_loader, profile, Projection.parse(None, "url,version"))
+    assert set(elements) == {"resourceType", "id", "meta", "url", "name", "status", "kind", "abstract", "type"}
+
+    assert project(resource_loader, profile, Projection.parse("data", None)) is profile
+    assert project(resource_loader, profile, Projection()) is profile
+    assert profile == original
+
+
+def test_text_and_data_modes(resource_loader):
+    """_summary=data drops the narrative; _summary=text keeps it with the mandatory elements."""
+    definition = next(resource.content for resource in resource_loader.get_resources_by_type("StructureDefinition")
+                      if "text" in resource.content)
+    data = project(resource_loader, definition, Projection.parse("data", None))
+    assert "text" not in data and data["meta"]["tag"][-1] == SUBSETTED_TAG
+    assert set(data) - {"meta"} == set(definition) - {"text", "meta"}
+    text = project(resource_loader, definition, Projection.parse("text", None))
+    assert set(text) == {"resourceType", "id", "meta", "text", "url", "name", "status", "kind", "abstract", "type"}
+    assert text["text"] is definition["text"]
+
+
+def test_unknown_types_and_choice_elements(resource_loader):
+    """Types without summary definitions are returned whole; [x] summary elements select their variants."""
+    patient = resource_loader.get_resources_by_type("Patient")[0].content
+    assert project(resource_loader, patient, Projection.parse("true", None)) is patient
+
+    concept_map = {"resourceType": "ConceptMap", "id": "x", "status": "draft",
+                   "sourceUri": "http://a", "targetCanonical": "http://b", "group": [{}]}
+    summary = project(resource_loader, concept_map, Projection.parse("true", None))
+    assert {"sourceUri", "targetCanonical", "status"} <= set(summary) and "group" not in summary
+
+
+def main():
+    """Run the resource projection tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
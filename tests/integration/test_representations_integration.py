@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+PHCore Response Representation Tests
+Checks precompressed read bodies, ETag matching, content negotiation and per-version caching.
+"""
+
+import gzip
+import json
+import sys
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.api.representations import (
+    GZIP, IDENTITY, RepresentationCache, build_representation, negotiate_coding
+)
+
+RESOURCES_DIR = Path(__file__).parent.parent.parent / "resources"
+
+
+def load_profile() -> dict:
+    """A PHCore StructureDefinition as served by the read endpoints."""
+    return json.loads((RESOURCES_DIR / "phcore" / "StructureDefinition-ph-core-patient.json").read_text())
+
+
+def test_variants_decode_to_the_resource():
+    """Every compressed variant decodes to the identity body, which is the resource."""
+    profile = load_profile()
+    representation = build_representation(profile)
+    identity = representation.bodies[IDENTITY]
+    assert json.loads(identity) == profile
+    assert gzip.decompress(representation.bodies[GZIP]) == identity
+    assert len(representation.bodies[GZIP]) < len(identity)
+    assert build_representation(dict(profile)).digest == representation.digest
+
+    small = build_representation({"resourceType": "Basic", "id": "x"})
+    assert set(small.bodies) == {IDENTITY}
+
+
+def test_etags_and_conditional_matching():
+    """ETags are strong and per coding; If-None-Match matches any variant, lists, W/ and *."""
+    representation = build_representation(load_profile())
+    identity_tag, gzip_tag = representation.etag(IDENTITY), representation.etag(GZIP)
+    assert identity_tag == f'"{representation.digest}"' and gzip_tag != identity_tag
+    assert representation.matches(identity_tag) and representation.matches(gzip_tag)
+    assert representation.matches(f'"other", W/{gzip_tag}') and representation.matches("*")
+    assert not representation.matches('"other"') and not representation.matches(None)
+
+
+def test_accept_encoding_negotiation():
+    """The preferred acceptable coding is chosen; q=0 and unavailable codings are skipped."""
+    bodies = build_representation(load_profile()).bodies
+    assert negotiate_coding(None, bodies) == IDENTITY
+    assert negotiate_coding("gzip, deflate", bodies) == GZIP
+    assert negotiate_coding("gzip;q=0, identity", bodies) == IDENTITY
+    assert negotiate_coding("*", bodies) == GZIP
+    assert negotiate_coding("deflate", bodies) == IDENTITY
+    assert negotiate_coding("gzip", {IDENTITY: b"{}"}) == IDENTITY
+
+
+def test_cache_is_per_registry_version():
+    """A newer registry version drops older entries; stale puts and oversized entries are refused."""
+    representation = build_representation(load_profile())
+    cache = RepresentationCache(max_bytes=representation.size * 2)
+    cache.get(1, "a")
+    cache.put(1, "a", representation)
+    assert cache.get(1, "a") is representation
+
+    assert cache.get(2, "a") is None
+    cache.put(1, "a", representation)
+    assert cache.get(2, "a") is None and cache.get(1, "a") is None
+
+    for key in ("a", "b", "c"):
+        cache.put(2, key, representation)
+    assert cache.get(2, "a") is None and cache.get(2, "c") is representation
+    assert cache.info()["evictions"] == 1
+    assert cache.info()["bytes"] <= cache.max_bytes
+
+
+def main():
+    """Run the response representation tests."""
+    tests = [test_variants_decode_to_the_resource, test_etags_and_conditional_matching,
+             test_accept_encoding_negotiation, test_cache_is_per_registry_version]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All response representation tests completed!")
+
+
+if __name__ == "__main__":
+    main()
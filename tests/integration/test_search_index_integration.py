@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+PHCore Search Index Tests
+Checks indexed type searches against a scan of the loaded resources, in eager and lazy mode.
+"""
+
+import sys
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.core.search import SUPPORTED_PARAMETERS, SearchError, SearchIndex, normalize_string
+
+def scan(resource_loader: ResourceLoader, resource_type: str, predicate) -> list:
+    """Positions of the resources of a type matching predicate, found without the index."""
+    return [position for position, resource in enumerate(resource_loader.get_resources_by_type(resource_type))
+            if predicate(resource.content)]
+
+
+def test_definitions_come_from_search_parameters(resource_loader):
+    """Parameters are taken from the loaded SearchParameter resources, per resource type."""
+    index = SearchIndex.build(resource_loader)
+    assert index.parameters("StructureDefinition") == {
+        "_id": "token", "name": "string", "status": "token", "url": "uri", "version": "token", "base": "reference"
+    }
+    assert index.parameters("SearchParameter")["base"] == "token"
+    assert "url" not in index.parameters("Patient") and index.parameters("Patient")["_id"] == "token"
+
+
+def test_searches_match_a_scan(resource_loader):
+    """Token, uri, reference and string searches return what a scan finds, in registry order."""
+    index = SearchIndex.build(resource_loader)
+
+    assert index.search("SearchParameter", [("base", "Patient")]) == \
+        scan(resource_loader, "SearchParameter", lambda content: "Patient" in content.get("base", []))
+    assert index.search("StructureDefinition", [("status", "draft"), ("name", "PH")]) == \
+        scan(resource_loader, "StructureDefinition", lambda content: content.get("status") == "draft"
+             and normalize_string(content.get("name", "")).startswith("ph"))
+    base = "http://hl7.org/fhir/StructureDefinition/Extension"
+    assert index.search("StructureDefinition", [("base", base)]) == \
+        scan(resource_loader, "StructureDefinition", lambda content: content.get("baseDefinition") == base)
+
+    patient_profile = "http://localhost:5072/ph-core/fhir/StructureDefinition/ph-core-patient"
+    [position] = index.search("StructureDefinition", [("url", patient_profile)])
+    [profile] = resource_loader.get_resources_at("StructureDefinition", [position])
+    assert profile.content["url"] == patient_profile
+    assert index.search("StructureDefinition", [("name:exact", profile.content["name"])]) == [position]
+    assert index.search("StructureDefinition", [("name:exact", profile.content["name"].lower())]) == []
+    either = index.search("StructureDefinition", [("_id", profile.id)]) + \
+        index.search("StructureDefinition", [("_id", "string")])
+    assert index.search("StructureDefinition", [("_id", f"{profile.id},string")]) == sorted(either)
+    assert index.search("StructureDefinition", []) == list(range(len(resource_loader.by_type["StructureDefinition"])))
+
+
+def test_unsupported_searches_raise(resource_loader):
+    """Unknown parameters, unsupported modifiers and empty values raise SearchError."""
+    index = SearchIndex.build(resource_loader)
+    for criteria in ([("publisher", "HL7")], [("name:contains", "pat")], [("status", ",")]):
+        try:
+            index.search("StructureDefinition", criteria)
+        except SearchError:
+            continue
+        raise AssertionError(f"{criteria} was accepted")
+
+
+def test_lazy_loader_builds_the_same_index(resource_loader, lazy_resource_loader):
+    """Lazily indexed Bundle entries are indexed and paged exactly like eagerly loaded ones."""
+    eager, lazy = resource_loader, lazy_resource_loader
+    eager_index, lazy_index = SearchIndex.build(eager), SearchIndex.build(lazy)
+    criteria = [("status", "draft"), ("base", "Resource,DomainResource")]
+    matches = lazy_index.search("SearchParameter", criteria)
+    assert matches and matches == eager_index.search("SearchParameter", criteria)
+    page = lazy.get_resources_at("SearchParameter", matches[:5])
+    assert [resource.content for resource in page] == \
+        [resource.content for resource in eager.get_resources_at("SearchParameter", matches[:5])]
+
+
+def test_lazy_index_reads_entry_headers(resource_loader, registry_factory):
+    """A lazy index is built from entry headers: only supported SearchParameters are parsed and the LRU stays empty."""
+    # A private registry, so the LRU starts empty
+    lazy = registry_factory(lazy=True)
+    eager_index = SearchIndex.build(resource_loader)
+    with mock.patch.object(lazy, "_read_lazy_resource", wraps=lazy._read_lazy_resource) as read:
+        lazy_index = SearchIndex(lazy)
+        assert read.call_count == 0
+        lazy_index.ensure_built()
+    assert read.call_count == sum(resource.header_fields["code"] in SUPPORTED_PARAMETERS
+                                  for resource in lazy.by_type["SearchParameter"])
+    assert not lazy._content_cache
+    for resource_type, type_index in eager_index.types.items():
+        assert lazy_index.types[resource_type].exact == type_index.exact
+        assert lazy_index.types[resource_type].prefixes == type_index.prefixes
+
+
+def main():
+    """Run the search index tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
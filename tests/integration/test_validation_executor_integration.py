@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+PHCore Validation Executor Tests
+Checks that validations offloaded to thread and process pools match inline results and are bounded.
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.api.executor import ValidationExecutor
+from fhir_server.api.jobs import QueueFullError
+from fhir_server.core.registry import RegistryManager
+from fhir_server.validation.validator import FhirValidator, ValidationResult
+
+EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+RESOURCES_DIR = Path(__file__).parent.parent.parent / "resources"
+
+
+class SlowValidator:
+    """Validator stand-in whose validations take a fixed time."""
+
+    def validate_resource(self, resource_data, verbose=False):
+        time.sleep(0.1)
+        return ValidationResult(is_valid=True, issues=[])
+
+
+def test_pools_match_inline_validation(validator):
+    """Thread and process pools return the same issues as validating inline."""
+    patient = json.loads((EXAMPLES_DIR / "invalid" / "patient" / "patient_missing_extension.json").read_text())
+    expected = validator.validate_resource(patient, verbose=True)
+    for kind in ("thread", "process"):
+        executor = ValidationExecutor(kind=kind, workers=2)
+        try:
+            result = asyncio.run(executor.validate(validator, patient, verbose=True))
+            assert result.is_valid == expected.is_valid and result.issues == expected.issues
+            assert executor.info()["completed"] == 1
+        finally:
+            executor.shutdown()
+
+
+def test_process_workers_keep_pinned_registry(registry_factory):
+    """A registry reload between submitting and running a validation does not change its registry version."""
+    patient = json.loads((EXAMPLES_DIR / "invalid" / "patient" / "patient_missing_extension.json").read_text())
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(RESOURCES_DIR / "phcore", Path(tmp) / "phcore")
+        loader = registry_factory(str(Path(tmp) / "phcore"))
+        with contextlib.redirect_stdout(io.StringIO()):
+            manager = RegistryManager(loader, FhirValidator(loader))
+        pinned = manager.current.validator
+        expected = pinned.validate_resource(patient)
+
+        # The profile is removed and reloaded before the process workers start and read the files
+        (Path(tmp) / "phcore" / "StructureDefinition-ph-core-patient.json").unlink()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert manager.reload() is not None
+        assert manager.current.validator.validate_resource(patient).issues != expected.issues
+
+        executor = ValidationExecutor(kind="process", workers=1)
+        try:
+            for _ in range(2):
+                result = asyncio.run(executor.validate(pinned, patient))
+                assert result.issues == expected.issues
+            info = executor.info()
+            assert (info["completed"], info["mismatched"]) == (2, 1)
+        finally:
+            executor.shutdown()
+
+
+def test_queue_is_bounded():
+    """Validations beyond max_pending are rejected; wait and run times are recorded separately."""
+    executor = ValidationExecutor(kind="thread", workers=1, max_pending=2)
+
+    async def burst():
+        return await asyncio.gather(*(executor.validate(SlowValidator(), {}) for _ in range(3)), return_exceptions=True)
+
+    try:
+        results = asyncio.run(burst())
+        assert [type(result) for result in results] == [ValidationResult, ValidationResult, QueueFullError]
+        info = executor.info()
+        assert (info["completed"], info["rejected"], info["pending"]) == (2, 1, 0)
+        assert info["runMs"]["p50"] >= 100 and info["waitMs"]["p99"] >= 90
+    finally:
+        executor.shutdown()
+
+
+def main():
+    """Run the validation executor tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
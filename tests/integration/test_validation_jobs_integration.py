@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+PHCore Asynchronous Validation Job Tests
+Checks the bounded job queue, job stores and job lifecycle behind Prefer: respond-async.
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.api.jobs import (
+    COMPLETED, FAILED, IN_PROGRESS, QUEUED, InMemoryJobStore, JobStore, QueueFullError, SqliteJobStore, ValidationJob,
+    ValidationJobQueue
+)
+from fhir_server.core.config import ServerConfig
+
+OUTCOME = {"resourceType": "OperationOutcome", "issue": [{"severity": "information", "code": "informational"}]}
+
+
+def wait_for(store, job_id: str, timeout: float = 5.0) -> ValidationJob:
+    """Poll a job until it is finished."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = store.get(job_id)
+        if job.status in (COMPLETED, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def check_store(store) -> None:
+    """Jobs round-trip through the store, and finished jobs are purged after their TTL."""
+    job = ValidationJob(id="a", status=QUEUED, created_at=1.0)
+    store.save(job)
+    job.status, job.finished_at, job.outcome = COMPLETED, 2.0, OUTCOME
+    store.save(job)
+    assert store.get("a") == job and store.get("missing") is None
+    store.save(ValidationJob(id="b", status=QUEUED, created_at=1.0))
+    assert store.purge(finished_before=3.0) == 1
+    assert store.get("a") is None and store.get("b") is not None
+    assert store.delete("b") and not store.delete("b")
+    # Updates never bring back a deleted job
+    assert not store.update(ValidationJob(id="b", status=COMPLETED, created_at=1.0))
+    assert store.get("b") is None
+
+
+def test_job_stores():
+    """The in-memory and SQLite stores behave the same; the base store is abstract."""
+    try:
+        JobStore()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("JobStore is instantiable")
+    check_store(InMemoryJobStore())
+    with tempfile.TemporaryDirectory() as tmp:
+        check_store(SqliteJobStore(str(Path(tmp) / "jobs.db")))
+
+
+def test_queue_runs_and_bounds_jobs():
+    """Jobs run on the workers; a full queue rejects new jobs; failures and cancellations are recorded."""
+    queue = ValidationJobQueue(InMemoryJobStore(), workers=1, max_queued=1)
+    queue.start()
+    release = threading.Event()
+    try:
+        blocking = queue.submit(lambda: release.wait(5) and OUTCOME)
+        time.sleep(0.05)
+        cancelled = queue.submit(lambda: OUTCOME)
+        try:
+            queue.submit(lambda: OUTCOME)
+        except QueueFullError:
+            pass
+        else:
+            raise AssertionError("expected QueueFullError")
+        assert queue.info()["queued"] == 1 and queue.info()["running"] == 1
+        assert queue.store.delete(cancelled.id)
+        release.set()
+
+        assert wait_for(queue.store, blocking.id).outcome == OUTCOME
+        failing = queue.submit(lambda: 1 / 0)
+        assert wait_for(queue.store, failing.id).status == FAILED
+        info = queue.info()
+        assert (info["submitted"], info["rejected"], info["completed"], info["failed"]) == (3, 1, 1, 1)
+        assert info["runMs"]["p99"] >= info["runMs"]["p50"] > 0
+    finally:
+        release.set()
+        queue.stop()
+
+
+def test_running_job_deleted_stays_deleted():
+    """A job discarded while it runs is not stored again when it finishes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        queue = ValidationJobQueue(SqliteJobStore(str(Path(tmp) / "jobs.db")), workers=1)
+        queue.start()
+        release = threading.Event()
+        try:
+            job = queue.submit(lambda: release.wait(5) and OUTCOME)
+            deadline = time.monotonic() + 5
+            while queue.store.get(job.id).status != IN_PROGRESS and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert queue.store.delete(job.id)
+            release.set()
+            deadline = time.monotonic() + 5
+            while queue.info()["completed"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert queue.info()["completed"] == 1 and queue.store.get(job.id) is None
+        finally:
+            release.set()
+            queue.stop()
+
+
+def test_job_store_for_worker_processes():
+    """Several worker processes share jobs through an SQLite file in the cache directory by default."""
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = str(Path(tmp) / "registry.snapshot")
+        assert ServerConfig(workers=1, snapshot_path=snapshot_path).job_store_path() is None
+        assert ServerConfig(workers=4, snapshot_path=snapshot_path).job_store_path() == str(Path(tmp) / "jobs.db")
+        assert ServerConfig(workers=4, snapshot_path=None).job_store_path() == str(Path(".cache") / "jobs.db")
+        explicit = str(Path(tmp) / "other.db")
+        assert ServerConfig(workers=4, job_db=explicit).job_store_path() == explicit
+
+
+def main():
+    """Run the validation job tests."""
+    tests = [test_job_stores, test_queue_runs_and_bounds_jobs, test_running_job_deleted_stays_deleted,
+             test_job_store_for_worker_processes]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All validation job tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PHCore Bundle Validation Tests
+Checks per-entry validation of Bundles, entry locations and the parallel entry pool.
+"""
+
+import contextlib
+import copy
+import io
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.bundle import BundleValidationPool
+from fhir_server.validation.validator import FhirValidator
+
+RESOURCES_DIR = Path(__file__).parent.parent.parent / "resources"
+PHCORE = "http://localhost:5072/ph-core/fhir/StructureDefinition/"
+
+
+def issue_tuples(result):
+    return [(issue.severity, issue.code, issue.details, issue.location) for issue in result.issues]
+
+
+def test_entries_validated_against_own_profiles(validator):
+    """Each entry is checked against its meta.profile and issues are located under Bundle.entry[i].resource."""
+    patient = {"resourceType": "Patient", "id": "p", "meta": {"profile": [PHCORE + "ph-core-patient"]}}
+    bundle = {"resourceType": "Bundle", "id": "b", "type": "collection", "entry": [
+        {"fullUrl": "urn:uuid:1", "resource": {"resourceType": "Organization", "id": "o"}},
+        {"fullUrl": "urn:uuid:2", "resource": patient},
+        {"fullUrl": "urn:uuid:3", "request": {"method": "DELETE", "url": "Patient/x"}}]}
+
+    result = validator.validate_resource(bundle)
+    expected = [(severity, code, details, location.replace("Patient", "Bundle.entry[1].resource", 1))
+                for severity, code, details, location in issue_tuples(validator.validate_resource(patient))]
+    assert not result.is_valid and issue_tuples(result) == expected
+    # The entry's own result is not modified by relocation
+    assert all(issue.location.startswith("Patient") for issue in validator.validate_resource(patient).issues)
+
+    nested = {"resourceType": "Bundle", "id": "n", "entry": [{"resource": bundle}]}
+    assert [issue.location for issue in validator.validate_resource(nested).issues] == \
+           [location.replace("Bundle.", "Bundle.entry[0].resource.", 1) for *_, location in expected]
+
+
+def test_shipped_bundles_in_verbose_mode(validator):
+    """Verbose checks add no errors to the IG's example Bundles, whose entries include types without a base snapshot."""
+    for path in sorted((RESOURCES_DIR / "phcore").glob("Bundle-*.json")):
+        bundle = json.loads(path.read_text(encoding='utf-8'))
+        verbose = validator.validate_resource(bundle, verbose=True)
+        assert not [issue for issue in verbose.issues if issue.code == "invalid-field"], path.name
+        errors = [[issue for issue in issue_tuples(result) if issue[0] == "error"]
+                  for result in (validator.validate_resource(bundle), verbose)]
+        assert errors[0] == errors[1], path.name
+
+
+def test_pool_matches_serial(validator):
+    """Entries validated on pool workers report the same issues in the same order."""
+    pool = BundleValidationPool(workers=2, min_entries=1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        parallel = FhirValidator(validator.resource_loader, bundle_pool=pool)
+    try:
+        bundle = json.loads((RESOURCES_DIR / "phcore" / "Bundle-transaction-ex.json").read_text())
+        bundle["entry"] = [copy.deepcopy(entry) for _ in range(5) for entry in bundle["entry"]]
+        for verbose in (False, True):
+            assert issue_tuples(parallel.validate_resource(bundle, verbose=verbose)) == \
+                   issue_tuples(validator.validate_resource(bundle, verbose=verbose))
+        # Workers load their own registry instead of forking the threaded server
+        assert pool._executor._mp_context.get_start_method() != 'fork'
+    finally:
+        pool.shutdown()
+
+
+def test_pool_rejects_changed_registry(validator, registry_factory):
+    """Workers that find the files changed since the registry loaded leave the Bundle to the pinned validator."""
+    bundle = json.loads((RESOURCES_DIR / "phcore" / "Bundle-transaction-ex.json").read_text())
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copytree(RESOURCES_DIR / "phcore", Path(tmp) / "phcore")
+        pool = BundleValidationPool(workers=2, min_entries=1)
+        with contextlib.redirect_stdout(io.StringIO()):
+            pinned = FhirValidator(registry_factory(str(Path(tmp) / "phcore")), bundle_pool=pool)
+        (Path(tmp) / "phcore" / "StructureDefinition-ph-core-patient.json").unlink()
+        try:
+            assert issue_tuples(pinned.validate_resource(bundle)) == issue_tuples(validator.validate_resource(bundle))
+            assert pool._mismatched is pinned
+        finally:
+            pool.shutdown()
+
+
+def main():
+    """Run the Bundle validation tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
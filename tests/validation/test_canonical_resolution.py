@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+PHCore Canonical Resolution Tests
+Checks that every version of a canonical resource is kept and resolvable by url, url|version and partial version.
+"""
+
+import contextlib
+import copy
+import io
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core.canonical import CanonicalIndex, parse_canonical
+from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.validation.validator import FhirValidator
+
+RESOURCES_DIR = Path(__file__).parent.parent.parent / "resources"
+PATIENT_PROFILE = "http://localhost:5072/ph-core/fhir/StructureDefinition/ph-core-patient"
+
+
+def test_parse_canonical():
+    """References split into url, version and fragment once and are cached."""
+    ref = parse_canonical("http://example.org/ValueSet/vs|1.2.0#code")
+    assert (ref.url, ref.version, ref.fragment) == ("http://example.org/ValueSet/vs", "1.2.0", "code")
+    assert parse_canonical("http://example.org/ValueSet/vs|1.2.0#code") is ref
+    assert parse_canonical("http://example.org/ValueSet/vs").version is None
+
+
+def test_index_resolves_versions():
+    """Bare urls resolve to the latest version and partial versions to the latest match."""
+    index = CanonicalIndex()
+    index.add("http://example.org/vs", "1.0.0", "a")
+    index.add("http://example.org/vs", "1.10.0", "c")
+    index.add("http://example.org/vs", "1.2.0", "b")
+    index.add("http://example.org/vs", "2.0.0-ballot", "d")
+
+    assert index.get("http://example.org/vs") == "d"
+    assert index.get("http://example.org/vs|1.0.0") == "a"
+    assert index.get("http://example.org/vs|1") == "c"
+    assert index.get("http://example.org/vs|1.2") == "b"
+    assert index.get("http://example.org/vs|3") is None
+    assert index.versions("http://example.org/vs") == ["1.0.0", "1.2.0", "1.10.0", "2.0.0-ballot"]
+
+    # A release outranks its pre-release
+    index.add("http://example.org/vs", "2.0.0", "e")
+    assert index.get("http://example.org/vs") == "e"
+    assert len(index) == 1 and list(index) == ["http://example.org/vs"]
+
+
+def test_exact_version_beats_partial_match():
+    """An exact url|version resolves to that version even when a longer version shares its prefix."""
+    index = CanonicalIndex()
+    index.add("u", "1.0", "A")
+    index.add("u", "1.0.1", "B")
+    assert index.get("u|1.0") == "A" and index.get("u|1.0.1") == "B" and index.get("u|1") == "B"
+
+    index = CanonicalIndex()
+    index.add("u", "1", "A")
+    index.add("u", "1.2", "B")
+    assert index.get("u|1") == "A" and index.get("u|1.2") == "B" and index.get("u") == "B"
+
+    # Insertion order does not matter
+    index = CanonicalIndex()
+    index.add("u", "1.0.1", "B")
+    index.add("u", "1.0", "A")
+    assert index.get("u|1.0") == "A" and index.get("u") == "B"
+
+
+def test_loader_and_validator_keep_every_version():
+    """Two versions of a profile loaded from separate files are both resolvable."""
+    with open(RESOURCES_DIR / "phcore" / "StructureDefinition-ph-core-patient.json", 'r', encoding='utf-8') as f:
+        profile = json.load(f)
+
+    older = copy.deepcopy(profile)
+    older["id"] = "ph-core-patient-v1"
+    older["version"] = "1.0.0"
+    older["differential"]["element"] = []
+    newer = copy.deepcopy(profile)
+    newer["version"] = "1.1.0"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # The older version is loaded last; the newer one must still win for the bare url
+        (Path(tmp) / "a-new.json").write_text(json.dumps(newer), encoding='utf-8')
+        (Path(tmp) / "b-old.json").write_text(json.dumps(older), encoding='utf-8')
+        with contextlib.redirect_stdout(io.StringIO()):
+            loader = ResourceLoader(tmp, str(RESOURCES_DIR / "fhir_base"))
+            loader.load_all_resources()
+            validator = FhirValidator(loader)
+
+    assert loader.get_resource_by_url(PATIENT_PROFILE).version == "1.1.0"
+    assert loader.get_resource_by_url(f"{PATIENT_PROFILE}|1.0.0").id == "ph-core-patient-v1"
+    assert loader.get_resource_by_url(f"{PATIENT_PROFILE}|1").version == "1.1.0"
+
+    patient = {"resourceType": "Patient", "id": "p1"}
+    assert not validator.validate_resource(patient, profile_url=PATIENT_PROFILE).is_valid
+    # Version 1.0.0 has no constraints
+    assert validator.validate_resource(patient, profile_url=f"{PATIENT_PROFILE}|1.0.0").is_valid
+
+
+def main():
+    """Run the canonical resolution tests."""
+    tests = [test_parse_canonical, test_index_resolves_versions, test_exact_version_beats_partial_match,
+             test_loader_and_validator_keep_every_version]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All canonical resolution tests completed!")
+
+
+if __name__ == "__main__":
+    main()
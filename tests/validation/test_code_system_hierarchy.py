@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+PHCore CodeSystem Hierarchy Tests
+Checks the interval-labelled concept hierarchy and hierarchy filters in ValueSet expansion.
+"""
+
+import sys
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core.canonical import CanonicalIndex
+from fhir_server.validation.terminology import (
+    CodeSystemIndex, ValueSetExpander, build_code_system_indexes,
+    EQUIVALENT, SUBSUMES, SUBSUMED_BY, NOT_SUBSUMED
+)
+
+PSGC = "urn:psgc"
+
+# Region → province → city → barangay, nested and through parent properties
+GEOGRAPHY = {
+    "url": PSGC, "name": "PSGC", "content": "complete",
+    "concept": [
+        {"code": "04", "display": "CALABARZON", "concept": [
+            {"code": "0421", "display": "Cavite", "concept": [
+                {"code": "042103", "display": "Bacoor"},
+                {"code": "042106", "display": "Dasmariñas"},
+            ]},
+            {"code": "0434", "display": "Laguna"},
+        ]},
+        {"code": "13", "display": "NCR"},
+        {"code": "1380", "display": "Caloocan", "property": [{"code": "parent", "valueCode": "13"}]},
+        {"code": "138001", "display": "Barangay 1", "property": [{"code": "parent", "valueCode": "1380"}]},
+    ]
+}
+
+
+def test_hierarchy_queries():
+    """Parent, ancestors, children, descendants and is-a follow both hierarchy sources."""
+    index = CodeSystemIndex(GEOGRAPHY)
+    assert len(index) == 8 and index.display("042106") == "Dasmariñas"
+    assert index.parents("042103") == ("0421",) and index.parents("04") == ()
+    assert index.ancestors("138001") == ["1380", "13"]
+    assert index.children("04") == ["0421", "0434"]
+    assert index.descendants("04") == ["0421", "042103", "042106", "0434"]
+    assert index.descendants("13") == ["1380", "138001"]
+    assert index.is_a("042106", "04") and index.is_a("04", "04")
+    assert not index.is_a("0434", "0421") and not index.is_a("138001", "04")
+
+    assert index.subsumes("04", "042103") == SUBSUMES
+    assert index.subsumes("138001", "13") == SUBSUMED_BY
+    assert index.subsumes("0421", "0421") == EQUIVALENT
+    assert index.subsumes("0421", "0434") == NOT_SUBSUMED
+    assert index.subsumes("0421", "99") is None
+
+
+def test_filters_expand_subtrees():
+    """is-a, descendent-of, is-not-a and generalizes filters select codes through the index."""
+    code_systems = CanonicalIndex()
+    code_systems.add(PSGC, None, GEOGRAPHY)
+    value_sets = CanonicalIndex()
+
+    def add(url, op, value):
+        value_sets.add(url, None, {"url": url, "compose": {"include": [
+            {"system": PSGC, "filter": [{"property": "concept", "op": op, "value": value}]}]}})
+
+    add("urn:cavite", "is-a", "0421")
+    add("urn:cavite-cities", "descendent-of", "0421")
+    add("urn:outside-calabarzon", "is-not-a", "04")
+    add("urn:above-bacoor", "generalizes", "042103")
+    value_sets.add("urn:by-name", None, {"url": "urn:by-name", "compose": {"include": [
+        {"system": PSGC, "filter": [{"property": "display", "op": "=", "value": "NCR"}]}]}})
+
+    expander = ValueSetExpander(value_sets, build_code_system_indexes(code_systems))
+
+    def codes(url):
+        return sorted(code for _, code in expander.expand(url).codes)
+
+    assert codes("urn:cavite") == ["0421", "042103", "042106"]
+    assert codes("urn:cavite-cities") == ["042103", "042106"]
+    assert codes("urn:outside-calabarzon") == ["13", "1380", "138001"]
+    assert codes("urn:above-bacoor") == ["04", "0421", "042103"]
+    assert expander.expand("urn:cavite").complete
+    assert not expander.expand("urn:by-name").complete
+
+
+def main():
+    """Run the CodeSystem hierarchy tests."""
+    tests = [test_hierarchy_queries, test_filters_expand_subtrees]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All CodeSystem hierarchy tests completed!")
+
+
+if __name__ == "__main__":
+    main()
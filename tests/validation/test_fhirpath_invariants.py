@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+PHCore FHIRPath Invariant Tests
+Checks the compiled FHIRPath subset and constraint checking during profile validation.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.fhirpath import FhirPathError, compile_expression
+
+PHCORE = "http://localhost:5072/ph-core/fhir/StructureDefinition/"
+
+EXT_1 = "extension.exists() != value.exists()"
+ELE_1 = "hasValue() or (children().count() > id.count())"
+
+
+def test_expressions_evaluate():
+    """Boolean logic, comparisons, functions and choice elements follow FHIRPath semantics."""
+    assert compile_expression(EXT_1).is_satisfied({"url": "a", "valueBoolean": True})
+    assert not compile_expression(EXT_1).is_satisfied({"url": "a"})
+    assert not compile_expression(ELE_1).is_satisfied({"id": "x"})
+    assert compile_expression(ELE_1).is_satisfied("text")
+
+    per_1 = compile_expression("start.hasValue().not() or end.hasValue().not() or (start <= end)")
+    assert not per_1.is_satisfied({"start": "2024-02-01", "end": "2024-01-01"})
+    assert per_1.is_satisfied({"start": "2024-01-01"})
+
+    tim_9 = compile_expression("offset.empty() or (when.exists() and ((when in ('C' | 'CM' | 'CD' | 'CV')).not()))")
+    assert not tim_9.is_satisfied({"offset": 30, "when": ["CM"]})
+    assert tim_9.is_satisfied({"offset": 30, "when": ["HS"]})
+
+    # `period` is a choice-free element and must not match periodUnit
+    assert compile_expression("periodMax.empty() or period.exists()").is_satisfied({"periodUnit": "d"})
+    assert compile_expression("Patient.name.given.count()").evaluate({"resourceType": "Patient", "name": [{"given": ["A", "B"]}]}) == [2]
+
+    ref_1 = compile_expression("reference.startsWith('#').not() or (reference.substring(1) in %rootResource.contained.id)")
+    assert ref_1.is_satisfied({"reference": "#med"}, {"contained": [{"id": "med"}]})
+    assert not ref_1.is_satisfied({"reference": "#other"}, {"contained": [{"id": "med"}]})
+
+
+def test_date_comparisons():
+    """Dates compare as points in time: mixed precision is unknown unless decided early, offsets are UTC."""
+    per_1 = compile_expression("start.hasValue().not() or end.hasValue().not() or (start <= end)")
+    # Same day at different precision: unknown, so not reported
+    assert per_1.evaluate({"start": "2020-01-01T10:00:00+08:00", "end": "2020-01-01"}) == []
+    assert per_1.is_satisfied({"start": "2020-01-01T10:00:00+08:00", "end": "2020-01-01"})
+    # Decided by a coarser component regardless of the finer precision
+    assert not per_1.is_satisfied({"start": "2021-01-01", "end": "2020-06-01T03:00:00Z"})
+    assert not per_1.is_satisfied({"start": "2020-02", "end": "2020-01-31"})
+    # 10:00+08:00 is 02:00Z
+    assert per_1.evaluate({"start": "2020-01-01T10:00:00+08:00", "end": "2020-01-01T03:00:00Z"}) == [True]
+    assert not per_1.is_satisfied({"start": "2020-01-01T10:00:00+08:00", "end": "2020-01-01T01:00:00Z"})
+    assert per_1.is_satisfied({"start": "2019-12-31T23:30:00-01:00", "end": "2020-01-01T00:45:00.5Z"})
+
+
+def test_expressions_are_compiled_once():
+    """Compiled expressions are cached by text; unsupported syntax fails at compile time."""
+    assert compile_expression(EXT_1) is compile_expression(EXT_1)
+    for unsupported in ("value.memberOf('http://x')", "a +", "@2020-01-01 < now()"):
+        try:
+            compile_expression(unsupported)
+        except FhirPathError:
+            continue
+        raise AssertionError(f"expected FhirPathError for {unsupported}")
+
+
+def test_profile_invariants_reported(validator):
+    """Type constraints on profiled elements are checked at each node."""
+    patient = {
+        "resourceType": "Patient", "id": "p",
+        "extension": [{"url": PHCORE + "indigenous-people", "valueBoolean": True},
+                      {"url": PHCORE + "race", "extension": [{"url": "x"}], "valueString": "both"}],
+        "address": [{"city": "Manila"}, {"id": "empty"}],
+    }
+    result = validator.validate_resource(patient, profile_url=PHCORE + "ph-core-patient")
+    invariants = sorted((issue.details.split()[1], issue.location) for issue in result.issues if issue.code == "invariant")
+    assert invariants == [("ele-1", "Patient.address[1]"), ("ext-1", "Patient.extension[1]")]
+
+
+def main():
+    """Run the FHIRPath invariant tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
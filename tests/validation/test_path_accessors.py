@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+PHCore Path Accessor Tests
+Checks that compiled element paths find every matching node with its concrete location.
+"""
+
+import sys
+from pathlib import Path
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.paths import compile_path
+
+PATIENT = {
+    "resourceType": "Patient",
+    "name": [{"family": "Dela Cruz"}, {"given": ["Juan", "Jose"]}],
+    "telecom": [{"system": "phone"}, {"value": "x"}, {"system": "email"}],
+    "contact": [{"name": {"family": "A"}}, {"relationship": [{"coding": [{"code": "N"}]}]}],
+    "deceasedBoolean": False,
+}
+
+
+def test_array_fan_out():
+    """Every item of every array on the path is visited."""
+    assert compile_path("Patient.telecom.system")(PATIENT) == [
+        ("Patient.telecom[0].system", "phone"),
+        ("Patient.telecom[2].system", "email"),
+    ]
+    assert compile_path("Patient.name.given")(PATIENT) == [
+        ("Patient.name[1].given[0]", "Juan"),
+        ("Patient.name[1].given[1]", "Jose"),
+    ]
+
+
+def test_nested_arrays_do_not_stop_at_first_item():
+    """A later array item satisfies the path even when the first item lacks the field."""
+    assert compile_path("Patient.contact.relationship.coding.code").values(PATIENT) == ["N"]
+    assert not compile_path("Patient.contact.telecom").exists(PATIENT)
+
+
+def test_choice_elements():
+    """value[x]-style paths match the type-suffixed property names, and false values still count."""
+    assert compile_path("Patient.deceased[x]")(PATIENT) == [("Patient.deceasedBoolean", False)]
+    assert compile_path("Patient.deceased[x]") is compile_path("Patient.deceased[x]")
+
+
+def main():
+    """Run the path accessor tests."""
+    tests = [test_array_fan_out, test_nested_arrays_do_not_stop_at_first_item, test_choice_elements]
+    for test in tests:
+        test()
+        print(f"✅ PASS: {test.__name__}")
+    print("\n🎯 All path accessor tests completed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+PHCore Validation Plan Tests
+Checks that StructureDefinitions compile into cached, immutable validation plans.
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.validator import FhirValidator
+from fhir_server.validation.plan import ElementRule, SliceRule
+
+PATIENT_PROFILE = "http://localhost:5072/ph-core/fhir/StructureDefinition/ph-core-patient"
+
+
+def test_patient_plan_rules(validator):
+    """The Patient plan carries pre-split slice and element rules."""
+    plan = validator.get_profile_plan(PATIENT_PROFILE)
+
+    assert plan is not None
+    assert plan.resource_type == "Patient"
+
+    slices = {rule.slice_name: rule for rule in plan.rules if isinstance(rule, SliceRule)}
+    indigenous = slices["indigenousPeople"]
+    assert indigenous.is_extension
+    assert indigenous.min_occurs == 1
+    assert indigenous.extension_url == "http://localhost:5072/ph-core/fhir/StructureDefinition/indigenous-people"
+    # Versioned profile references are stripped at compile time
+    assert slices["nationality"].extension_url == "http://hl7.org/fhir/StructureDefinition/patient-nationality"
+
+    marital = next(rule for rule in plan.rules if isinstance(rule, ElementRule) and rule.field_path == "maritalStatus")
+    assert marital.field_parts == ("maritalStatus",)
+    assert marital.binding.strength == "required"
+
+
+def test_plan_is_cached_and_invalidated(validator, monkeypatch):
+    """Plans compile once and recompile when the StructureDefinition changes."""
+    plan = validator.get_profile_plan(PATIENT_PROFILE)
+    assert validator.get_profile_plan(PATIENT_PROFILE) is plan
+
+    changed = copy.deepcopy(validator.structure_definitions[PATIENT_PROFILE])
+    changed["differential"]["element"] = []
+    monkeypatch.setitem(validator.structure_definitions, PATIENT_PROFILE, changed)
+
+    recompiled = validator.get_profile_plan(PATIENT_PROFILE)
+    assert recompiled is not plan
+    assert recompiled.rules == ()
+
+
+def test_inherited_plans_track_dependencies(validator, monkeypatch):
+    """A hot reload keeps a plan only while its extension and type definitions are unchanged too."""
+    plan = validator.get_profile_plan(PATIENT_PROFILE)
+    extension_url = "http://localhost:5072/ph-core/fhir/StructureDefinition/indigenous-people"
+    assert extension_url in dict(plan.dependencies)
+
+    unchanged = FhirValidator(validator.resource_loader)
+    unchanged.inherit_compiled_state(validator)
+    assert unchanged.get_profile_plan(PATIENT_PROFILE) is plan
+
+    # Plans compiled on snapshots seeded from the cached maps (as on a warm boot) are carried too
+    restored = FhirValidator(validator.resource_loader)
+    restored_plan = restored.get_profile_plan(PATIENT_PROFILE)
+    assert restored_plan is not plan and dict(restored_plan.dependencies) == dict(plan.dependencies)
+    carried = FhirValidator(validator.resource_loader)
+    carried.inherit_compiled_state(restored)
+    assert carried.get_profile_plan(PATIENT_PROFILE) is restored_plan
+
+    edited = FhirValidator(validator.resource_loader)
+    monkeypatch.setitem(edited.structure_definitions, extension_url,
+                        copy.deepcopy(edited.structure_definitions[extension_url]))
+    edited.inherit_compiled_state(validator)
+    assert edited.get_profile_plan(PATIENT_PROFILE) is not plan
+
+
+def test_missing_profile_has_no_plan(validator):
+    """Unknown profiles produce no plan and a not-found warning."""
+    assert validator.get_profile_plan("http://example.org/StructureDefinition/unknown") is None
+
+    result = validator.validate_resource(
+        {"resourceType": "Patient", "id": "p1"},
+        profile_url="http://example.org/StructureDefinition/unknown"
+    )
+    assert result.is_valid
+    assert [issue.code for issue in result.issues] == ["not-found"]
+
+
+def main():
+    """Run the validation plan tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
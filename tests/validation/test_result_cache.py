@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+PHCore Validation Result Cache Tests
+Checks content-addressed result reuse, LRU/TTL bounds and invalidation on registry reload.
+"""
+
+import contextlib
+import io
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.result_cache import ValidationResultCache, resource_digest
+from fhir_server.validation.validator import FhirValidator, ValidationResult
+
+PHCORE = "http://localhost:5072/ph-core/fhir/StructureDefinition/"
+
+
+def create_validator(resource_loader, result_cache: ValidationResultCache) -> FhirValidator:
+    """Create a validator using the cache, as each registry version does."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return FhirValidator(resource_loader, result_cache=result_cache)
+
+
+def test_digest_is_canonical():
+    """Key order and whitespace do not change the digest; content does."""
+    assert resource_digest({"a": 1, "b": [1, 2]}) == resource_digest({"b": [1, 2], "a": 1})
+    assert resource_digest({"a": 1}) != resource_digest({"a": 2})
+
+
+def test_bounds_and_expiry():
+    """Entries are evicted least-recently-used past the entry and memory caps and expire after the TTL."""
+    cache = ValidationResultCache(max_entries=2, ttl=60.0)
+    generation = cache.new_generation()
+    results = [ValidationResult(True, []) for _ in range(3)]
+    cache.put(generation, "a", results[0])
+    cache.put(generation, "b", results[1])
+    assert cache.get(generation, "a") is results[0]
+    cache.put(generation, "c", results[2])
+    assert cache.get(generation, "b") is None and cache.get(generation, "a") is results[0]
+    assert cache.stats["evictions"] == 1
+
+    small = ValidationResultCache(max_entries=10, max_bytes=1000)
+    generation = small.new_generation()
+    for key in range(5):
+        small.put(generation, key, ValidationResult(True, []))
+    assert len(small) == 2 and small.info()["bytes"] <= 1000
+
+    expiring = ValidationResultCache(ttl=0.01)
+    generation = expiring.new_generation()
+    expiring.put(generation, "a", results[0])
+    time.sleep(0.02)
+    assert expiring.get(generation, "a") is None and expiring.stats["expirations"] == 1
+
+
+def test_validator_reuses_results(resource_loader):
+    """Identical requests hit the cache; a new registry version starts empty and ignores late inserts."""
+    cache = ValidationResultCache()
+    validator = create_validator(resource_loader, cache)
+    patient = {"resourceType": "Patient", "id": "p", "meta": {"profile": [PHCORE + "ph-core-patient"]}}
+    first = validator.validate_resource(patient)
+    assert validator.validate_resource(dict(reversed(list(patient.items())))) is first
+    assert validator.validate_resource(patient, verbose=True) is not first
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 2
+
+    reloaded = create_validator(resource_loader, cache)
+    assert len(cache) == 0 and cache.stats["invalidations"] == 2
+    # Requests still in flight on the old version cannot repopulate the cache
+    validator.validate_resource({"resourceType": "Patient", "id": "late"})
+    assert len(cache) == 0
+    assert reloaded.validate_resource(patient) is not first
+    assert reloaded.validate_resource(patient).issues == first.issues
+
+
+def main():
+    """Run the validation result cache tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+PHCore Snapshot Generation Tests
+Checks that profile differentials are expanded onto their baseDefinition chain.
+"""
+
+import contextlib
+import io
+import json
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.validator import FhirValidator
+
+RESOURCES_DIR = Path(__file__).parent.parent.parent / "resources"
+PHCORE = "http://localhost:5072/ph-core/fhir/StructureDefinition/"
+PATIENT_PROFILE = PHCORE + "ph-core-patient"
+
+
+def base_patient_definition() -> dict:
+    """A trimmed base Patient StructureDefinition with a snapshot."""
+    def element(path, min_occurs, max_occurs, *codes):
+        return {"id": path, "path": path, "min": min_occurs, "max": max_occurs,
+                "type": [{"code": code} for code in codes]}
+
+    return {
+        "resourceType": "StructureDefinition",
+        "id": "Patient",
+        "url": "http://hl7.org/fhir/StructureDefinition/Patient",
+        "name": "Patient",
+        "kind": "resource",
+        "type": "Patient",
+        "derivation": "specialization",
+        "snapshot": {"element": [
+            {"id": "Patient", "path": "Patient", "min": 0, "max": "*"},
+            element("Patient.id", 0, "1", "id"),
+            element("Patient.meta", 0, "1", "Meta"),
+            element("Patient.extension", 0, "*", "Extension"),
+            element("Patient.identifier", 0, "*", "Identifier"),
+            element("Patient.gender", 0, "1", "code"),
+            element("Patient.deceased[x]", 0, "1", "boolean", "dateTime"),
+            element("Patient.address", 0, "*", "Address"),
+            element("Patient.maritalStatus", 0, "1", "CodeableConcept"),
+            element("Patient.contact", 0, "*", "BackboneElement"),
+            element("Patient.contact.relationship", 0, "*", "CodeableConcept"),
+            element("Patient.contact.address", 0, "1", "Address"),
+        ]}
+    }
+
+
+def test_datatype_profiles_expand(validator):
+    """Profiles on shipped base types merge onto the type snapshot and unfold sliced extensions."""
+
+    address = validator.snapshots.get(PHCORE + "ph-core-address")
+    assert address.complete
+    assert address.element("Address.city")["max"] == "1"
+    assert address.element("Address.extension:barangay")["sliceName"] == "barangay"
+
+    occupation = validator.snapshots.get(PHCORE + "occupation")
+    length_value = occupation.element("Extension.extension:occupationLength.value[x]")
+    assert [t["code"] for t in length_value["type"]] == ["integer", "Period"]
+    assert occupation.element("Extension.extension:occupationLength.url")["fixedUri"] == "occupationLength"
+
+    # The base Patient definition is not shipped, so the profile expands only partially
+    assert not validator.snapshots.get(PATIENT_PROFILE).complete
+
+
+def test_resource_profile_expands_with_base(registry_factory):
+    """With the base resource loaded, the profile snapshot inherits base elements and types."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_path in (RESOURCES_DIR / "phcore").glob("StructureDefinition-*.json"):
+            shutil.copy(file_path, tmp)
+        (Path(tmp) / "StructureDefinition-Patient.json").write_text(json.dumps(base_patient_definition()), encoding='utf-8')
+        resource_loader = registry_factory(tmp)
+        with contextlib.redirect_stdout(io.StringIO()):
+            validator = FhirValidator(resource_loader)
+
+    patient = validator.snapshots.get(PATIENT_PROFILE)
+    assert patient.complete
+    assert patient.element("Patient.extension")["min"] == 1
+    assert patient.element("Patient.gender")["type"] == [{"code": "code"}]
+    assert patient.element("Patient.extension:indigenousPeople")["max"] == "1"
+    # Constraints below a slice unfold Identifier, CodeableConcept and Coding
+    assert patient.element("Patient.identifier:PHCorePhilHealthID.type.coding.system")["fixedUri"]
+    assert "deceasedBoolean" in patient.field_names
+
+    # Verbose structure checks use the base snapshot instead of the hardcoded field lists
+    result = validator.validate_resource({"resourceType": "Patient", "deceasedBoolean": False, "bogus": 1},
+                                         profile_url=PATIENT_PROFILE, verbose=True)
+    invalid = [issue.location for issue in result.issues if issue.code == "invalid-field"]
+    assert invalid == ["Patient.bogus"]
+
+
+def main():
+    """Run the snapshot generation tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
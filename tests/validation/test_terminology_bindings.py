@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+PHCore Terminology Binding Tests
+Checks ValueSet expansion and code membership checks for required and extensible bindings.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core.canonical import CanonicalIndex
+from fhir_server.validation.plan import BindingRule
+from fhir_server.validation.terminology import ValueSetExpander, build_code_system_indexes
+
+PHCORE = "http://localhost:5072/ph-core/fhir/"
+GROUPS = PHCORE + "CodeSystem/indigenous-groups"
+
+
+def test_compose_expansion():
+    """Whole-system includes, listed concepts, excludes and imported ValueSets expand to code sets."""
+    code_systems = CanonicalIndex()
+    code_systems.add("urn:cs", None, {"url": "urn:cs", "content": "complete", "concept": [
+        {"code": "a"}, {"code": "b", "concept": [{"code": "b1"}]}, {"code": "c"}]})
+    code_systems.add("urn:partial", None, {"url": "urn:partial", "content": "not-present"})
+    value_sets = CanonicalIndex()
+    value_sets.add("urn:all", None, {"url": "urn:all", "compose": {
+        "include": [{"system": "urn:cs"}], "exclude": [{"system": "urn:cs", "concept": [{"code": "c"}]}]}})
+    value_sets.add("urn:import", None, {"url": "urn:import", "compose": {
+        "include": [{"valueSet": ["urn:all"]}, {"system": "urn:other", "concept": [{"code": "x"}]}]}})
+    value_sets.add("urn:unknown", None, {"url": "urn:unknown", "compose": {"include": [{"system": "urn:partial"}]}})
+
+    expander = ValueSetExpander(value_sets, build_code_system_indexes(code_systems))
+    expansion = expander.expand("urn:import")
+    assert expansion.complete
+    assert expansion.codes == {("urn:cs", "a"), ("urn:cs", "b"), ("urn:cs", "b1"), ("urn:other", "x")}
+    assert expansion.contains(None, "b1") and not expansion.contains("urn:cs", "c")
+    assert not expander.expand("urn:unknown").complete
+    assert expander.expand("urn:all") is expander.expand("urn:all")
+
+
+def test_bindings_check_membership(validator):
+    """Required bindings report errors, extensible bindings warnings, for codes outside the expansion."""
+    expansion = validator.expansions.get(PHCORE + "ValueSet/indigenous-groups")
+    assert expansion.complete and expansion.contains(GROUPS, "Aetas")
+
+    nodes = [("Patient.a", {"coding": [{"system": GROUPS, "code": "Aetas"}]}),
+             ("Patient.b", {"coding": [{"system": GROUPS, "code": "AETA"}]}),
+             ("Patient.c", {"text": "Aeta"}),
+             ("Patient.d", "Ati")]
+    required = validator._validate_binding(nodes, "x", BindingRule(PHCORE + "ValueSet/indigenous-groups", "required"))
+    assert [(issue.severity, issue.location) for issue in required] == [("error", "Patient.b"), ("error", "Patient.c")]
+    extensible = validator._validate_binding(nodes, "x", BindingRule(PHCORE + "ValueSet/indigenous-groups", "extensible"))
+    assert [(issue.severity, issue.location) for issue in extensible] == [("warning", "Patient.b")]
+    # ValueSets without a compose (drugs) cannot be judged
+    assert not validator._validate_binding(nodes, "x", BindingRule(PHCORE + "ValueSet/drugs", "required"))
+
+
+def test_extension_value_binding(validator):
+    """Extension slice values are checked against the extension profile's value binding."""
+    patient = {"resourceType": "Patient", "id": "p", "extension": [
+        {"url": PHCORE + "StructureDefinition/indigenous-people", "valueBoolean": True},
+        {"url": PHCORE + "StructureDefinition/indigenous-group",
+         "valueCodeableConcept": {"coding": [{"system": GROUPS, "code": "Unknown"}]}}]}
+    result = validator.validate_resource(patient, profile_url=PHCORE + "StructureDefinition/ph-core-patient")
+    assert not result.is_valid
+    assert [issue.location for issue in result.issues if issue.code == "code-invalid"] == ["Patient.extension[1].valueCodeableConcept"]
+
+
+def main():
+    """Run the terminology binding tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
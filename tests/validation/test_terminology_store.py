@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+PHCore Terminology Store Tests
+Checks that CodeSystems compiled into SQLite answer the same queries as the in-memory index.
+"""
+
+import contextlib
+import io
+import json
+import pickle
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.core.canonical import CanonicalIndex
+from fhir_server.core.resource_loader import ResourceLoader
+from fhir_server.validation.terminology import CodeSystemIndex, ValueSetExpander, build_code_system_indexes
+from fhir_server.validation.terminology_store import STORED_RESOURCE_TYPES, StoredCodeSystem, TerminologyStore
+from fhir_server.validation.validator import FhirValidator
+
+EXAMPLES_DIR = Path(__file__).parent.parent.parent / "examples"
+PSGC = "urn:psgc"
+
+GEOGRAPHY = {
+    "url": PSGC, "name": "PSGC", "content": "complete",
+    "concept": [
+        {"code": "04", "display": "CALABARZON", "concept": [
+            {"code": "0421", "display": "Cavite", "concept": [
+                {"code": "042103", "display": "Bacoor"},
+                {"code": "042106", "display": "Dasmariñas"},
+            ]},
+            {"code": "0434", "display": "Laguna"},
+        ]},
+        {"code": "13", "display": "NCR"},
+        {"code": "1380", "display": "Caloocan", "property": [{"code": "parent", "valueCode": "13"}]},
+        {"code": "138001", "display": "Barangay 1", "property": [{"code": "parent", "valueCode": "1380"}]},
+    ]
+}
+
+
+def test_store_matches_index():
+    """Every hierarchy query of a stored CodeSystem matches the in-memory index."""
+    code_systems = CanonicalIndex()
+    code_systems.add(PSGC, None, GEOGRAPHY)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TerminologyStore(str(Path(tmp) / "terminology.db"))
+        stored = store.compile(code_systems.all_values()).get(PSGC)
+        index = CodeSystemIndex(GEOGRAPHY)
+        assert isinstance(stored, StoredCodeSystem)
+        assert len(stored) == len(index) and list(stored) == list(index)
+        for code in [*index, "99"]:
+            assert (code in stored) == (code in index)
+            assert stored.display(code) == index.display(code)
+            assert stored.parents(code) == index.parents(code)
+            assert stored.children(code) == index.children(code)
+            assert stored.ancestors(code) == index.ancestors(code)
+            assert stored.descendants(code) == index.descendants(code)
+            for other in index:
+                assert stored.is_a(code, other) == index.is_a(code, other)
+                assert stored.subsumes(code, other) == index.subsumes(code, other)
+
+        # Unchanged content is not compiled again; handles survive pickling by path
+        assert store.compile(code_systems.all_values()).get(PSGC).system_id == stored.system_id
+        restored = pickle.loads(pickle.dumps(stored))
+        assert restored.store.path == store.path and restored.descendants("13") == ["1380", "138001"]
+
+
+def test_store_selections_match_expansions():
+    """Whole-system and filter includes over the store are tested per code, with the in-memory expansion's answers."""
+    code_systems = CanonicalIndex()
+    code_systems.add(PSGC, None, GEOGRAPHY)
+    value_sets = CanonicalIndex()
+    composes = {
+        "urn:all": {"include": [{"system": PSGC}], "exclude": [{"system": PSGC, "concept": [{"code": "0434"}]}]},
+        "urn:is-a": {"include": [{"system": PSGC, "filter": [{"property": "concept", "op": "is-a", "value": "04"}]}]},
+        "urn:below": {"include": [{"system": PSGC, "filter": [{"property": "concept", "op": "descendent-of", "value": "13"}]}]},
+        "urn:not-a": {"include": [{"system": PSGC, "filter": [{"property": "concept", "op": "is-not-a", "value": "0421"}]}]},
+        "urn:above": {"include": [{"system": PSGC, "filter": [{"property": "concept", "op": "generalizes", "value": "042106"}]}]},
+        "urn:cavite": {"include": [{"valueSet": ["urn:is-a"]}],
+                       "exclude": [{"system": PSGC, "filter": [{"property": "concept", "op": "is-not-a", "value": "0421"}]}]},
+    }
+    for url, compose in composes.items():
+        value_sets.add(url, None, {"url": url, "compose": compose})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TerminologyStore(str(Path(tmp) / "terminology.db"))
+        stored = ValueSetExpander(value_sets, store.compile(code_systems.all_values()))
+        in_memory = ValueSetExpander(value_sets, build_code_system_indexes(code_systems))
+        for url in composes:
+            expected, actual = in_memory.expand(url), stored.expand(url)
+            # Nothing is copied out of the store
+            assert not actual.codes and not actual.is_listed and actual.complete == expected.complete
+            for code in [*CodeSystemIndex(GEOGRAPHY), "99"]:
+                for system in (PSGC, None, "urn:other"):
+                    assert actual.contains(system, code) == expected.contains(system, code), (url, system, code)
+
+
+def test_validator_with_store(validator, registry_factory):
+    """A validator backed by the store expands ValueSets and checks bindings like the in-memory one."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TerminologyStore(str(Path(tmp) / "terminology.db"))
+        # A private registry, as the store-backed indexes replace the ones cached with the loader
+        with contextlib.redirect_stdout(io.StringIO()):
+            stored = FhirValidator(registry_factory(), terminology_store=store)
+        assert all(isinstance(index, StoredCodeSystem) for index in stored.code_system_indexes.all_values())
+        for url, expansion in validator.expansions.items():
+            stored_expansion = stored.expansions.get(url)
+            assert stored_expansion.complete == expansion.complete and stored_expansion.codes <= expansion.codes
+            assert all(stored_expansion.contains(system, code) for system, code in expansion.codes)
+
+        resource = json.loads((EXAMPLES_DIR / "valid" / "patient" / "test-patient-comprehensive.json").read_text())
+        expected = validator.validate_resource(resource)
+        actual = stored.validate_resource(resource)
+        assert [issue.__dict__ for issue in actual.issues] == [issue.__dict__ for issue in expected.issues]
+
+
+def test_store_keeps_code_systems_out_of_memory(validator, registry_factory):
+    """With a store, CodeSystem content stays out of the loader, the validator maps and the snapshot."""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TerminologyStore(str(Path(tmp) / "terminology.db"))
+        for lazy in (False, True):
+            loader = registry_factory(lazy=lazy, on_demand_types=STORED_RESOURCE_TYPES)
+            code_systems = loader.by_type["CodeSystem"]
+            assert code_systems and not any(resource.is_loaded for resource in code_systems)
+            # Reads still serve the full resource from its source file
+            for resource in code_systems:
+                expected = validator.resource_loader.get_resource("CodeSystem", resource.id).content
+                assert loader.get_resource("CodeSystem", resource.id).content == expected
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                stored = FhirValidator(loader, terminology_store=store)
+            headers = stored.code_systems.all_values()
+            assert headers and not any("concept" in header for header in headers)
+            for index in stored.code_system_indexes.all_values():
+                canonical = f"{index.url}|{index.version}" if index.version else index.url
+                assert stored.code_systems.get(canonical)["count"] == len(index)
+
+            loader.snapshot_path = Path(tmp) / f"registry-{lazy}.snapshot"
+            assert loader.save_snapshot()
+            restored = ResourceLoader(str(loader.resources_dir), str(loader.base_resources_dir),
+                                      snapshot_path=str(loader.snapshot_path), lazy=lazy,
+                                      on_demand_types=STORED_RESOURCE_TYPES)
+            with contextlib.redirect_stdout(io.StringIO()):
+                restored.load_all_resources()
+                warm = FhirValidator(restored, terminology_store=store)
+            assert restored.loaded_from_snapshot
+            assert not any(resource.is_loaded for resource in restored.by_type["CodeSystem"])
+            assert not any("concept" in header for header in warm.code_systems.all_values())
+
+            resource = json.loads((EXAMPLES_DIR / "valid" / "patient" / "test-patient-comprehensive.json").read_text())
+            expected = validator.validate_resource(resource)
+            for actual in (stored.validate_resource(resource), warm.validate_resource(resource)):
+                assert [issue.__dict__ for issue in actual.issues] == [issue.__dict__ for issue in expected.issues]
+
+
+def main():
+    """Run the terminology store tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+PHCore Tree-Walk Engine Tests
+Checks that single-pass tree validation reports exactly what per-rule plan validation reports.
+"""
+
+import contextlib
+import copy
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add repository root to path to import fhir_server modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from fhir_server.validation.paths import compile_path
+from fhir_server.validation.tree_engine import PathTree
+from fhir_server.validation.validator import FhirValidator
+
+REPO_DIR = Path(__file__).parent.parent.parent
+PHCORE = "http://localhost:5072/ph-core/fhir/StructureDefinition/"
+
+EDGE_CASES = [
+    # Repeated and url-less extensions, an identifier without system
+    {"resourceType": "Patient", "meta": {"profile": [PHCORE + "ph-core-patient"]},
+     "identifier": [{"value": "x"}, None],
+     "extension": [{"url": PHCORE + "indigenous-people", "valueBoolean": True},
+                   {"url": PHCORE + "indigenous-people", "valueBoolean": True}, {"valueString": "x"}],
+     "telecom": [{"system": "phone"}, {"system": "bogus"}]},
+    # Several profiles of different types at once, one unknown
+    {"resourceType": "Organization",
+     "meta": {"profile": [PHCORE + "ph-core-organization", PHCORE + "ph-core-patient", PHCORE + "nope"]},
+     "identifier": [{"system": "a"}], "address": [{"city": "x"}]},
+    # A single profile given as a string and a resource of the wrong type
+    {"resourceType": "Encounter", "meta": {"profile": PHCORE + "ph-core-patient"}, "status": "bogus", "class": "x"},
+    {"resourceType": "Medication", "meta": {"profile": [PHCORE + "ph-core-medication"]},
+     "code": {"coding": [{"code": "x"}]}, "ingredient": [{"itemCodeableConcept": {}}, {"strength": {}}]},
+]
+
+
+@pytest.fixture
+def tree_validator(resource_loader) -> FhirValidator:
+    """A tree-engine validator on the shared registry."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return FhirValidator(resource_loader, engine="tree")
+
+
+def issue_list(result):
+    return [(issue.severity, issue.code, issue.details, issue.location) for issue in result.issues]
+
+
+def test_tree_nodes_match_accessors():
+    """A single walk collects the same located nodes as each compiled path."""
+    resource = {"resourceType": "Observation", "valueQuantity": {"value": 1}, "valueString": "x",
+                "component": [{"code": {"coding": [{"code": "a"}, {"code": "b"}]}}, {"valueBoolean": True}],
+                "code": {"coding": [None, {"system": "s"}]}}
+    paths = ["Observation.value[x]", "Observation.component.code.coding.code", "Observation.component.value[x]",
+             "Observation.code.coding", "Observation.code.coding.system", "Observation.subject"]
+    index = PathTree(paths).index(resource)
+    for path in paths + ["Observation.component", "Other.code.coding"]:
+        assert index.nodes(path) == compile_path(path)(resource), path
+
+
+def test_engines_agree(validator, tree_validator):
+    """Examples and edge cases produce identical issues with both engines, verbose or not."""
+    resources = [json.loads(path.read_text(encoding='utf-8'))
+                 for path in sorted((REPO_DIR / "examples").rglob("*.json"))] + EDGE_CASES
+    for resource in resources:
+        for verbose in (False, True):
+            expected = validator.validate_resource(copy.deepcopy(resource), verbose=verbose)
+            actual = tree_validator.validate_resource(copy.deepcopy(resource), verbose=verbose)
+            assert actual.is_valid == expected.is_valid
+            assert issue_list(actual) == issue_list(expected)
+
+
+def test_compare_engine_counts_mismatches(validator):
+    """The compare engine returns plan results and records each comparison."""
+    compare_validator = FhirValidator(validator.resource_loader, engine="compare")
+    for resource in EDGE_CASES:
+        result = compare_validator.validate_resource(copy.deepcopy(resource), verbose=True)
+        assert issue_list(result) == issue_list(validator.validate_resource(copy.deepcopy(resource), verbose=True))
+    assert compare_validator.engine_stats == {"compared": len(EDGE_CASES), "mismatches": 0}
+
+
+def test_tree_cache_is_bounded(tree_validator):
+    """Unknown profile URLs add no trees, and the trees of real profile sets are capped."""
+    engine = tree_validator._tree_engine
+    engine.max_trees = 2
+    patient = {"resourceType": "Patient", "id": "p"}
+    for number in range(50):
+        tree_validator.validate_resource(patient, profile_url=f"http://example.org/StructureDefinition/bogus-{number}")
+    assert len(engine._trees) == 0
+
+    profiles = [PHCORE + "ph-core-patient", PHCORE + "ph-core-organization", PHCORE + "ph-core-medication"]
+    for profile in profiles:
+        # Bogus URLs alongside a real profile share its tree
+        for bogus in ("x", "y"):
+            patient["meta"] = {"profile": [profile, PHCORE + bogus]}
+            tree_validator.validate_resource(copy.deepcopy(patient))
+    assert len(engine._trees) == 2
+
+
+def main():
+    """Run the tree engine tests."""
+    sys.exit(pytest.main([__file__, "-v", "--rootdir", str(Path(__file__).parent.parent.parent)]))
+
+
+if __name__ == "__main__":
+    main()